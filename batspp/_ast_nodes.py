@@ -74,10 +74,12 @@ class Test(AST):
             reference: str = '',
             assertions: list = None,
             data: TokenData = TokenData(),
+            timeout: int = 0,
             ) -> None:
         super().__init__(data)
         self.reference = reference
         self.assertions = assertions if assertions else []
+        self.timeout = timeout
 
 
 class TestsSuite(AST):
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+#
+# Cache module
+#
+# This is responsible for store generated tests files on
+# a content-addressed cache, keyed by the hash of everything
+# the generated content depends on, so unchanged tests files
+# are not transpiled again.
+#
+# Also the results of tests are cached by their fingerprint,
+# so unchanged tests that passed can be skipped.
+#
+# Entries are written to a temporal file and then renamed,
+# so the cache directory can be shared between processes
+# and machines, readers never see partially written entries.
+#
+
+
+"""
+Cache module
+
+This is responsible for store generated tests files
+on a content-addressed cache, keyed by the hash of
+everything the generated content depends on, also
+the results of tests are cached by their fingerprint
+"""
+
+
+# Standard packages
+from glob import glob
+from hashlib import sha256
+from json import (
+    dumps as json_dumps,
+    loads as json_loads,
+    )
+from os import (
+    chmod as os_chmod,
+    makedirs as os_makedirs,
+    path as os_path,
+    replace as os_replace,
+    remove as os_remove,
+    umask as os_umask,
+    walk as os_walk,
+    )
+from tempfile import NamedTemporaryFile
+from time import time
+
+# Installed packages
+from mezcla import debug
+from mezcla import glue_helpers as gh
+
+# Local packages
+from batspp.__version__ import __version__
+from batspp.batspp_opts import BatsppOpts
+from batspp.batspp_args import BatsppArgs
+from batspp._ast_nodes import TestsSuite, Test
+from batspp._tap import PASSED, TestResult
+from batspp._exceptions import (
+    warning_not_intended_for_cmd,
+    )
+
+
+# Constants
+#
+# The format is increased when the content of the entries
+# changes, so entries of previous formats are not used
+CACHE_EXTENSION = 'json'
+CACHE_FORMAT = 2
+
+# Number of entries kept by memory caches, the oldest are evicted,
+# notebooks cells are many more than files, so more are kept
+MEMORY_ENTRIES = 256
+CELLS_ENTRIES = 4096
+CELL_KIND = 'cell'
+
+
+def get_umask() -> int:
+    """Return the umask of the process, which can only be read by setting it"""
+    result = os_umask(0)
+    os_umask(result)
+    return result
+
+
+# Mode of the entries, temporal files are private, so
+# the umask is applied as for any other created file
+ENTRY_MODE = 0o666 & ~get_umask()
+
+
+def hash_file(path: str) -> str:
+    """Return sha256 hex digest of file at PATH, or empty if it doesn't exist"""
+    if not os_path.isfile(path):
+        return ''
+    digest = sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(65536), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_path(pattern: str) -> str:
+    """
+    Return sha256 hex digest of the files matching PATTERN,
+    folders are hashed by the relative paths and content of their files
+    """
+    digest = sha256()
+    for path in sorted(glob(pattern)) or [pattern]:
+        digest.update(f'{path}\0{hash_file(path)}\0'.encode())
+        if os_path.isdir(path):
+            for folder, folders, files in os_walk(path):
+                folders.sort()
+                for name in sorted(files):
+                    file = os_path.join(folder, name)
+                    digest.update(f'{os_path.relpath(file, path)}\0{hash_file(file)}\0'.encode())
+    return digest.hexdigest()
+
+
+def compute_key(file: str, args: BatsppArgs, opts: BatsppOpts, kind: str = '') -> str:
+    """
+    Return cache key of tests FILE transpiled with ARGS and OPTS, this covers
+    the content of the file and its sources and the version, entries other than
+    generated tests (e.g. inventories) are told apart by their KIND
+    """
+    parts = {
+        'version': __version__,
+        'format': CACHE_FORMAT,
+        'file': file,
+        'file_hash': hash_file(file),
+        'sources_hashes': [hash_file(source) for source in args.sources or []],
+        'args': vars(args),
+        'opts': vars(opts),
+        }
+    if kind:
+        parts['kind'] = kind
+    result = sha256(json_dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+    debug.trace(7, f'cache.compute_key({file}, {kind}) => {result}')
+    return result
+
+
+def compute_cell_key(cell: dict) -> str:
+    """
+    Return cache key of notebook CELL, this covers the content
+    used by the conversion (source and outputs) and the version
+    """
+    parts = {
+        'version': __version__,
+        'format': CACHE_FORMAT,
+        'kind': CELL_KIND,
+        'cell': cell,
+        }
+    result = sha256(json_dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+    debug.trace(7, f'cache.compute_cell_key() => {result}')
+    return result
+
+
+def fingerprint_test(
+        test: Test,
+        tree: TestsSuite,
+        args: BatsppArgs,
+        opts: BatsppOpts,
+        hashes: 'dict|None' = None,
+        ) -> str:
+    """
+    Return fingerprint of TEST of TREE transpiled with ARGS and OPTS, this covers the
+    test assertions, the global setup and teardown, and the content of the sources,
+    copy dir and visible paths, which hashes are memoized on HASHES (if any)
+    """
+    hashes = hashes if hashes is not None else {}
+
+    def get_hash(path):
+        if path not in hashes:
+            hashes[path] = hash_path(path)
+        return hashes[path]
+
+    parts = {
+        'version': __version__,
+        'reference': test.reference,
+        'timeout': test.timeout,
+        'assertions': [
+            [assertion.atype.value, assertion.setup_commands, assertion.actual, assertion.expected]
+            for assertion in test.assertions
+            ],
+        'setup_commands': tree.setup_commands,
+        'teardown_commands': tree.teardown_commands,
+        'paths_hashes': [
+            get_hash(path) for path in
+            (args.sources or []) + (args.visible_paths or []) + ([args.copy_dir] if args.copy_dir else [])
+            ],
+        'args': vars(args),
+        'opts': vars(opts),
+        }
+    result = sha256(json_dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+    debug.trace(7, f'cache.fingerprint_test({test.reference}) => {result}')
+    return result
+
+
+class Cache:
+    """Content-addressed cache of JSON entries on DIRECTORY"""
+
+    def __init__(self, directory: str) -> None:
+        assert directory, 'Cache directory cannot be empty'
+        self.directory = directory
+
+    def get_path(self, key: str) -> str:
+        """Return path of the entry of KEY, entries are spread on subfolders by prefix"""
+        return gh.form_path(self.directory, key[:2], f'{key}.{CACHE_EXTENSION}')
+
+    def load(self, key: str) -> 'dict|None':
+        """Return entry of KEY, or None if missing or unreadable"""
+        result = None
+        try:
+            with open(self.get_path(key), encoding='utf-8') as entry:
+                result = json_loads(entry.read())
+        except (OSError, ValueError):
+            pass
+        debug.trace(7, f'Cache.load({key}) => {result is not None}')
+        return result
+
+    def save(self, key: str, entry: dict) -> None:
+        """Save ENTRY of KEY atomically, concurrent saves of a key are equivalent"""
+        path = self.get_path(key)
+        os_makedirs(gh.dir_path(path), exist_ok=True)
+        with NamedTemporaryFile('w', encoding='utf-8', dir=gh.dir_path(path),
+                                prefix=f'.{key}-', delete=False) as temp:
+            temp.write(json_dumps(entry))
+        try:
+            os_chmod(temp.name, ENTRY_MODE)
+            os_replace(temp.name, path)
+        except OSError:
+            os_remove(temp.name)
+            raise
+        debug.trace(7, f'Cache.save({key}) => {path}')
+
+
+class MemoryCache:
+    """
+    Cache of up to MAX_ENTRIES kept in memory, for long-lived
+    processes, missing entries are taken from the BACKING cache (if any)
+    """
+
+    def __init__(self, backing: 'Cache|None' = None, max_entries: int = MEMORY_ENTRIES) -> None:
+        assert max_entries > 0, 'max_entries must be positive'
+        self.backing = backing
+        self.max_entries = max_entries
+        self.entries = {}
+
+    def load(self, key: str) -> 'dict|None':
+        """Return entry of KEY, or None if missing"""
+        result = self.entries.get(key)
+        if result is None and self.backing:
+            result = self.backing.load(key)
+            if result is not None:
+                self.remember(key, result)
+        return result
+
+    def save(self, key: str, entry: dict) -> None:
+        """Save ENTRY of KEY, also on the backing cache"""
+        self.remember(key, entry)
+        if self.backing:
+            self.backing.save(key, entry)
+
+    def remember(self, key: str, entry: dict) -> None:
+        """Keep ENTRY of KEY in memory, evicting the oldest entry when full"""
+        # NOTE: dicts keep the insertion order
+        self.entries.pop(key, None)
+        self.entries[key] = entry
+        if len(self.entries) > self.max_entries:
+            del self.entries[next(iter(self.entries))]
+
+
+class ResultCache(Cache):
+    """
+    Cache of tests results by their fingerprint, results older than
+    MAX_AGE seconds (if any) are not used, neither any with FORCE
+    """
+
+    def __init__(self, directory: str, max_age: int = 0, force: bool = False) -> None:
+        super().__init__(directory)
+        assert max_age >= 0, 'max_age cannot be negative'
+        self.max_age = max_age
+        self.force = force
+
+    def is_passed(self, fingerprint: str) -> bool:
+        """Whether the test of FINGERPRINT passed on its last run, within the max age"""
+        if self.force:
+            return False
+        entry = self.load(fingerprint)
+        result = bool(
+            entry and entry.get('status') == PASSED and
+            (not self.max_age or time() - entry.get('time', 0) <= self.max_age)
+            )
+        return result
+
+    def record(self, fingerprint: str, result: TestResult) -> None:
+        """Record RESULT of the test of FINGERPRINT"""
+        self.save(fingerprint, {'time': time(), **result.to_dict()})
+
+
+if __name__ == '__main__':
+    warning_not_intended_for_cmd()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+#
+# Checking module
+#
+# This is responsible for check the syntax of tests files
+# without running them, the Batspp syntax with the lexer and
+# parser, and the generated script with 'bash -n'.
+#
+# Parsing stops at the first error, so to collect all the
+# errors of a file, the block of each error is blanked and
+# the file is parsed again, the same is done with the tests
+# of the errors found by bash, lines are kept so these match
+# the lines of the file.
+#
+
+
+"""
+Checking module
+
+This is responsible for check the syntax of tests
+files without running them, with the lexer and
+parser, and 'bash -n' for the generated script
+"""
+
+
+# Standard packages
+from concurrent.futures import ProcessPoolExecutor
+from os import cpu_count as os_cpu_count
+from re import (
+    compile as re_compile,
+    MULTILINE as re_MULTILINE,
+    )
+from subprocess import run, PIPE
+
+# Installed packages
+from mezcla import debug
+
+# Local packages
+from batspp._lexer import Lexer
+from batspp._parser import Parser
+from batspp._interpreter import Interpreter
+from batspp.batspp_opts import BatsppOpts
+from batspp.batspp_args import BatsppArgs
+from batspp.batspp_pipeline import resolve_args_opts, read_tests
+from batspp._exceptions import (
+    BatsppError, warning_not_intended_for_cmd,
+    )
+
+
+# Constants
+#
+# Files with more errors are not checked further
+MAX_ERRORS = 50
+BASH_ERROR_PATTERN = re_compile(r'^bash: line (\d+): (.*)$', re_MULTILINE)
+ASSERTION_PATTERN = re_compile(r'^\t# Assertion of line (\d+)$')
+
+# Bats tests are not valid bash, so
+# these are checked as functions
+BATS_TEST_PATTERN = re_compile(r'^@test .* \{$', re_MULTILINE)
+BATS_TEST_FUNCTION = 'function batspp_test () {'
+
+
+def build_error(file: str, message: str, line: 'int|None' = None, column: 'int|None' = None) -> dict:
+    """Return error entry of FILE with MESSAGE at LINE and COLUMN (if any)"""
+    return {'file': file, 'line': line, 'column': column, 'message': message}
+
+
+def blank_block(lines: list, line: int) -> bool:
+    """
+    Blank the block of LINES (separated by empty lines) having the 1-based LINE,
+    returns whether something was blanked, so checks can continue after it
+    """
+    index = line - 1
+    if not 0 <= index < len(lines) or not lines[index].strip():
+        return False
+    start, end = index, index
+    while start > 0 and lines[start - 1].strip():
+        start -= 1
+    while end + 1 < len(lines) and lines[end + 1].strip():
+        end += 1
+    lines[start:end + 1] = [''] * (end + 1 - start)
+    return True
+
+
+def check_batspp(file: str, text: str, opts: BatsppOpts, errors: list):
+    """
+    Return abstract syntax tree of Batspp tests TEXT of FILE, without the blocks with errors,
+    which are appended to ERRORS, returns None if the file cannot be checked further
+    """
+    lines = text.split('\n')
+    while len(errors) < MAX_ERRORS:
+        try:
+            tokens = Lexer().tokenize('\n'.join(lines), opts.embedded_tests)
+            return Parser().parse(tokens, opts.embedded_tests)
+        except BatsppError as exc:
+            errors.append(build_error(file, exc.message or str(exc), line=exc.line, column=exc.column))
+            if not exc.line or not blank_block(lines, exc.line):
+                break
+    return None
+
+
+def locate_line(lines: list, line: int, tests_lines: list) -> tuple:
+    """
+    Return (tests file line, start, end) of the generated LINE of LINES: the line
+    of the assertion or test having it, and the lines of its test (1-based)
+    """
+    start = line
+    while start > 1 and not lines[start - 1].startswith(BATS_TEST_FUNCTION):
+        start -= 1
+    if not lines[start - 1].startswith(BATS_TEST_FUNCTION):
+        return None, None, None
+    end = start
+    while end < len(lines) and lines[end - 1] != '}':
+        end += 1
+    if line > end:
+        return None, None, None
+
+    # Assertions are preceded by a comment with their line
+    number = sum(1 for text in lines[:start - 1] if text.startswith(BATS_TEST_FUNCTION))
+    result = tests_lines[number] if number < len(tests_lines) else None
+    for text in lines[start:line]:
+        match = ASSERTION_PATTERN.match(text)
+        result = int(match.group(1)) if match else result
+    return result, start, end
+
+
+def check_syntax(lines: list) -> 'tuple|None':
+    """Return (line, message) of the first syntax error of bash script LINES, or None if valid"""
+    process = run(['bash', '-n'], input='\n'.join(lines), stdout=PIPE, stderr=PIPE, text=True, check=False)
+    if not process.returncode:
+        return None
+    match = BASH_ERROR_PATTERN.search(process.stderr)
+    return (int(match.group(1)), match.group(2)) if match else (None, process.stderr.strip())
+
+
+def check_bash(file: str, content: str, tests_lines: list, errors: list) -> None:
+    """
+    Check the syntax of generated CONTENT of FILE with 'bash -n', the errors are appended
+    to ERRORS with the line of their assertion in the tests file, using TESTS_LINES
+    """
+    lines = BATS_TEST_PATTERN.sub(BATS_TEST_FUNCTION, content).split('\n')
+    while len(errors) < MAX_ERRORS:
+        syntax_error = check_syntax(lines)
+        if not syntax_error:
+            break
+        line, message = syntax_error
+        line, start, end = locate_line(lines, line, tests_lines) if line else (None, None, None)
+
+        # Errors like unclosed quotes are reported at the end of the
+        # script, so these are located by checking each test alone
+        if not start:
+            for start in [number for number, text in enumerate(lines, 1) if text.startswith(BATS_TEST_FUNCTION)]:
+                test_error = check_syntax(lines[start - 1:locate_line(lines, start, tests_lines)[2]])
+                if test_error:
+                    line, message = test_error
+                    line, start, end = locate_line(lines, start - 1 + (line or 1), tests_lines)
+                    break
+            else:
+                start = None
+        errors.append(build_error(file, f'bash: {message}', line=line))
+        if not start:
+            break
+
+        # The test with the error is kept as an empty function
+        lines[start:end - 1] = ['\t:' if index == start else '' for index in range(start, end - 1)]
+
+
+def check_file(
+        file: str,
+        args: 'BatsppArgs|None' = None,
+        opts: 'BatsppOpts|None' = None,
+        ) -> list:
+    """
+    Return the syntax errors of tests FILE with ARGS and OPTS, a dict for each
+    error with its file, line and column (if known) and message
+    """
+    args, opts = resolve_args_opts(file, args or BatsppArgs(), opts or BatsppOpts())
+    result = []
+    try:
+        tree = check_batspp(file, read_tests(file), opts, result)
+        if tree is not None and tree.tests:
+            interpreter = Interpreter()
+            content = interpreter.interpret(tree, opts=opts, args=args)
+            check_bash(file, content, interpreter.tests_lines, result)
+    # NOTE: files can also fail to be read or generated
+    except Exception as exc:  # pylint: disable=broad-except
+        result.append(build_error(file, str(exc)))
+    debug.trace(7, f'checking.check_file({file}) => {len(result)} errors')
+    return result
+
+
+def check_files(
+        files: list,
+        args: 'BatsppArgs|None' = None,
+        opts: 'BatsppOpts|None' = None,
+        workers: int = 0,
+        ):
+    """
+    Check the syntax of FILES on a pool of WORKERS processes (the number of
+    CPUs by default), generator of (file, errors) in the order of FILES
+    """
+    args, opts = args or BatsppArgs(), opts or BatsppOpts()
+    count = len(files)
+
+    # NOTE: a single file is checked faster than starting a pool
+    if count < 2:
+        for file in files:
+            yield file, check_file(file, args=args, opts=opts)
+        return
+    workers = workers or os_cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=min(workers, count)) as executor:
+        results = executor.map(
+            check_file, files, [args] * count, [opts] * count,
+            chunksize=max(1, count // (workers * 4)),
+            )
+        yield from zip(files, results)
+
+
+if __name__ == '__main__':
+    warning_not_intended_for_cmd()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+#
+# Coverage module
+#
+# This is responsible for collect the coverage of the sources of
+# tests files with kcov, running the generated tests of each file
+# under kcov in parallel, each one on its own output directory,
+# which are merged into one report at the end.
+#
+# The files of bats and the generated tests are excluded
+# from the reports, so only the sources are covered.
+#
+
+
+"""
+Coverage module
+
+This is responsible for collect the coverage of the
+sources of tests files with kcov, running each file in
+parallel, and merging their reports into one
+"""
+
+
+# Standard packages
+from concurrent.futures import ThreadPoolExecutor
+from glob import glob
+from json import loads as json_loads
+from os import (
+    cpu_count as os_cpu_count,
+    makedirs as os_makedirs,
+    path as os_path,
+    )
+from shlex import split as shlex_split
+from shutil import which
+from subprocess import run, PIPE, STDOUT
+from tempfile import TemporaryDirectory, gettempdir
+
+# Installed packages
+from mezcla import debug
+from mezcla import glue_helpers as gh
+
+# Local packages
+from batspp._settings import BATS_EXTENSION
+from batspp._tap import TapParser, FAILED, build_missing_results, get_exit_diagnostics
+from batspp.batspp_opts import BatsppOpts
+from batspp.batspp_args import BatsppArgs
+from batspp.batspp_pipeline import resolve_args_opts
+from batspp._exceptions import (
+    error, warning_not_intended_for_cmd,
+    )
+
+
+# Constants
+KCOV = 'kcov'
+PARTS_DIR = 'parts'
+MERGED_DIR = 'kcov-merged'
+COVERAGE_JSON = 'coverage.json'
+
+
+def get_exclude_patterns(generated_dir: str = '') -> list:
+    """
+    Return kcov patterns excluding the files of bats, its runs folders,
+    and the GENERATED_DIR of the generated tests (if any)
+    """
+    result = ['/usr/lib/', gh.form_path(gettempdir(), 'bats-run')]
+    bats = which('bats')
+    if bats:
+        prefix = gh.dir_path(gh.dir_path(os_path.realpath(bats)))
+        result += [gh.form_path(prefix, 'libexec', 'bats-core'), gh.form_path(prefix, 'lib', 'bats-core')]
+    if generated_dir:
+        result.append(generated_dir)
+    return result
+
+
+def build_kcov_command(output_dir: str, bats_file: str, run_opts: str = '', exclude: 'list|None' = None) -> list:
+    """Return command running BATS_FILE with RUN_OPTS under kcov, writing its report to OUTPUT_DIR"""
+    result = [KCOV]
+    if exclude:
+        result.append(f'--exclude-pattern={",".join(exclude)}')
+    result += [output_dir, 'bats'] + shlex_split(run_opts or '') + [bats_file]
+    return result
+
+
+def run_kcov(command: list, sudo: bool = False) -> tuple:
+    """Run kcov COMMAND, returns its exit status (the one of bats) and the lines of the output of bats"""
+    process = run((['sudo'] if sudo else []) + command, stdout=PIPE, stderr=STDOUT, text=True, check=False)
+    debug.trace(7, f'coverage.run_kcov({command}) => {process.returncode}')
+    return process.returncode, process.stdout.splitlines()
+
+
+def parse_kcov_output(status: int, lines: list, tests_lines: list, tests_names: list) -> list:
+    """
+    Return results of the tests of TESTS_LINES (named by TESTS_NAMES) on the output LINES
+    of kcov, the tests without result are failed with the output if kcov exited with STATUS
+    """
+    parser = TapParser(source_lines=tests_lines, measure=False)
+    result = list(parser.parse(lines))
+    if status:
+        result += build_missing_results(
+            tests_lines, {test.number for test in result},
+            status = FAILED,
+            diagnostics = get_exit_diagnostics(status, parser.unparsed),
+            tests_names = tests_names,
+            )
+    return result
+
+
+def merge_reports(output_dir: str, parts: list) -> str:
+    """Merge kcov reports of PARTS folders into OUTPUT_DIR, returns folder of the merged report"""
+    process = run([KCOV, '--merge', output_dir] + parts, stdout=PIPE, stderr=STDOUT, text=True, check=False)
+    if process.returncode:
+        error(f'cannot merge coverage reports: {process.stdout.strip()}')
+    return gh.form_path(output_dir, MERGED_DIR)
+
+
+def load_summary(report_dir: str) -> list:
+    """
+    Return coverage of each source file of the kcov report at REPORT_DIR, a dict with
+    its file, covered and total lines and percentage, sorted by file
+    """
+    paths = glob(gh.form_path(report_dir, COVERAGE_JSON)) or glob(gh.form_path(report_dir, '*', COVERAGE_JSON))
+    if not paths:
+        return []
+    with open(paths[0], encoding='utf-8') as report:
+        data = json_loads(report.read())
+    result = sorted(
+        (
+            {
+                'file': entry['file'],
+                'covered': int(entry.get('covered_lines', 0)),
+                'total': int(entry.get('total_lines', 0)),
+                'percent': float(entry.get('percent_covered', 0)),
+                }
+            for entry in data.get('files', [])
+            ),
+        key=lambda entry: entry['file'],
+        )
+    return result
+
+
+def format_summary(summary: list) -> str:
+    """Return SUMMARY of coverage as TAP comments, a line for each file and the total"""
+    covered = sum(entry['covered'] for entry in summary)
+    total = sum(entry['total'] for entry in summary)
+    lines = [
+        f'# coverage {entry["percent"]:6.2f}% {entry["covered"]:>5}/{entry["total"]:<5} {entry["file"]}'
+        for entry in summary
+        ]
+    lines.append(f'# coverage {100 * covered / total if total else 0:6.2f}% {covered:>5}/{total:<5} total')
+    return '\n'.join(lines)
+
+
+def run_coverage(
+        test,
+        files: list,
+        output_dir: str,
+        args: BatsppArgs = BatsppArgs(),
+        opts: BatsppOpts = BatsppOpts(),
+        jobs: int = 0,
+        ):
+    """
+    Run Batspp test FILES under kcov with TEST (a BatsppTest), up to JOBS files at once (the
+    number of CPUs by default), generator of TestResult grouped by file, the report of each
+    file is written to its own folder of OUTPUT_DIR, and these are merged at the end
+    """
+    assert files, 'Files cannot be empty'
+    if not which(KCOV):
+        error(f'{KCOV} is required to collect coverage, see https://github.com/SimonKagstrom/kcov')
+
+    parts_dir = gh.form_path(output_dir, PARTS_DIR)
+    os_makedirs(parts_dir, exist_ok=True)
+    with TemporaryDirectory(prefix='batspp-') as temp_dir:
+        exclude = get_exclude_patterns(temp_dir)
+
+        # Files are transpiled first, each one is run on its own kcov
+        commands, tests_lines, tests_names, sudos = [], [], [], []
+        for number, file in enumerate(files, start=1):
+            file_args, file_opts = resolve_args_opts(file, args, opts)
+            bats_file = gh.form_path(temp_dir, f'{number}_{gh.basename(file)}.{BATS_EXTENSION}')
+            test.transpile_and_save_bats(file, bats_file, args=file_args, opts=file_opts)
+            command = build_kcov_command(gh.form_path(parts_dir, str(number)), bats_file, args.run_opts, exclude)
+            commands.append(command)
+            tests_lines.append(list(test.interpreter.tests_lines))
+            tests_names.append(list(test.interpreter.tests_names))
+            sudos.append(test.interpreter.sudo_required)
+
+        # Results are renumbered after the tests of the previous files
+        offset = 0
+        with ThreadPoolExecutor(max_workers=jobs or os_cpu_count() or 1) as executor:
+            outputs = executor.map(run_kcov, commands, sudos)
+            for file, file_lines, file_names, (status, lines) in zip(files, tests_lines, tests_names, outputs):
+                for result in parse_kcov_output(status, lines, file_lines, file_names):
+                    result.number += offset
+                    result.file = file
+                    yield result
+                offset += len(file_lines)
+
+    merge_reports(output_dir, [gh.form_path(parts_dir, str(number)) for number in range(1, len(files) + 1)])
+
+
+if __name__ == '__main__':
+    warning_not_intended_for_cmd()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+#
+# Discovery module
+#
+# This is responsible for discover the tests files of a
+# folder, and transpile them on a process pool.
+#
+# Scripts are candidates only if a byte scan finds lines
+# like embedded tests, so most scripts are not lexed.
+#
+
+
+"""
+Discovery module
+
+This is responsible for discover the tests files
+of a folder, and transpile them on a process pool
+"""
+
+
+# Standard packages
+from concurrent.futures import ProcessPoolExecutor
+from fnmatch import fnmatch
+from os import (
+    cpu_count as os_cpu_count,
+    path as os_path,
+    walk as os_walk,
+    )
+from re import (
+    compile as re_compile,
+    MULTILINE as re_MULTILINE,
+    )
+from time import monotonic
+
+# Installed packages
+from mezcla import debug
+from mezcla import glue_helpers as gh
+
+# Local packages
+from batspp._settings import BATSPP_EXTENSION, IPYNB_EXTENSION, BATS_EXTENSION
+from batspp.batspp_opts import BatsppOpts
+from batspp.batspp_args import BatsppArgs
+from batspp.batspp_pipeline import Transpilation, transpile_file
+from batspp._exceptions import (
+    warning_not_intended_for_cmd,
+    )
+
+
+# Constants
+#
+# Scripts with embedded tests have commented commands
+# ('# $ command') or arrow assertions ('# function => value')
+TESTS_EXTENSIONS = [BATSPP_EXTENSION, IPYNB_EXTENSION]
+SCRIPTS_EXTENSIONS = ['bash', 'sh']
+EMBEDDED_TESTS_PATTERN = re_compile(rb'^# *(?:\$|.*=>)', re_MULTILINE)
+
+# Hidden folders (e.g. .git) are not discovered by default
+DEFAULT_EXCLUDE = ['.*']
+
+
+def has_embedded_tests(path: str) -> bool:
+    """Whether the script at PATH has lines like embedded tests, without lexing it"""
+    try:
+        with open(path, 'rb') as script:
+            return bool(EMBEDDED_TESTS_PATTERN.search(script.read()))
+    except OSError:
+        return False
+
+
+def matches(path: str, patterns: list) -> bool:
+    """Whether relative PATH or its name matches some glob of PATTERNS"""
+    return any(fnmatch(path, pattern) or fnmatch(gh.basename(path), pattern) for pattern in patterns)
+
+
+def discover_files(
+        directory: str,
+        include: 'list|None' = None,
+        exclude: 'list|None' = None,
+        ) -> list:
+    """
+    Return the tests files under DIRECTORY sorted by path: Batspp tests and notebooks,
+    and scripts with embedded tests, only the ones matching some INCLUDE glob (if any)
+    and none of EXCLUDE globs (hidden by default), which also prune folders
+    """
+    exclude = DEFAULT_EXCLUDE if exclude is None else exclude
+    result = []
+    for folder, folders, files in os_walk(directory):
+        relative_folder = os_path.relpath(folder, directory)
+        folders[:] = sorted(
+            name for name in folders
+            if not matches(os_path.normpath(os_path.join(relative_folder, name)), exclude)
+            )
+        for name in sorted(files):
+            relative = os_path.normpath(os_path.join(relative_folder, name))
+            if (include and not matches(relative, include)) or matches(relative, exclude):
+                continue
+            extension = name.rpartition('.')[2]
+            path = os_path.join(folder, name)
+            if extension in TESTS_EXTENSIONS or (extension in SCRIPTS_EXTENSIONS and has_embedded_tests(path)):
+                result.append(path)
+    debug.trace(7, f'discovery.discover_files({directory}) => {result}')
+    return result
+
+
+def timed_transpile(file: str, args: BatsppArgs, opts: BatsppOpts, cells_cache = None) -> tuple:
+    """Return the (transpilation or exception, seconds) of FILE, so errors are reported by file"""
+    start = monotonic()
+    try:
+        result = transpile_file(file, args=args, opts=opts, cells_cache=cells_cache)
+    except Exception as exc:  # pylint: disable=broad-except
+        result = exc
+    return result, monotonic() - start
+
+
+def transpile_files(
+        files: list,
+        args: BatsppArgs,
+        opts: BatsppOpts,
+        workers: int = 0,
+        cells_cache = None,
+        ):
+    """
+    Transpile FILES on a pool of WORKERS processes (the number of CPUs by default),
+    generator of (file, transpilation or exception, seconds) in the order of FILES,
+    the unchanged cells of notebooks are taken from CELLS_CACHE (if any, a Cache)
+    """
+    if not files:
+        return
+    count = len(files)
+    workers = workers or os_cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # NOTE: files are sent in chunks, as most are transpiled quickly
+        results = executor.map(
+            timed_transpile, files, [args] * count, [opts] * count, [cells_cache] * count,
+            chunksize=max(1, count // (workers * 4)),
+            )
+        for file, (result, seconds) in zip(files, results):
+            yield file, result, seconds
+
+
+def get_mirror_path(file: str, directory: str, output_dir: str) -> str:
+    """
+    Return path of the generated tests of FILE under OUTPUT_DIR, mirroring its
+    path relative to DIRECTORY, files outside it are saved by name, the extension
+    of scripts is kept (e.g. lib/util.sh => lib/util.sh.bats) to avoid collisions
+    """
+    relative = os_path.relpath(file, directory)
+    if relative.startswith('..'):
+        relative = gh.basename(file)
+    base, extension = os_path.splitext(relative)
+    if extension[1:] in TESTS_EXTENSIONS:
+        relative = base
+    return gh.form_path(output_dir, f'{relative}.{BATS_EXTENSION}')
+
+
+if __name__ == '__main__':
+    warning_not_intended_for_cmd()
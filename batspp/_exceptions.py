@@ -19,6 +19,25 @@ import sys
 ## NOTE: this is empty for now
 
 
+class BatsppError(Exception):
+    """
+    Exception with the MESSAGE, LINE and COLUMN (if any) of
+    the error, so these can be reported without parsing the text
+    """
+
+    def __init__(
+            self,
+            text:str,
+            message:str='',
+            line:int=None,
+            column:int=None,
+            ) -> None:
+        super().__init__(text)
+        self.message = message
+        self.line = line
+        self.column = column
+
+
 def error(
         message:str='',
         text_line:str='',
@@ -33,7 +52,7 @@ def error(
     output += f'\nline {line}: {text_line}' if text_line and line else ''
     output += f'\n             {" " * column}^' if column else ''
 
-    raise Exception(output)
+    raise BatsppError(output, message=message, line=line, column=column)
 
 
 def warning(message: str) -> None:
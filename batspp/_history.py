@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+#
+# History module
+#
+# This is responsible for keep the history of the last
+# status and duration of each test, and reorder tests
+# by it, e.g. previously failing tests first
+#
+
+
+"""
+History module
+
+This is responsible for keep the history of the last
+status and duration of each test, and reorder tests by it
+"""
+
+
+# Standard packages
+from os import (
+    getpid as os_getpid,
+    path as os_path,
+    replace as os_replace,
+    )
+
+# Installed packages
+from mezcla import debug
+
+# Local packages
+from batspp._tap import JsonReporter, FAILED, SKIPPED
+from batspp._sharding import read_results, estimate_durations
+from batspp._exceptions import (
+    warning_not_intended_for_cmd,
+    )
+
+
+# Constants
+#
+# Tests ordering keys, these are applied
+# in the given order, ties keep the source order
+FAILED_FIRST = 'failed'
+SLOWEST_FIRST = 'slowest'
+ORDER_KEYS = [FAILED_FIRST, SLOWEST_FIRST]
+
+
+def load_history(path: str) -> dict:
+    """Load history at PATH as a {(file, name): TestResult} dict, empty if it doesn't exist"""
+    result = {}
+    if os_path.isfile(path):
+        for test_result in read_results(path):
+            result[(test_result.file, test_result.name)] = test_result
+    debug.trace(7, f'history.load_history({path}) => {len(result)} tests')
+    return result
+
+
+def update_history(path: str, results: list) -> None:
+    """
+    Update history at PATH with the last RESULTS, skipped tests keep
+    their previous entry, the history is replaced atomically
+    """
+    history = load_history(path)
+    for result in results:
+        if result.status != SKIPPED:
+            history[(result.file, result.name)] = result
+    temp_path = f'{path}.{os_getpid()}.tmp'
+    reporter = JsonReporter(temp_path)
+    for result in history.values():
+        reporter.write(result)
+    reporter.close()
+    os_replace(temp_path, path)
+
+
+def order_tests(tests: list, file: str, history: dict, keys: list) -> list:
+    """
+    Return TESTS of FILE ordered by their HISTORY, using the ordering KEYS:
+    'failed' puts previously failing tests first, and 'slowest' the longest tests
+    first, tests without history are estimated with the mean of the known durations
+    """
+    assert all(key in ORDER_KEYS for key in keys), f'Ordering keys must be some of {ORDER_KEYS}'
+    entries = [history.get((file, test.reference)) for test in tests]
+    durations = estimate_durations([entry.duration if entry else None for entry in entries])
+
+    def sort_key(index):
+        result = []
+        for key in keys:
+            if key == FAILED_FIRST:
+                result.append(0 if entries[index] and entries[index].status == FAILED else 1)
+            elif key == SLOWEST_FIRST:
+                result.append(-durations[index])
+        return result
+
+    # NOTE: sorted is stable, so ties keep the source order
+    order = sorted(range(len(tests)), key=sort_key)
+    debug.trace(7, f'history.order_tests({file}, {keys}) => {order}')
+    return [tests[index] for index in order]
+
+
+if __name__ == '__main__':
+    warning_not_intended_for_cmd()
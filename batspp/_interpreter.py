@@ -17,7 +17,12 @@ bats-core tests from abstract syntax trees for Batspp
 
 
 # Standard packages
-from re import sub as re_sub
+from copy import copy
+from re import (
+    compile as re_compile,
+    sub as re_sub,
+    )
+from hashlib import sha256
 
 # Installed packages
 from mezcla import debug
@@ -42,8 +47,17 @@ from batspp._exceptions import (
 VERBOSE_DEBUG = 'VERBOSE_DEBUG'
 TEMP_DIR = 'TEMP_DIR'
 COPY_DIR = 'COPY_DIR'
+FIXTURES_DIR = 'FIXTURES_DIR'
+FIXTURES_EXTENSION = 'fixtures'
+CAPTURE_FUNCTION = 'capture_digest'
+TIMEOUT_FUNCTION = 'timed_eval'
+DEADLINE_FUNCTION = 'check_deadline'
+TIMEOUT_GRACE = 5
 SETUP_FUNCTION = 'run_setup'
 TEARDOWN_FUNCTION = 'run_teardown'
+BUNDLE_SEPARATOR = ' :: '
+DEFAULT_TEMP_DIR = '${TMP:-/tmp}/batspp-$$'
+SUDO_PATTERN = re_compile(r'\bsudo\b')
 
 
 class NodeVisitor:
@@ -74,7 +88,16 @@ class Interpreter(NodeVisitor):
         self.opts = BatsppOpts()
         self.args = BatsppArgs()
         self.last_title = ''
+        self.last_timeout = 0
+        self.max_timeout = 0
+        self.tests_lines = []
+        self.tests_names = []
+        self.namespace = ''
+        self.title_prefix = ''
         self.debug_required = False
+        self.capture_required = False
+        self.sudo_required = False
+        self.fixtures = {}
 
     def reset_global_state_variables(self) -> None:
         """Reset global states variables"""
@@ -88,13 +111,18 @@ class Interpreter(NodeVisitor):
 
         # Global setups are formated into a function
         if node.tests:
+            self.sudo_required |= uses_sudo(node.setup_commands)
+            self.sudo_required |= uses_sudo(node.teardown_commands)
             result += build_setup_function(
                 commands = node.setup_commands,
                 test_folder = True,
                 copy_dir = self.args.copy_dir,
+                name = f'{SETUP_FUNCTION}{self.namespace}',
+                global_sources = not self.namespace,
                 )
             result += build_teardown_function(
                 commands = node.teardown_commands,
+                name = f'{TEARDOWN_FUNCTION}{self.namespace}',
                 )
 
         # Visit tests nodes
@@ -110,20 +138,36 @@ class Interpreter(NodeVisitor):
         """
 
         self.last_title = node.reference
+        self.last_timeout = node.timeout if node.timeout else self.args.timeout
+        self.max_timeout = max(self.max_timeout, self.last_timeout)
+        self.tests_lines.append(node.data.line)
+        self.tests_names.append(f'{self.title_prefix}{self.last_title}')
 
         # Test header
         result = (
-            f'@test "{self.last_title}" {{\n'
-            f'\t{SETUP_FUNCTION} "{flatten_str(self.last_title)}"\n'
+            f'@test "{self.title_prefix}{self.last_title}" {{\n'
+            f'\t{SETUP_FUNCTION}{self.namespace} "{flatten_str(self.last_title)}"\n'
             )
 
+        # Assertions share the deadline of the test
+        if self.last_timeout:
+            result += (
+                f'\ttest_deadline=$((SECONDS + {self.last_timeout}))\n'
+                '\ttimeout_flag="${BATS_TEST_TMPDIR:-$BATS_TMPDIR}/timeout_$BATS_TEST_NUMBER"\n'
+                )
+
         # Visit assertions
         result += ''.join([self.visit(asn) for asn in node.assertions])
 
+        # The test fails if its deadline was exceeded
+        # (i.e. by the last setup commands), before the teardown
+        if self.last_timeout:
+            result += f'\n\t{DEADLINE_FUNCTION} {node.data.line}\n'
+
         # Test footer
         result += (
             '\n'
-            f'\t{TEARDOWN_FUNCTION}\n'
+            f'\t{TEARDOWN_FUNCTION}{self.namespace}\n'
             '}\n\n'
             )
 
@@ -152,31 +196,104 @@ class Interpreter(NodeVisitor):
         actual_commands = build_commands_block(node.actual, indent='', multiline_last_char='')
         expected_text = ''.join(f'{text}\n' for text in node.expected).rstrip()
         expected_text += '' if expected_text.endswith('\n') else '\n'
-        expected_text = repr(expected_text)
+        expected_data = expected_text.encode()
+
+        # Command outputs can be captured up to a limit of bytes,
+        # the rest is reduced to its size and hash by the digest
+        if self.args.capture_limit:
+            actual_commands = f' ( {actual_commands} ) | {CAPTURE_FUNCTION} {self.args.capture_limit}'
+            expected_data = build_expected_digest(expected_data, self.args.capture_limit)
+            self.capture_required = True
+
+        # Commands of tests with timeout are evaluated
+        # on a process group killed after the deadline
+        if self.last_timeout:
+            actual_commands = (
+                f'{TIMEOUT_FUNCTION} "$((test_deadline - SECONDS))"'
+                f' {node.data.line} {quote_single(actual_commands)}'
+                )
+
+        # Large expected outputs are stored out-of-line
+        # on a fixture file and compared byte per byte
+        fixture = ''
+        if (self.args.fixtures_threshold
+            and node.atype is not AssertionType.NOT_EQUAL
+            and len(expected_data) > self.args.fixtures_threshold):
+            fixture = self.push_fixture(expected_data.rstrip(b'\n') + b'\n')
+
+        # Only truncated digests need to be quoted byte per byte
+        if expected_data == expected_text.encode():
+            expected_text = repr(expected_text)
+        else:
+            expected_text = quote_bytes(expected_data)
 
         # Set debug
         debug_cmd = ''
         if not self.opts.omit_trace:
-            debug_cmd = (
-                f'\tprint_debug "$({actual_commands})" "$(echo -e {expected_text})"\n'
-                )
+            if fixture:
+                debug_cmd = (
+                    f'\tprint_debug_fixture "$({actual_commands})" "{fixture}"\n'
+                    )
+            else:
+                debug_cmd = (
+                    f'\tprint_debug "$({actual_commands})" "$(echo -e {expected_text})"\n'
+                    )
+
+        # Set assertion
+        #
+        # NOTE: printf '%s\n' "$(...)" normalizes trailing newlines
+        #       the same way as the inline comparison does.
+        assertion = ''
+        if fixture:
+            assertion = f'cmp -s <(printf \'%s\\n\' "$({actual_commands})") "{fixture}"'
+        else:
+            assertion = f'[ "$({actual_commands})" {operator} "$(echo -e {expected_text})" ]'
+
+        # Commands that timed out on the debug trace are not evaluated
+        # again, so the timeout is reported once with the elapsed time
+        if self.last_timeout and debug_cmd:
+            assertion = f'[ -e "$timeout_flag" ] || {assertion}'
+        assertion = f'\t{assertion}\n'
+
+        # Setup commands are not evaluated with the deadline (these can set
+        # variables), so the test fails if these took it, before the assertion
+        deadline = f'\t{DEADLINE_FUNCTION} {node.data.line}\n' if self.last_timeout else ''
 
         # Unify everything
         result = (
             f'\n\t# Assertion of line {node.data.line}\n'
             f'{setup}'
+            f'{deadline}'
             '\tshopt -s expand_aliases\n'
             f'{debug_cmd}'
-            f'\t[ "$({actual_commands})" {operator} "$(echo -e {expected_text})" ]\n'
+            f'{assertion}'
             )
 
+        # A timeout must fail the test even if the partial output matches
+        if self.last_timeout:
+            result += '\t[ ! -e "$timeout_flag" ]\n'
+
         # Check global class option to
         # later implement a debug function
         self.debug_required = True
+        self.sudo_required |= uses_sudo(node.setup_commands) or uses_sudo(node.actual)
 
         debug.trace(7, f'interpreter.visit_Assertion(node={node}) => {result}')
         return result
 
+    def push_fixture(self, data: bytes) -> str:
+        """
+        Push expected DATA to the fixtures to be saved
+        next to the tests file, returns the fixture path
+        """
+        # Fixtures are content-addressed, so equal
+        # expected outputs are saved only one time
+        name = f'{sha256(data).hexdigest()[:16]}.txt'
+        self.fixtures[name] = data
+        result = f'${FIXTURES_DIR}/{name}'
+        debug.trace(7, f'Interpreter.push_fixture() => {result}')
+        return result
+
     def implement_constants(self):
         """Implement test constants from arguments"""
 
@@ -206,13 +323,25 @@ class Interpreter(NodeVisitor):
                 value = '| hexdump -C'
             constants += f'{VERBOSE_DEBUG}="{value}"\n'
 
-        # Append TEMP_DIR constant
-        value = self.args.temp_dir if self.args.temp_dir else '/tmp'
+        # Append TEMP_DIR constant, by default this is resolved
+        # when running, so generated tests are reproducible
+        value = self.args.temp_dir if self.args.temp_dir else DEFAULT_TEMP_DIR
         constants += f'{TEMP_DIR}="{value}"\n'
 
         # Append COPY_DIR constant
         constants += f'{COPY_DIR}="{self.args.copy_dir}"\n' if self.args.copy_dir else ''
 
+        # Append FIXTURES_DIR constant, this is resolved
+        # when running to the folder next to the tests file
+        if self.fixtures:
+            constants += f'{FIXTURES_DIR}="${{BATS_TEST_FILENAME%.bats}}.{FIXTURES_EXTENSION}"\n'
+
+        # Append BATS_TEST_TIMEOUT constant, this is a backstop for
+        # setup commands, which are not evaluated with a deadline,
+        # also needed by the timeouts of tests directives
+        if self.max_timeout:
+            constants += f'BATS_TEST_TIMEOUT="{self.max_timeout + TIMEOUT_GRACE}"\n'
+
         # Add header comment
         result = f'# Constants\n{constants}\n' if constants else ''
 
@@ -253,29 +382,63 @@ class Interpreter(NodeVisitor):
         self.opts = opts
         self.args = args
 
-        # Append commands passed by arguments
-        # (not in test file) to a setup global
+        result = self.implement_tests_file(self.visit_tree(tree))
+
+        debug.trace(7, f'Interpreter.interpret() => "{result}"')
+        return result
+
+    def interpret_bundle(
+            self,
+            suites: list,
+            opts: BatsppOpts = BatsppOpts(),
+            args: BatsppArgs = BatsppArgs(),
+            ) -> str:
+        """
+        Interpret many Batspp abstract syntax trees and build a single tests file,
+        SUITES is a list of (name, tree, args) with the arguments of each tree,
+        these have their own setup and teardown functions and titles prefixed by name
+        """
+
+        self.reset_global_state_variables()
+        self.opts = opts
+
+        tests = ''
+        for number, (name, tree, suite_args) in enumerate(suites, start=1):
+            self.args = suite_args
+            self.namespace = f'_{number}'
+            self.title_prefix = f'{name}{BUNDLE_SEPARATOR}'
+            tests += self.visit_tree(tree)
+        self.args = args
+        self.namespace, self.title_prefix = '', ''
+
+        # NOTE: bundles without tests are still valid tests files
+        result = self.implement_tests_file(tests) or build_header(args.run_opts)
+
+        debug.trace(7, f'Interpreter.interpret_bundle() => "{result}"')
+        return result
+
+    def visit_tree(self, tree: TestsSuite) -> str:
+        """Visit abstract syntax TREE, adding the setup commands from arguments"""
+
+        # Append commands passed by arguments (not in test
+        # file) to a setup global, the tree is not modified
         args_commands = self.get_args_commands()
         if args_commands:
-            tree.setup_commands += args_commands
+            tree = copy(tree)
+            tree.setup_commands = tree.setup_commands + args_commands
 
         # Visit abstract syntax tree nodes
-        tests = self.visit(tree)
+        return self.visit(tree)
+
+    def implement_tests_file(self, tests: str) -> str:
+        """Implement tests file content around TESTS"""
 
         # Add aditional content
         result = ''
 
         if tests:
             # Add tests header
-            result += (
-                '#!/usr/bin/env bats'
-                f'{" " if self.args.run_opts else ""}'
-                f'{self.args.run_opts}\n'
-                '#\n'
-                '# This test file was generated using Batspp\n'
-                '# https://github.com/LimaBD/batspp\n'
-                '#\n\n'
-                )
+            result += build_header(self.args.run_opts)
 
             result += self.implement_constants()
 
@@ -285,11 +448,39 @@ class Interpreter(NodeVisitor):
             # Add implement debug
             if self.debug_required and not self.opts.omit_trace:
                 result += build_debug_function()
+                if self.fixtures:
+                    result += build_debug_fixture_function()
+
+            # Add capture function
+            if self.capture_required:
+                result += build_capture_function()
+
+            # Add timeout function
+            if self.max_timeout:
+                result += build_timeout_function()
 
-        debug.trace(7, f'Interpreter.interpret() => "{result}"')
         return result
 
 
+def build_header(run_opts: str = '') -> str:
+    """Build tests file header, with the bats RUN_OPTS on the shebang"""
+    result = (
+        '#!/usr/bin/env bats'
+        f'{" " if run_opts else ""}'
+        f'{run_opts}\n'
+        '#\n'
+        '# This test file was generated using Batspp\n'
+        '# https://github.com/LimaBD/batspp\n'
+        '#\n\n'
+        )
+    return result
+
+
+def uses_sudo(commands: list) -> bool:
+    """Whether any of COMMANDS runs sudo, so the tests must be run by root"""
+    return any(SUDO_PATTERN.search(command) for command in commands or [])
+
+
 def flatten_str(string: str) -> str:
     """Returns unspaced and lowercase STRING"""
     result = re_sub(r' +', '-', string.lower())
@@ -313,10 +504,13 @@ def build_setup_function(
         commands: list = None,
         test_folder: bool = True,
         copy_dir: bool = False,
+        name: str = SETUP_FUNCTION,
+        global_sources: bool = True,
         ) -> str:
     """
-    Build setup function with
-    default commands and specified COMMANDS
+    Build setup function NAME with
+    default commands and specified COMMANDS,
+    sources are moved out of the function if GLOBAL_SOURCES
     """
 
     result = ''
@@ -327,7 +521,7 @@ def build_setup_function(
     for cmd in commands:
         if 'shopt -s expand_aliases' in cmd or 'source ' in cmd:
             sources.append(cmd)
-    if sources:
+    if sources and global_sources:
         commands = list(set(sources) - set(commands))
         result += (
             '# One time global setup\n'
@@ -337,7 +531,7 @@ def build_setup_function(
     result += (
         '# Setup function\n'
         '# $1 -> test name\n'
-        f'function {SETUP_FUNCTION} () {{\n'
+        f'function {name} () {{\n'
         )
 
     if test_folder:
@@ -361,8 +555,11 @@ def build_setup_function(
     return result
 
 
-def build_teardown_function(commands: list) -> str:
-    """Build teardown function"""
+def build_teardown_function(
+        commands: list,
+        name: str = TEARDOWN_FUNCTION,
+        ) -> str:
+    """Build teardown function NAME"""
 
     body = ''
 
@@ -373,7 +570,7 @@ def build_teardown_function(commands: list) -> str:
 
     result = (
         '# Teardown function\n'
-        f'function {TEARDOWN_FUNCTION} () {{\n'
+        f'function {name} () {{\n'
         f'{body}\n'
         '}\n\n'
         )
@@ -403,5 +600,150 @@ def build_debug_function() -> str:
     return result
 
 
+def build_expected_digest(data: bytes, limit: int) -> bytes:
+    """
+    Build the digest of expected DATA as the capture function
+    does with actual outputs larger than LIMIT bytes
+    """
+    result = data[:limit]
+
+    # Only bytes after the limit are hashed, with its trailing
+    # newlines normalized as command substitution does
+    rest = data[limit:].rstrip(b'\n')
+    if rest:
+        rest += b'\n'
+        result += (
+            b'\n'
+            + f'[batspp: output truncated at {limit} of {limit + len(rest)} bytes,'
+              f' sha256 {sha256(rest).hexdigest()}]'.encode()
+            )
+    debug.trace(7, f'interpreter.build_expected_digest({limit}) => {result}')
+    return result
+
+
+def quote_single(text: str) -> str:
+    """Quote TEXT between single quotes for bash"""
+    result = "'" + text.replace("'", "'\\''") + "'"
+    debug.trace(7, f'interpreter.quote_single({text}) => {result}')
+    return result
+
+
+def quote_bytes(data: bytes) -> str:
+    """Quote DATA for echo -e, non printable bytes are escaped as hexadecimal"""
+    result = ''
+    for byte in data:
+        char = chr(byte)
+        if char == '\\':
+            result += '\\\\'
+        elif char.isascii() and char.isprintable() and char != "'":
+            result += char
+        else:
+            result += f'\\x{byte:02x}'
+    result = f"'{result}'"
+    debug.trace(7, f'interpreter.quote_bytes({data}) => {result}')
+    return result
+
+
+def build_debug_fixture_function() -> str:
+    """Build debug function for assertions with expected fixture files"""
+
+    result = (
+        '# This prints debug data when a fixture assertion fail\n'
+        '# $1 -> actual value\n'
+        '# $2 -> expected fixture file\n'
+        'function print_debug_fixture() {\n'
+        '\techo "=======  actual  ======="\n'
+        f'\tbash -c "echo \\\"$1\\\" ${VERBOSE_DEBUG}"\n'
+        '\techo "======= expected ======="\n'
+        f'\tbash -c "cat \\\"$2\\\" ${VERBOSE_DEBUG}"\n'
+        '\techo "========================"\n'
+        '}\n\n'
+        )
+
+    debug.trace(7, 'interpreter.build_debug_fixture_function()')
+    return result
+
+
+def build_capture_function() -> str:
+    """Build function to capture commands output with bounded memory"""
+
+    # The first bytes are kept to be compared exactly, the rest
+    # is streamed through awk (to drop trailing newlines), wc and sha256sum
+    result = (
+        '# This prints the first bytes of stdin, the rest is reduced\n'
+        '# to its size and sha256 hash (without trailing newlines)\n'
+        '# $1 -> number of bytes compared exactly\n'
+        f'function {CAPTURE_FUNCTION} () {{\n'
+        '\tlocal hash_file rest_size fd\n'
+        '\tdd bs="$1" count=1 iflag=fullblock status=none\n'
+        '\thash_file=$(mktemp)\n'
+        '\texec {fd}> >(sha256sum > "$hash_file")\n'
+        '\trest_size=$(LC_ALL=C awk \'{ if ($0 == "") { n++ } else { while (n > 0) { print ""; n-- } print } }\' \\\n'
+        '\t\t| tee "/dev/fd/$fd" | wc -c)\n'
+        '\texec {fd}>&-\n'
+        '\twait $!\n'
+        '\tif [ "$rest_size" -gt 0 ]; then\n'
+        '\t\techo\n'
+        '\t\techo "[batspp: output truncated at $1 of $(( $1 + rest_size )) bytes,'
+        ' sha256 $(cut -d \' \' -f 1 "$hash_file")]"\n'
+        '\tfi\n'
+        '\trm -f "$hash_file"\n'
+        '}\n\n'
+        )
+
+    debug.trace(7, 'interpreter.build_capture_function()')
+    return result
+
+
+def build_timeout_function() -> str:
+    """Build function to evaluate commands with a timeout"""
+
+    # Commands are evaluated on a new process group (set -m), so the
+    # watchdog can kill the whole group, including any children.
+    # The watchdog keeps the stderr on fd 3 to report the timeout
+    result = (
+        '# This evaluates commands in a process group killed after a timeout\n'
+        '# $1 -> timeout in seconds\n'
+        '# $2 -> line of the assertion\n'
+        '# $3 -> commands\n'
+        f'function {TIMEOUT_FUNCTION} () {{\n'
+        '\tlocal start=$SECONDS pid watchdog status\n'
+        '\tset -m\n'
+        '\teval "$3" &\n'
+        '\tpid=$!\n'
+        '\t(\n'
+        '\t\tsleep "$(( $1 > 0 ? $1 : 0 ))"\n'
+        '\t\ttouch "$timeout_flag"\n'
+        '\t\techo "batspp: assertion of line $2 timed out after $((SECONDS - start))s" >&3\n'
+        '\t\tkill -TERM -- "-$pid"\n'
+        '\t\tsleep 1\n'
+        '\t\tkill -KILL -- "-$pid"\n'
+        '\t) 3>&2 > /dev/null 2>&1 &\n'
+        '\twatchdog=$!\n'
+        '\tset +m\n'
+        '\twait "$pid"\n'
+        '\tstatus=$?\n'
+        '\tkill -- "-$watchdog" 2> /dev/null\n'
+        '\treturn "$status"\n'
+        '}\n\n'
+        )
+
+    # Setup commands are evaluated on the test shell, these
+    # are only checked against the deadline after evaluated
+    result += (
+        '# This fails if the deadline of the test is exceeded\n'
+        '# $1 -> line of the assertion or test\n'
+        f'function {DEADLINE_FUNCTION} () {{\n'
+        '\tif (( SECONDS >= test_deadline )); then\n'
+        '\t\techo "batspp: test timed out before line $1" >&2\n'
+        '\t\treturn 1\n'
+        '\tfi\n'
+        '}\n\n'
+        )
+
+    debug.trace(7, 'interpreter.build_timeout_function()')
+    return result
+
+
 if __name__ == '__main__':
     warning_not_intended_for_cmd()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+#
+# Inventory module
+#
+# This is responsible for list the tests of tests files, with
+# their line, number of assertions and sources, stopping after
+# the parser, so no Bats code is generated.
+#
+# Many files are parsed on a process pool, and inventories
+# are kept on the cache (if any) with the generated tests.
+#
+
+
+"""
+Inventory module
+
+This is responsible for list the tests of tests
+files without generating Bats code, many files are
+parsed on a process pool
+"""
+
+
+# Standard packages
+from concurrent.futures import ProcessPoolExecutor
+from os import cpu_count as os_cpu_count
+
+# Installed packages
+from mezcla import debug
+
+# Local packages
+from batspp._lexer import Lexer
+from batspp._parser import Parser
+from batspp._cache import compute_key
+from batspp.batspp_opts import BatsppOpts
+from batspp.batspp_args import BatsppArgs
+from batspp.batspp_pipeline import resolve_args_opts, read_tests
+from batspp._exceptions import (
+    warning_not_intended_for_cmd,
+    )
+
+
+# Constants
+INVENTORY_KIND = 'inventory'
+
+
+def list_tests(
+        file: str,
+        args: 'BatsppArgs|None' = None,
+        opts: 'BatsppOpts|None' = None,
+        ) -> list:
+    """
+    Return inventory of the tests of FILE with ARGS and OPTS, a dict for each test with
+    its file, name, line, number of assertions and the sources used by the file
+    """
+    args, opts = resolve_args_opts(file, args or BatsppArgs(), opts or BatsppOpts())
+    tokens = Lexer().tokenize(read_tests(file), opts.embedded_tests)
+    tree = Parser().parse(tokens, opts.embedded_tests)
+    result = [
+        {
+            'file': file,
+            'name': test.reference,
+            'line': test.data.line,
+            'assertions': len(test.assertions),
+            'sources': args.sources or [],
+            }
+        for test in tree.tests
+        ]
+    debug.trace(7, f'inventory.list_tests({file}) => {len(result)} tests')
+    return result
+
+
+def safe_list_tests(file: str, args: BatsppArgs, opts: BatsppOpts) -> 'list|Exception':
+    """Return inventory of FILE, or the exception, so errors are reported by file"""
+    try:
+        return list_tests(file, args=args, opts=opts)
+    except Exception as exc:  # pylint: disable=broad-except
+        return exc
+
+
+def list_files(
+        files: list,
+        args: 'BatsppArgs|None' = None,
+        opts: 'BatsppOpts|None' = None,
+        cache = None,
+        workers: int = 0,
+        ):
+    """
+    List the tests of FILES, generator of (file, inventory or exception) in the order of
+    FILES, inventories are taken from and saved to CACHE (if any), and files missing on it
+    are parsed on a pool of WORKERS processes (the number of CPUs by default)
+    """
+    args, opts = args or BatsppArgs(), opts or BatsppOpts()
+    keys, inventories = {}, {}
+    if cache:
+        for file in files:
+            file_args, file_opts = resolve_args_opts(file, args, opts)
+            keys[file] = compute_key(file, file_args, file_opts, kind=INVENTORY_KIND)
+            entry = cache.load(keys[file])
+            if entry is not None:
+                inventories[file] = entry['tests']
+    missing = [file for file in files if file not in inventories]
+
+    # NOTE: a single file is parsed faster than starting a pool
+    if len(missing) > 1:
+        count = len(missing)
+        workers = workers or os_cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=min(workers, count)) as executor:
+            results = executor.map(
+                safe_list_tests, missing, [args] * count, [opts] * count,
+                chunksize=max(1, count // (workers * 4)),
+                )
+            inventories.update(zip(missing, results))
+    else:
+        inventories.update((file, safe_list_tests(file, args, opts)) for file in missing)
+
+    for file in files:
+        result = inventories[file]
+        if cache and file in missing and not isinstance(result, Exception):
+            cache.save(keys[file], {'tests': result})
+        yield file, result
+
+
+if __name__ == '__main__':
+    warning_not_intended_for_cmd()
@@ -4,6 +4,11 @@
 #
 # This is responsible for converting ipynb json files to batspp text.
 #
+# Notebooks are read incrementally, converting cell by cell to
+# a sink, the outputs payloads not converted (e.g. images) are
+# skipped without decoding them, so memory doesn't grow with the
+# size of the notebook.
+#
 ## TODO: add sopport for images (ipynb display_data output type).
 
 """
@@ -13,13 +18,22 @@ This is responsible for converting ipynb json files to batspp text
 """
 
 # Standard packages
-import json
+from io import StringIO
 
 # Installed packages
 ## NOTE: this is empty for now
 
 # Local packages
-## NOTE: this is empty for now
+from batspp._json_stream import JsonStream
+from batspp._exceptions import error
+
+
+# Constants
+#
+# Keys of cells and outputs used by the conversion,
+# the values of other keys are skipped
+CELL_KEYS = ['cell_type', 'source', 'outputs']
+OUTPUT_KEYS = ['output_type', 'text', 'ename']
 
 
 class IpynbToBatspp:
@@ -31,13 +45,44 @@ class IpynbToBatspp:
         """
         Convert ipynb json to batspp text
         """
-        result = ""
-        ipynb = json.loads(ipynb)
-        for cell in ipynb['cells']:
-            if cell['cell_type'] == 'markdown':
-                result += self.convert_markdown_cell_to_comment(cell)
-            elif cell['cell_type'] == 'code':
-                result += self.convert_code_cell_to_commands(cell)
+        sink = StringIO()
+        self.convert_stream(StringIO(ipynb), sink)
+        return sink.getvalue()
+
+    def convert_stream(self, source, sink) -> None:
+        """
+        Convert ipynb json read from SOURCE text stream
+        to batspp text, written to SINK cell by cell
+        """
+        for cell in self.iter_cells(source):
+            sink.write(self.convert_cell(cell))
+
+    def iter_cells(self, source):
+        """
+        Generator of the cells of ipynb json read from SOURCE text stream,
+        only with the keys used by the conversion (CELL_KEYS and OUTPUT_KEYS)
+        """
+        stream = JsonStream(source)
+        cells_found = False
+        for key in stream.items():
+            if key != 'cells':
+                stream.skip_value()
+                continue
+            cells_found = True
+            for _ in stream.elements():
+                yield read_object(stream, CELL_KEYS)
+        if not cells_found:
+            error('invalid notebook, cells not found')
+
+    def convert_cell(self, cell: dict) -> str:
+        """
+        Convert CELL to batspp text, empty for cells other than markdown and code
+        """
+        result = ''
+        if cell.get('cell_type') == 'markdown':
+            result = self.convert_markdown_cell_to_comment(cell)
+        elif cell.get('cell_type') == 'code':
+            result = self.convert_code_cell_to_commands(cell)
         return result
 
     def convert_markdown_cell_to_comment(self, markdown_cell: dict) -> str:
@@ -53,25 +98,44 @@ class IpynbToBatspp:
         result = ""
 
         # Source to command
-        result = "$ " + code_cell['source'][0]
-        result += merge_lines(code_cell['source'][1:], line_start="$ ")
+        source = split_lines(code_cell['source'])
+        result = ["$ " + source[0], merge_lines(source[1:], line_start="$ ")]
 
         # Output to text
-        for output in code_cell['outputs']:
+        for output in code_cell.get('outputs', []):
 
             # Stream output type
             if output['output_type'] == 'stream':
-                result += merge_lines(output['text'])
+                result.append(merge_lines(output['text']))
 
             # Error output type
             elif output['output_type'] == 'error':
-                result += merge_lines(output['ename'])
+                result.append(merge_lines(output['ename']))
 
             else:
                 ## NOTE: display_data (used for images) is not supported for now
                 raise Exception("Output type not sopported for now: " + output['output_type'])
 
-        return result
+        return ''.join(result)
+
+def read_object(stream: JsonStream, keys: list) -> dict:
+    """
+    Read next object of STREAM with the values of KEYS, the outputs are read
+    with their OUTPUT_KEYS, the values of other keys are skipped
+    """
+    result = {}
+    for key in stream.items():
+        if key not in keys:
+            stream.skip_value()
+        elif key == 'outputs':
+            result[key] = [read_object(stream, OUTPUT_KEYS) for _ in stream.elements()]
+        else:
+            result[key] = stream.read_value()
+    return result
+
+def split_lines(text) -> list:
+    """Return lines of TEXT keeping their newline, notebooks can have sources as lists of lines or as strings"""
+    return text.splitlines(keepends=True) if isinstance(text, str) else text
 
 def merge_lines(lines:list, line_start="") -> str:
     """
@@ -79,9 +143,7 @@ def merge_lines(lines:list, line_start="") -> str:
     ensuring that every line has a LINE_START
     and a trailing newline
     """
-    result = ""
-    for line in lines:
-        result += line_start + line
+    result = "".join([line_start + line for line in split_lines(lines)])
     return ensure_trailing_newline(result)
 
 def ensure_trailing_newline(text:str) -> str:
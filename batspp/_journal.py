@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+#
+# Journal module
+#
+# This is responsible for append the result of each test
+# to a journal file as these are completed, so an interrupted
+# run can be resumed running only the tests not completed.
+#
+# The journal is a JSON lines file, the last line can be
+# truncated if the run was killed, so invalid lines are ignored,
+# and the truncated line is removed before resuming the journal.
+#
+
+
+"""
+Journal module
+
+This is responsible for append the result of each test
+to a journal file as these are completed, so an
+interrupted run can be resumed
+"""
+
+
+# Standard packages
+from json import (
+    dumps as json_dumps,
+    loads as json_loads,
+    )
+from os import (
+    SEEK_END,
+    path as os_path,
+    )
+
+# Installed packages
+from mezcla import debug
+
+# Local packages
+from batspp._tap import TestResult, PASSED, FAILED
+from batspp._exceptions import (
+    warning_not_intended_for_cmd,
+    )
+
+
+# Constants
+READ_SIZE = 65536
+
+
+def load_journal(path: str) -> dict:
+    """Load journal at PATH as a {(file, fingerprint): TestResult} dict of the completed tests"""
+    result = {}
+    if not os_path.isfile(path):
+        return result
+    with open(path, encoding='utf-8') as journal:
+        for line in journal:
+            try:
+                data = json_loads(line)
+            except ValueError:
+                continue
+            result[(data['file'], data['fingerprint'])] = TestResult(
+                number = data['number'],
+                name = data['name'],
+                status = data['status'],
+                duration = data.get('duration', 0.0),
+                diagnostics = data.get('diagnostics', []),
+                line = data.get('line', 0),
+                file = data['file'],
+                )
+    debug.trace(7, f'journal.load_journal({path}) => {len(result)} tests')
+    return result
+
+
+def truncate_partial_line(path: str) -> None:
+    """Truncate the last line of file at PATH if it's incomplete (not ending with newline)"""
+    if not os_path.isfile(path):
+        return
+    with open(path, 'rb+') as file:
+        # The file is read backwards by chunks until a newline
+        end = file.seek(0, SEEK_END)
+        position = end
+        while position > 0:
+            start = max(0, position - READ_SIZE)
+            file.seek(start)
+            index = file.read(position - start).rfind(b'\n')
+            if index >= 0:
+                position = start + index + 1
+                break
+            position = start
+        if position < end:
+            file.truncate(position)
+            debug.trace(5, f'journal.truncate_partial_line({path}) => {end - position} bytes removed')
+
+
+class Journal:
+    """
+    Append-only journal of tests results at PATH, with RESUME
+    the completed tests of the previous run are kept
+    """
+
+    def __init__(self, path: str, resume: bool = False) -> None:
+        assert path, 'Journal path cannot be empty'
+        self.completed = load_journal(path) if resume else {}
+        # NOTE: otherwise the first record would be glued to the truncated line
+        if resume:
+            truncate_partial_line(path)
+        self.file = open(path, 'a' if resume else 'w', encoding='utf-8')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def get(self, file: str, fingerprint: str) -> 'TestResult|None':
+        """Return result of the test of FILE and FINGERPRINT if it was completed"""
+        return self.completed.get((file, fingerprint))
+
+    def record(self, fingerprint: str, result: TestResult) -> None:
+        """Append RESULT of the test of FINGERPRINT, only completed tests are recorded"""
+        if result.status not in [PASSED, FAILED]:
+            return
+        # NOTE: each line is flushed, so it survives if the run is killed
+        self.file.write(json_dumps({'file': result.file, 'fingerprint': fingerprint, **result.to_dict()}) + '\n')
+        self.file.flush()
+
+    def close(self) -> None:
+        """Close journal"""
+        self.file.close()
+
+
+if __name__ == '__main__':
+    warning_not_intended_for_cmd()
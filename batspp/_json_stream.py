@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+#
+# JSON stream module
+#
+# This is responsible for read JSON documents incrementally from
+# a text stream, chunk by chunk, so values can be read one at a
+# time as these are reached, and the values not needed are skipped
+# without being decoded, e.g. large base64 payloads of notebooks.
+#
+# Only the current chunk and the values being read are kept in
+# memory, so the memory used doesn't depend on the document size.
+#
+
+
+"""
+JSON stream module
+
+This is responsible for read JSON documents incrementally
+from a text stream, reading or skipping one value at a time
+"""
+
+
+# Standard packages
+from json import loads as json_loads
+from re import compile as re_compile
+
+# Installed packages
+from mezcla import debug
+
+# Local packages
+from batspp._exceptions import (
+    error, warning_not_intended_for_cmd,
+    )
+
+
+# Constants
+CHUNK_SIZE = 65536
+WHITESPACE = ' \t\n\r'
+WHITESPACE_PATTERN = re_compile(r'[ \t\n\r]*')
+STRING_STOP_PATTERN = re_compile(r'["\\]')
+LITERAL_PATTERN = re_compile(r'[^,:\[\]{}" \t\n\r]*')
+
+# Length of escapes, e.g. \n and \u00e1
+ESCAPE_LENGTH = 2
+UNICODE_ESCAPE_LENGTH = 6
+
+
+class JsonStream:
+    """
+    Incremental reader of the JSON document of SOURCE text stream,
+    which is read in chunks of CHUNK_SIZE characters
+    """
+
+    def __init__(self, source, chunk_size: int = CHUNK_SIZE) -> None:
+        self.source = source
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.index = 0
+
+    def fill(self) -> bool:
+        """Read the next chunk, discarding the text already read, returns whether there was more text"""
+        chunk = self.source.read(self.chunk_size)
+        if not chunk:
+            return False
+        self.buffer = self.buffer[self.index:] + chunk
+        self.index = 0
+        return True
+
+    def require(self, length: int) -> None:
+        """Ensure there are LENGTH characters available after the current one"""
+        while len(self.buffer) - self.index < length:
+            if not self.fill():
+                error('invalid JSON, unexpected end of document')
+
+    def peek(self) -> str:
+        """Return the next character that isn't whitespace, without reading it"""
+        # NOTE: most values are not preceded by whitespace
+        if self.index < len(self.buffer) and self.buffer[self.index] not in WHITESPACE:
+            return self.buffer[self.index]
+        while True:
+            self.index = WHITESPACE_PATTERN.match(self.buffer, self.index).end()
+            if self.index < len(self.buffer):
+                return self.buffer[self.index]
+            self.require(1)
+
+    def expect(self, char: str) -> None:
+        """Read the next character that isn't whitespace, which must be CHAR"""
+        found = self.peek()
+        if found != char:
+            error(f'invalid JSON, expected "{char}" but found "{found}"')
+        self.index += 1
+
+    def items(self):
+        """
+        Generator of the keys of the next object, the value
+        of each key must be read or skipped before the next one
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            self.index += 1
+            return
+        while True:
+            key = self.read_string()
+            self.expect(':')
+            yield key
+            if self.peek() == '}':
+                self.index += 1
+                return
+            self.expect(',')
+
+    def elements(self):
+        """
+        Generator of the indexes of the next array, each
+        element must be read or skipped before the next one
+        """
+        self.expect('[')
+        if self.peek() == ']':
+            self.index += 1
+            return
+        index = 0
+        while True:
+            yield index
+            index += 1
+            if self.peek() == ']':
+                self.index += 1
+                return
+            self.expect(',')
+
+    def read_value(self):
+        """Return the next value decoded"""
+        char = self.peek()
+        if char == '{':
+            return {key: self.read_value() for key in self.items()}
+        if char == '[':
+            return [self.read_value() for _ in self.elements()]
+        if char == '"':
+            return self.read_string()
+        return json_loads(self.read_literal())
+
+    def skip_value(self) -> None:
+        """Skip the next value without decoding it, nor keeping it in memory"""
+        char = self.peek()
+        if char == '{':
+            for _ in self.items():
+                self.skip_value()
+        elif char == '[':
+            for _ in self.elements():
+                self.skip_value()
+        elif char == '"':
+            self.scan_string(keep=False)
+        else:
+            self.read_literal()
+
+    def read_string(self) -> str:
+        """Return the next string decoded, only strings with escapes need decoding"""
+        result = self.scan_string(keep=True)
+        return json_loads(f'"{result}"') if '\\' in result else result
+
+    def scan_string(self, keep: bool) -> str:
+        """Read the next string, returns its raw content (escapes are not decoded) if KEEP"""
+        self.expect('"')
+        pieces = []
+        while True:
+            match = STRING_STOP_PATTERN.search(self.buffer, self.index)
+            if not match:
+                if keep:
+                    pieces.append(self.buffer[self.index:])
+                self.index = len(self.buffer)
+                self.require(1)
+                continue
+            if keep:
+                pieces.append(self.buffer[self.index:match.start()])
+            self.index = match.start()
+            if match.group() == '"':
+                self.index += 1
+                break
+
+            # Escapes are kept whole, so these are decoded later
+            self.require(ESCAPE_LENGTH)
+            length = UNICODE_ESCAPE_LENGTH if self.buffer[self.index + 1] == 'u' else ESCAPE_LENGTH
+            self.require(length)
+            if keep:
+                pieces.append(self.buffer[self.index:self.index + length])
+            self.index += length
+        return ''.join(pieces)
+
+    def read_literal(self) -> str:
+        """Return the text of the next number, boolean or null"""
+        self.peek()
+        while True:
+            end = LITERAL_PATTERN.match(self.buffer, self.index).end()
+            if end < len(self.buffer) or not self.fill():
+                break
+        result = self.buffer[self.index:end]
+        if not result:
+            error(f'invalid JSON, unexpected "{self.buffer[self.index:self.index + 1]}"')
+        self.index += len(result)
+        debug.trace(9, f'JsonStream.read_literal() => {result}')
+        return result
+
+
+if __name__ == '__main__':
+    warning_not_intended_for_cmd()
@@ -18,7 +18,7 @@ an Abstract Syntax Tree (AST) for Batspp
 
 
 # Standard packages
-## NOTE: this is empty for now
+from re import match as re_match
 
 # Installed packages
 from mezcla import debug
@@ -36,6 +36,11 @@ from batspp._ast_nodes import (
     )
 
 
+# Options that can be specified on test directives,
+# e.g. "# Test slow-thing (timeout=30)"
+TEST_OPTIONS = ['timeout']
+
+
 class Parser:
     """
     This is responsible for building an
@@ -230,15 +235,16 @@ class Parser:
         debug.trace(7, f'parser.push_test_ast_node(reference={reference})')
 
         data = self.get_current_token().data
+        options = {}
 
         if not reference:
             self.eat(TokenVariant.TEST)
-            reference = self.get_current_token().value.strip()
+            reference, options = split_test_options(self.get_current_token())
             self.last_reference = reference
             self.eat(TokenVariant.TEXT)
 
         self.tests_ast_nodes_stack.append(
-            Test(reference=reference, assertions=None, data=data)
+            Test(reference=reference, assertions=None, data=data, **options)
             )
 
         self.break_setup_assertion(reference)
@@ -607,5 +613,32 @@ class Parser:
         return result
 
 
+def split_test_options(token: Token) -> tuple:
+    """
+    Split test title TOKEN into reference and options,
+    e.g. 'slow-thing (timeout=30)' => ('slow-thing', {'timeout': 30})
+    """
+    reference = token.value.strip()
+    options = {}
+
+    # NOTE: parenthesis without key=value pairs are part of the title
+    match = re_match(r'^(.*?) *\(( *\w+ *=[^()]*)\)$', reference)
+    if match:
+        reference = match.group(1)
+        for option in match.group(2).split(','):
+            key, _, value = option.partition('=')
+            key, value = key.strip(), value.strip()
+            if key not in TEST_OPTIONS or not value.isdigit():
+                error(
+                    message=f'Invalid test option "{option.strip()}"',
+                    text_line=token.data.text_line,
+                    line=token.data.line,
+                    )
+            options[key] = int(value)
+
+    debug.trace(7, f'parser.split_test_options({token}) => {reference}, {options}')
+    return reference, options
+
+
 if __name__ == '__main__':
     warning_not_intended_for_cmd()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+#
+# Selection module
+#
+# This is responsible for select the tests to be transpiled,
+# by a pattern of their names or by lines of their files, so
+# only the selected tests are generated and run.
+#
+# Continuations and setups are merged into their tests by the
+# parser, so the selected tests are complete.
+#
+
+
+"""
+Selection module
+
+This is responsible for select the tests to be
+transpiled, by a pattern of their names or by
+lines of their files
+"""
+
+
+# Standard packages
+from os import path as os_path
+from re import (
+    compile as re_compile,
+    error as re_error,
+    )
+
+# Installed packages
+from mezcla import debug
+
+# Local packages
+from batspp._exceptions import (
+    error, warning_not_intended_for_cmd,
+    )
+
+
+# Constants
+SELECTOR_PATTERN = re_compile(r'^(.+):(\d+)$')
+
+
+def parse_selector(selector: str) -> tuple:
+    """
+    Return (file, line) of SELECTOR, e.g. tests.batspp:10 => (tests.batspp, 10),
+    line is None if it's a plain file, or if a file with that name exists
+    """
+    match = SELECTOR_PATTERN.match(selector)
+    if not match or os_path.exists(selector):
+        return selector, None
+    return match.group(1), int(match.group(2))
+
+
+def compile_filter(pattern: str):
+    """Return compiled regex PATTERN to filter tests names, or None if empty"""
+    result = None
+    try:
+        result = re_compile(pattern) if pattern else None
+    except re_error as exc:
+        error(f'invalid tests filter "{pattern}": {exc}')
+    return result
+
+
+def get_test_lines(test) -> list:
+    """Return the lines of TEST, its own and the ones of its assertions"""
+    return [test.data.line] + [assertion.data.line for assertion in test.assertions if assertion.data]
+
+
+def select_tests(tests: list, pattern=None, lines: 'list|None' = None) -> list:
+    """
+    Return the TESTS with a name matching PATTERN (if any) and selected by some of LINES
+    (if any), a line selects the tests of that line, or else the last test before it
+    """
+    result = [test for test in tests if not pattern or pattern.search(test.reference)]
+    if lines:
+        selected = []
+        for line in lines:
+            matching = [test for test in tests if line in get_test_lines(test)]
+            if not matching:
+                previous = [test for test in tests if test.data.line <= line]
+                matching = [max(previous, key=lambda test: test.data.line)] if previous else []
+            selected += matching
+        result = [test for test in result if any(test is other for other in selected)]
+    debug.trace(7, f'selection.select_tests({len(tests)} tests) => {[test.reference for test in result]}')
+    return result
+
+
+if __name__ == '__main__':
+    warning_not_intended_for_cmd()
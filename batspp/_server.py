@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+#
+# Server module
+#
+# This is responsible for serve transpile, check, list and
+# run requests over a local Unix socket from a long-lived
+# process, which keeps warm the lexer, parser, interpreter
+# and the cache of generated tests, so callers like editors
+# or hooks don't pay the start-up on every call.
+#
+# The protocol is JSON lines, the client sends a single request:
+#
+# {"command": "run", "files": [...], "args": {...}, "opts": {...},
+#  "cwd": "...", "env": {...}, "tap": true}
+#
+# and the server replies a message for each file, test or result
+# as these are completed, ending with {"ok": true}, or with
+# {"ok": false, "error": "..."} if the request failed. With "tap"
+# the output of bats is also replied as {"tap": "..."} messages,
+# so a single file is printed as if it was run by the client.
+# The check command replies {"file": "...", "errors": [...]} for
+# each file, with the errors as printed by --check.
+#
+# Only the common variables of the environment are sent by the
+# client (see ENV_NAMES), and sockets of other users are refused,
+# as these can be planted on shared folders like /tmp.
+#
+
+
+"""
+Server module
+
+This is responsible for serve transpile, check, list
+and run requests over a local Unix socket from a
+long-lived process, using a JSON lines protocol
+"""
+
+
+# Standard packages
+from io import StringIO
+from json import (
+    dumps as json_dumps,
+    loads as json_loads,
+    )
+from os import (
+    chdir as os_chdir,
+    environ as os_environ,
+    getcwd as os_getcwd,
+    getuid as os_getuid,
+    path as os_path,
+    remove as os_remove,
+    stat as os_stat,
+    )
+from socket import socket, AF_UNIX, SOCK_STREAM
+from stat import S_ISSOCK
+from socketserver import UnixStreamServer, StreamRequestHandler
+from tempfile import gettempdir
+
+# Installed packages
+from mezcla import debug
+from mezcla import glue_helpers as gh
+
+# Local packages
+from batspp._cache import MemoryCache
+from batspp._inventory import list_files
+from batspp._checking import check_file
+from batspp.batspp_opts import BatsppOpts
+from batspp.batspp_args import BatsppArgs
+from batspp.batspp_test import BatsppTest, copy_args_opts
+from batspp._exceptions import (
+    error, warning, warning_not_intended_for_cmd,
+    )
+
+
+# Constants
+TRANSPILE = 'transpile'
+CHECK = 'check'
+LIST = 'list'
+RUN = 'run'
+COMMANDS = [TRANSPILE, CHECK, LIST, RUN]
+ENV_NAMES = ['PATH', 'HOME', 'USER', 'LOGNAME', 'SHELL', 'LANG', 'TERM', 'TMP', 'TMPDIR', 'PYTHONPATH']
+ENV_PREFIXES = ('LC_', 'BATS_')
+
+
+def get_socket_path() -> str:
+    """Return default socket path, private to the user"""
+    folder = os_environ.get('XDG_RUNTIME_DIR') or gettempdir()
+    return gh.form_path(folder, f'batspp-{os_getuid()}.sock')
+
+
+def get_request_env(names: 'list|None' = None) -> dict:
+    """Return the variables of the environment sent on requests, the common ones and NAMES (if any)"""
+    names = ENV_NAMES + (names or [])
+    result = {
+        name: value for name, value in os_environ.items()
+        if name in names or name.startswith(ENV_PREFIXES)
+        }
+    debug.trace(7, f'server.get_request_env({names}) => {list(result)}')
+    return result
+
+
+def is_user_socket(path: str) -> bool:
+    """Whether PATH is a socket owned by the user"""
+    try:
+        status = os_stat(path)
+    except OSError:
+        return False
+    return S_ISSOCK(status.st_mode) and status.st_uid == os_getuid()
+
+
+def pop_text(stream: StringIO) -> str:
+    """Return the text written to STREAM, which is emptied"""
+    result = stream.getvalue()
+    stream.seek(0)
+    stream.truncate()
+    return result
+
+
+def connect(path: str) -> 'socket|None':
+    """Return connection to the server at PATH, or None if no server is running"""
+    if os_path.exists(path) and not is_user_socket(path):
+        warning(f'ignoring {path}, it is not a socket owned by the user')
+        return None
+    connection = socket(AF_UNIX, SOCK_STREAM)
+    try:
+        connection.connect(path)
+    except OSError:
+        connection.close()
+        connection = None
+    debug.trace(7, f'server.connect({path}) => {connection is not None}')
+    return connection
+
+
+def send_request(connection: socket, request: dict):
+    """Send REQUEST over CONNECTION, generator of the reply messages"""
+    with connection, connection.makefile('rw', encoding='utf-8') as stream:
+        stream.write(json_dumps(request) + '\n')
+        stream.flush()
+        for line in stream:
+            message = json_loads(line)
+            yield message
+            if 'ok' in message:
+                break
+
+
+class RequestHandler(StreamRequestHandler):
+    """Handler of a single request of a connection"""
+
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        try:
+            request = json_loads(line)
+            messages = self.server.reply(request)
+        except ValueError as exc:
+            messages = [{'ok': False, 'error': f'invalid request: {exc}'}]
+        try:
+            for message in messages:
+                self.wfile.write((json_dumps(message) + '\n').encode())
+                self.wfile.flush()
+        # NOTE: clients can leave without reading the whole reply
+        except BrokenPipeError:
+            debug.trace(5, 'RequestHandler.handle() client left')
+        finally:
+            # The state of the server is restored by the reply
+            if hasattr(messages, 'close'):
+                messages.close()
+
+
+class BatsppServer(UnixStreamServer):
+    """
+    Server of Batspp requests on a Unix socket at PATH, the generated
+    tests are cached in memory, and also on CACHE_DIR (if any)
+    """
+
+    def __init__(self, path: str, cache_dir: str = '') -> None:
+        self.path = path
+        self.test = BatsppTest(cache_dir=cache_dir)
+        self.test.cache = MemoryCache(self.test.cache)
+
+        # Stale sockets of servers not running are removed
+        if os_path.exists(path):
+            connection = connect(path)
+            if connection:
+                connection.close()
+                error(f'a server is already running on {path}')
+            os_remove(path)
+        super().__init__(path, RequestHandler)
+
+    def server_close(self) -> None:
+        super().server_close()
+        if os_path.exists(self.path):
+            os_remove(self.path)
+
+    def reply(self, request: dict):
+        """
+        Generator of the reply messages to REQUEST, this is run on
+        the working directory and environment of the request, as
+        requests are served one at a time
+        """
+        debug.trace(7, f'BatsppServer.reply({request.get("command")}, {request.get("files")})')
+        command = request.get('command')
+        if command not in COMMANDS:
+            yield {'ok': False, 'error': f'unknown command "{command}", must be some of {COMMANDS}'}
+            return
+
+        cwd, env = os_getcwd(), dict(os_environ)
+        try:
+            os_chdir(request.get('cwd', cwd))
+            if 'env' in request:
+                os_environ.clear()
+                os_environ.update(request['env'])
+            args = BatsppArgs(**request.get('args', {}))
+            opts = BatsppOpts(**request.get('opts', {}))
+            files = request.get('files', [])
+            if command == RUN:
+                output = StringIO() if request.get('tap') else None
+                for result in self.test.run_files_stream(files, args=args, opts=opts, output=output):
+                    if output and output.getvalue():
+                        yield {'tap': pop_text(output)}
+                    yield {'result': {'file': result.file, **result.to_dict()}}
+                if output and output.getvalue():
+                    yield {'tap': pop_text(output)}
+            elif command == LIST:
+                for _file, inventory in list_files(files, args=args, opts=opts, cache=self.test.cache):
+                    if isinstance(inventory, Exception):
+                        raise inventory
+                    yield from inventory
+            else:
+                for file in files:
+                    file_args, file_opts = copy_args_opts(args, opts)
+                    # NOTE: the errors are the same as of --check
+                    if command == CHECK:
+                        yield {'file': file, 'errors': check_file(file, args=file_args, opts=file_opts)}
+                    else:
+                        content = self.test.transpile_to_bats(file, args=file_args, opts=file_opts)
+                        yield {'file': file, 'content': content}
+            yield {'ok': True}
+        # NOTE: errors are replied, so the server keeps running
+        except Exception as exc:  # pylint: disable=broad-except
+            yield {'ok': False, 'error': str(exc)}
+        finally:
+            os_chdir(cwd)
+            os_environ.clear()
+            os_environ.update(env)
+
+
+if __name__ == '__main__':
+    warning_not_intended_for_cmd()
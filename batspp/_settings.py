@@ -26,6 +26,8 @@ BATSPP_EXTENSION = 'batspp'
 
 BATS_EXTENSION = 'bats'
 
+IPYNB_EXTENSION = 'ipynb'
+
 
 if __name__ == '__main__':
     warning_not_intended_for_cmd()
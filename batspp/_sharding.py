@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+#
+# Sharding module
+#
+# This is responsible for balance tests into shards
+# by their recorded durations, and merge the results
+# of the shards into a single report
+#
+
+
+"""
+Sharding module
+
+This is responsible for balance tests into shards
+by their recorded durations, and merge the results
+of the shards into a single report
+"""
+
+
+# Standard packages
+from heapq import heapify, heappop, heappush
+from json import loads as json_loads
+
+# Installed packages
+from mezcla import debug
+from mezcla import glue_helpers as gh
+
+# Local packages
+from batspp._interpreter import BUNDLE_SEPARATOR
+from batspp._tap import TapParser, TestResult
+from batspp._exceptions import (
+    warning_not_intended_for_cmd,
+    )
+
+
+# Constants
+SHARD_PREFIX = 'shard_'
+DEFAULT_DURATION = 1.0
+
+
+def load_durations(path: str) -> dict:
+    """Load durations from JSON lines report at PATH, as a {(file, name): duration} dict"""
+    result = {}
+    for test_result in read_results(path):
+        result[(test_result.file, test_result.name)] = test_result.duration
+    debug.trace(7, f'sharding.load_durations({path}) => {len(result)} durations')
+    return result
+
+
+def estimate_durations(durations: list) -> list:
+    """Replace unknown DURATIONS (None) with the mean of the known ones"""
+    known = [duration for duration in durations if duration is not None]
+    default = sum(known) / len(known) if known else DEFAULT_DURATION
+    return [default if duration is None else duration for duration in durations]
+
+
+def partition_tests(durations: list, shards: int) -> list:
+    """
+    Partition tests by their DURATIONS into SHARDS with similar total duration,
+    returns the list of tests indexes of each shard, in the original order
+    """
+    assert shards > 0, 'Number of shards must be positive'
+
+    # The longest tests are assigned first to the least loaded shard
+    result = [[] for _ in range(shards)]
+    loads = [(0.0, shard) for shard in range(shards)]
+    heapify(loads)
+    for index in sorted(range(len(durations)), key=lambda i: -durations[i]):
+        load, shard = heappop(loads)
+        result[shard].append(index)
+        heappush(loads, (load + durations[index], shard))
+    result = [sorted(indexes) for indexes in result]
+
+    debug.trace(7, f'sharding.partition_tests({durations}, {shards}) => {result}')
+    return result
+
+
+def get_shard_path(output_dir: str, number: int, shards: int, extension: str) -> str:
+    """Return path of shard NUMBER of SHARDS in OUTPUT_DIR, zero-padded to keep the order"""
+    return gh.form_path(output_dir, f'{SHARD_PREFIX}{number:0{len(str(shards))}}.{extension}')
+
+
+def split_bundle_name(name: str) -> tuple:
+    """Split test NAME of a bundle into file and test name, e.g. 'a.batspp :: title' => ('a.batspp', 'title')"""
+    file, separator, test_name = name.partition(BUNDLE_SEPARATOR)
+    return (file, test_name) if separator else ('', name)
+
+
+def read_results(path: str):
+    """
+    Generator of results from TAP or JSON lines report at PATH,
+    the file of bundled tests is taken from their name
+    """
+    with open(path, encoding='utf-8') as report:
+        first_line = report.readline()
+        report.seek(0)
+        if first_line.startswith('{'):
+            for line in report:
+                if not line.strip():
+                    continue
+                data = json_loads(line)
+                # NOTE: the properties of the run are not results
+                if 'properties' in data:
+                    continue
+                yield TestResult(
+                    number = data['number'],
+                    name = data['name'],
+                    status = data['status'],
+                    duration = data.get('duration', 0.0),
+                    diagnostics = data.get('diagnostics', []),
+                    line = data.get('line', 0),
+                    file = data.get('file', ''),
+                    )
+        else:
+            # NOTE: durations are only known if bats was run with --timing
+            for result in TapParser(measure=False).parse(report):
+                result.file, result.name = split_bundle_name(result.name)
+                yield result
+
+
+def merge_results(paths: list):
+    """Generator of results of the reports at PATHS, renumbered in sequence"""
+    number = 0
+    for path in paths:
+        for result in read_results(path):
+            number += 1
+            result.number = number
+            yield result
+
+
+if __name__ == '__main__':
+    warning_not_intended_for_cmd()
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+#
+# TAP module
+#
+# This is responsible for parse the Test Anything Protocol (TAP)
+# output of bats incrementally, and write reports of the results
+#
+# More information about TAP:
+# - https://testanything.org/tap-specification.html
+#
+
+
+"""
+TAP module
+
+This is responsible for parse the Test Anything Protocol (TAP)
+output of bats incrementally, and write reports of the results
+"""
+
+
+# Standard packages
+from json import dumps as json_dumps
+from re import compile as re_compile
+from time import monotonic
+from xml.sax.saxutils import (
+    escape as xml_escape,
+    quoteattr as xml_quoteattr,
+    )
+
+# Installed packages
+from mezcla import debug
+
+# Local packages
+from batspp._interpreter import BUNDLE_SEPARATOR
+from batspp._exceptions import (
+    warning_not_intended_for_cmd,
+    )
+
+
+# Constants
+PLAN_PATTERN = re_compile(r'^1\.\.(\d+)')
+RESULT_PATTERN = re_compile(
+    r'^(not ok|ok) (\d+) (.*?)'
+    r'(?: in (\d+)ms)?'
+    r'(?: # ([Ss][Kk][Ii][Pp]|[Tt][Oo][Dd][Oo])\b ?(.*))?$'
+    )
+PASSED = 'passed'
+FAILED = 'failed'
+SKIPPED = 'skipped'
+NOT_RUN = 'not run, stopped after the failures limit'
+
+# Number of the first lines that are not TAP kept by the parser,
+# e.g. errors of bats or the shell when these cannot run the tests
+UNPARSED_LINES = 10
+
+
+class TestResult:
+    """Result of a single test"""
+
+    def __init__(
+            self,
+            number: int,
+            name: str,
+            status: str,
+            duration: float = 0.0,
+            diagnostics: list = None,
+            line: int = 0,
+            file: str = '',
+            ) -> None:
+        self.number = number
+        self.name = name
+        self.status = status
+        self.duration = duration
+        self.diagnostics = diagnostics if diagnostics else []
+        self.line = line
+        self.file = file
+
+    def to_dict(self) -> dict:
+        """Return result as a dictionary"""
+        return {
+            'number': self.number,
+            'name': self.name,
+            'status': self.status,
+            'duration': round(self.duration, 3),
+            'diagnostics': self.diagnostics,
+            'line': self.line,
+            }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'TestResult':
+        """Return result from DATA dictionary, as given by to_dict plus the file"""
+        return cls(
+            number = data['number'],
+            name = data['name'],
+            status = data['status'],
+            duration = data.get('duration', 0.0),
+            diagnostics = data.get('diagnostics', []),
+            line = data.get('line', 0),
+            file = data.get('file', ''),
+            )
+
+    def to_tap(self) -> str:
+        """Return result as TAP lines, prefixing the name with the file if known"""
+        name = f'{self.file}{BUNDLE_SEPARATOR}{self.name}' if self.file else self.name
+        result = f'{"not ok" if self.status == FAILED else "ok"} {self.number} {name}'
+        result += ' # skip' if self.status == SKIPPED else ''
+        result += ''.join([f'\n# {line}' for line in self.diagnostics])
+        return result
+
+
+class TapParser:
+    """
+    Incremental TAP parser, lines are feeded as
+    these arrive and complete results are returned
+    """
+
+    def __init__(self, source_lines: list = None, measure: bool = True) -> None:
+        self.source_lines = source_lines if source_lines else []
+        # Whether durations are measured as lines arrive,
+        # when these are not reported by bats --timing
+        self.measure = measure
+        self.plan = 0
+        self.current = None
+        self.last_time = monotonic()
+        self.unparsed = []
+
+    def feed(self, line: str) -> list:
+        """Feed a TAP LINE, returns the results completed by it"""
+        result = []
+        line = line.rstrip('\n')
+
+        match = RESULT_PATTERN.match(line)
+        if match:
+            result += self.close()
+            status, number, name, milliseconds, directive, _reason = match.groups()
+            now = monotonic()
+            number = int(number)
+            duration = now - self.last_time if self.measure else 0.0
+            self.current = TestResult(
+                number = number,
+                name = name,
+                status = SKIPPED if directive else (PASSED if status == 'ok' else FAILED),
+                duration = int(milliseconds) / 1000 if milliseconds else duration,
+                line = self.get_source_line(number),
+                )
+            self.last_time = now
+        elif line.startswith('#') and self.current:
+            # Diagnostics are the commented lines following a result
+            self.current.diagnostics.append(line[2:] if line.startswith('# ') else line[1:])
+        elif PLAN_PATTERN.match(line):
+            self.plan = int(PLAN_PATTERN.match(line).group(1))
+        elif line.strip() and len(self.unparsed) < UNPARSED_LINES:
+            self.unparsed.append(line)
+
+        debug.trace(7, f'TapParser.feed({line}) => {result}')
+        return result
+
+    def close(self) -> list:
+        """Return the pending result, if any"""
+        result = [self.current] if self.current else []
+        self.current = None
+        return result
+
+    def parse(self, lines):
+        """Generator of results from TAP LINES"""
+        for line in lines:
+            yield from self.feed(line)
+        yield from self.close()
+
+    def get_source_line(self, number: int) -> int:
+        """Return source line of test NUMBER, or 0 if unknown"""
+        result = 0
+        if 0 < number <= len(self.source_lines):
+            result = self.source_lines[number - 1] or 0
+        return result
+
+
+def get_exit_diagnostics(status: int, unparsed: list) -> list:
+    """Return diagnostics of the tests not run as bats exited with STATUS, with its UNPARSED output"""
+    return [f'not run, bats exited with status {status}'] + list(unparsed)
+
+
+def build_missing_results(
+        tests_lines: list,
+        numbers: set,
+        status: str,
+        diagnostics: list,
+        tests_names: 'list|None' = None,
+        ) -> list:
+    """
+    Return results with STATUS and DIAGNOSTICS of the tests of TESTS_LINES (named
+    by TESTS_NAMES) without a result on NUMBERS, so the report of a run is complete
+    """
+    tests_names = tests_names if tests_names else []
+    result = [
+        TestResult(
+            number = number,
+            name = tests_names[number - 1] if number <= len(tests_names) else '',
+            status = status,
+            diagnostics = list(diagnostics),
+            line = line,
+            )
+        for number, line in enumerate(tests_lines, start=1)
+        if number not in numbers
+        ]
+    debug.trace(7, f'tap.build_missing_results() => {len(result)} results')
+    return result
+
+
+class JunitReporter:
+    """Writes results to a JUnit XML report as these arrive"""
+
+    def __init__(self, path: str, name: str = 'batspp', properties: 'dict|None' = None) -> None:
+        self.name = name
+        self.file = open(path, 'w', encoding='utf-8')
+        # NOTE: the testsuite counts attributes are omitted,
+        #       as these are not known until the end
+        self.file.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<testsuites>\n'
+            f'<testsuite name={xml_quoteattr(name)}>\n'
+            )
+        if properties:
+            self.file.write('<properties>\n')
+            for key, value in properties.items():
+                value = value if isinstance(value, str) else json_dumps(value)
+                self.file.write(f'<property name={xml_quoteattr(key)} value={xml_quoteattr(value)}/>\n')
+            self.file.write('</properties>\n')
+        self.file.flush()
+
+    def write(self, result: TestResult) -> None:
+        """Write RESULT"""
+        output = (
+            f'<testcase classname={xml_quoteattr(result.file or self.name)} name={xml_quoteattr(result.name)}'
+            f' time="{result.duration:.3f}" line="{result.line}"'
+            )
+        details = xml_escape('\n'.join(result.diagnostics))
+        if result.status == FAILED:
+            output += f'>\n<failure message="failed">{details}</failure>\n</testcase>\n'
+        elif result.status == SKIPPED:
+            output += '>\n<skipped/>\n</testcase>\n'
+        else:
+            output += '/>\n'
+        self.file.write(output)
+        self.file.flush()
+
+    def close(self) -> None:
+        """Close report"""
+        self.file.write(
+            '</testsuite>\n'
+            '</testsuites>\n'
+            )
+        self.file.close()
+
+
+class JsonReporter:
+    """
+    Writes results to a JSON lines report as these arrive,
+    preceded by a line with the PROPERTIES of the run (if any)
+    """
+
+    def __init__(self, path: str, name: str = 'batspp', properties: 'dict|None' = None) -> None:
+        self.name = name
+        self.file = open(path, 'w', encoding='utf-8')
+        if properties:
+            self.file.write(json_dumps({'properties': properties}) + '\n')
+            self.file.flush()
+
+    def write(self, result: TestResult) -> None:
+        """Write RESULT"""
+        self.file.write(json_dumps({'file': result.file or self.name, **result.to_dict()}) + '\n')
+        self.file.flush()
+
+    def close(self) -> None:
+        """Close report"""
+        self.file.close()
+
+
+if __name__ == '__main__':
+    warning_not_intended_for_cmd()
@@ -75,6 +75,30 @@ class Token:
         self.value = value
         self.data = data
 
+    def to_dict(self) -> dict:
+        """Return token as a dictionary"""
+        data = self.data if self.data else TokenData()
+        return {
+            'variant': self.variant.name,
+            'value': self.value,
+            'text_line': data.text_line,
+            'line': data.line,
+            'column': data.column,
+            }
+
+    @classmethod
+    def from_dict(cls, entry: dict, line_offset: int = 0) -> 'Token':
+        """Return token from ENTRY made by to_dict, with its line moved LINE_OFFSET lines"""
+        return cls(
+            TokenVariant[entry['variant']],
+            entry['value'],
+            TokenData(
+                text_line = entry['text_line'],
+                line = entry['line'] + line_offset if entry['line'] else entry['line'],
+                column = entry['column'],
+                ),
+            )
+
     def __str__(self):
         return (
             f'Token(variant={self.variant},\n'
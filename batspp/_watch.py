@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+#
+# Watch module
+#
+# This is responsible for detect changes of the tests
+# files and their sources by polling, and remember the
+# results of the tests between runs, so only the tests
+# affected by the changes are run again.
+#
+
+
+"""
+Watch module
+
+This is responsible for detect changes of the tests files
+and their sources by polling, and remember the results of
+the tests between runs
+"""
+
+
+# Standard packages
+from os import stat as os_stat
+from time import sleep
+
+# Installed packages
+from mezcla import debug
+
+# Local packages
+from batspp._tap import TestResult, PASSED, FAILED
+from batspp._exceptions import (
+    warning_not_intended_for_cmd,
+    )
+
+
+# Constants
+#
+# Seconds between polls, and seconds that files
+# must be unchanged before running, as editors
+# usually save files in many steps
+WATCH_INTERVAL = 0.25
+DEBOUNCE_TIME = 0.1
+
+
+class Watcher:
+    """Detects changes of files at PATHS by polling their modification time and size"""
+
+    def __init__(
+            self,
+            paths: list,
+            interval: float = WATCH_INTERVAL,
+            debounce: float = DEBOUNCE_TIME,
+            ) -> None:
+        self.paths = list(dict.fromkeys(paths))
+        self.interval = interval
+        self.debounce = debounce
+        self.snapshot = self.take_snapshot()
+
+    def take_snapshot(self) -> dict:
+        """Return the {path: (modification time, size)} of the paths, None if missing"""
+        result = {}
+        for path in self.paths:
+            try:
+                stat = os_stat(path)
+                result[path] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                result[path] = None
+        return result
+
+    def wait_changes(self) -> list:
+        """Wait until some paths change and are stable, returns the changed paths"""
+        snapshot = self.snapshot
+        while snapshot == self.snapshot:
+            sleep(self.interval)
+            snapshot = self.take_snapshot()
+
+        # Debounce, waiting for the files to be stable
+        while True:
+            sleep(self.debounce)
+            latest = self.take_snapshot()
+            if latest == snapshot:
+                break
+            snapshot = latest
+
+        result = [path for path in self.paths if snapshot[path] != self.snapshot[path]]
+        self.snapshot = snapshot
+        debug.trace(7, f'Watcher.wait_changes() => {result}')
+        return result
+
+
+class ResultsMemory:
+    """
+    Results of the completed tests by their file and fingerprint,
+    this has the same interface as the journal, but is kept in memory
+    """
+
+    def __init__(self) -> None:
+        self.completed = {}
+        # Results recorded since the last reset, i.e. the ones run
+        self.recorded = []
+
+    def get(self, file: str, fingerprint: str) -> 'TestResult|None':
+        """Return result of the test of FILE and FINGERPRINT if it was completed"""
+        return self.completed.get((file, fingerprint))
+
+    def record(self, fingerprint: str, result: TestResult) -> None:
+        """Record RESULT of the test of FINGERPRINT, only completed tests are recorded"""
+        if result.status in [PASSED, FAILED]:
+            self.completed[(result.file, fingerprint)] = result
+            self.recorded.append(result)
+
+
+if __name__ == '__main__':
+    warning_not_intended_for_cmd()
@@ -30,6 +30,9 @@ class BatsppArgs:
             run_opts: str = '',
             copy_dir: str = '',
             debug: str = '',
+            fixtures_threshold: int = 0,
+            capture_limit: int = 0,
+            timeout: int = 0,
             ) -> None:
 
         # Check for sources, filter empty sources
@@ -60,6 +63,21 @@ class BatsppArgs:
         assert_type(debug, str)
         self.debug = debug
 
+        # Check for fixtures_threshold (in bytes, 0 disables fixtures)
+        assert_type(fixtures_threshold, int)
+        assert fixtures_threshold >= 0, 'fixtures_threshold cannot be negative'
+        self.fixtures_threshold = fixtures_threshold
+
+        # Check for capture_limit (in bytes, 0 captures full outputs)
+        assert_type(capture_limit, int)
+        assert capture_limit >= 0, 'capture_limit cannot be negative'
+        self.capture_limit = capture_limit
+
+        # Check for timeout (in seconds per test, 0 disables timeouts)
+        assert_type(timeout, int)
+        assert timeout >= 0, 'timeout cannot be negative'
+        self.timeout = timeout
+
 
 if __name__ == '__main__':
     warning_not_intended_for_cmd()
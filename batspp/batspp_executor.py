@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+#
+# Batspp executor module
+#
+# This runs generated tests on a pool of long-lived bash
+# workers instead of bats, avoiding the start-up of bats
+# and the re-sourcing of files on every test.
+#
+# Tests are killed after BATS_TEST_TIMEOUT seconds (if any) as bats
+# does, and files whose tests require sudo are run with bats instead.
+
+
+"""Batspp executor module"""
+
+
+# Standard packages
+from os import (
+    cpu_count as os_cpu_count,
+    environ as os_environ,
+    killpg as os_killpg,
+    read as os_read,
+    path as os_path,
+    )
+from queue import Queue, Empty
+from re import (
+    compile as re_compile,
+    MULTILINE as re_MULTILINE,
+    )
+from select import select
+from signal import SIGKILL
+from subprocess import Popen, PIPE, DEVNULL
+from tempfile import TemporaryDirectory
+from threading import Event, Lock, Thread
+from time import monotonic
+
+# Installed packages
+from mezcla import debug
+from mezcla import glue_helpers as gh
+
+# Local packages
+from batspp._settings import BATS_EXTENSION
+from batspp.batspp_opts import BatsppOpts
+from batspp.batspp_args import BatsppArgs
+from batspp.batspp_test import BatsppTest, copy_args_opts
+from batspp._tap import TapParser, TestResult, SKIPPED, FAILED, NOT_RUN
+from batspp._exceptions import (
+    warning, warning_not_intended_for_cmd,
+    )
+
+
+# Constants
+TEST_FUNCTION_PREFIX = 'batspp_test_'
+TEST_PATTERN = re_compile(r'^@test "(.*)" \{$')
+TIMEOUT_PATTERN = re_compile(r'^BATS_TEST_TIMEOUT="?(\d+)"?$', re_MULTILINE)
+READ_SIZE = 65536
+
+# This is the main loop of each worker, the protocol is line based:
+#
+# load <script> -> sources the tests script on a new subshell
+# run <number>  -> runs the test on an isolated subshell, replying
+#                  '<status>\0<output>\0' over the standard output
+# end           -> leaves the subshell of the tests script
+#
+# Errors are reported with the trap of the test level,
+# so failures of command substitutions are not reported.
+WORKER_SCRIPT = (
+    'function batspp_report () {\n'
+    '\techo "\\`$BASH_COMMAND\' failed"\n'
+    '}\n'
+    '\n'
+    'function batspp_run () {\n'
+    '\tlocal output status\n'
+    '\texport BATS_TEST_NUMBER="$1"\n'
+    '\texport BATS_TEST_TMPDIR="$BATS_RUN_TMPDIR/test/$1"\n'
+    '\tmkdir --parents "$BATS_TEST_TMPDIR"\n'
+    '\toutput=$(\n'
+    '\t\texec 2>&1 < /dev/null\n'
+    '\t\tset -eE\n'
+    '\t\tlevel=$BASH_SUBSHELL\n'
+    '\t\ttrap \'[ "$BASH_SUBSHELL" -ne "$level" ] || batspp_report\' ERR\n'
+    f'\t\t"{TEST_FUNCTION_PREFIX}$1"\n'
+    '\t)\n'
+    '\tstatus=$?\n'
+    '\tprintf \'%s\\0%s\\0\' "$status" "$output"\n'
+    '}\n'
+    '\n'
+    'function batspp_load () {\n'
+    '\t(\n'
+    '\t\tsource "$1" > /dev/null 2>&1 < /dev/null\n'
+    '\t\twhile IFS=" " read -r command argument; do\n'
+    '\t\t\tcase "$command" in\n'
+    '\t\t\t\trun) batspp_run "$argument";;\n'
+    '\t\t\t\tend) break;;\n'
+    '\t\t\tesac\n'
+    '\t\tdone\n'
+    '\t)\n'
+    '}\n'
+    '\n'
+    'while IFS=" " read -r command argument; do\n'
+    '\tcase "$command" in\n'
+    '\t\tload) batspp_load "$argument";;\n'
+    '\t\trun) printf \'%s\\0%s\\0\' 1 "batspp: unable to load tests script";;\n'
+    '\tesac\n'
+    'done\n'
+    )
+
+
+class BatsppExecutor:
+    """
+    This is responsible to run Batspp tests on a pool
+    of bash workers, as an alternative to BatsppTest.run
+    """
+
+    def __init__(self, workers:int = 0) -> None:
+        assert workers >= 0, 'Number of workers cannot be negative'
+        self.num_workers = workers if workers else os_cpu_count()
+        self.workers = []
+        self.batspp_test = BatsppTest()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def start(self) -> None:
+        """Start workers, this is done once for all the runs"""
+        while len(self.workers) < self.num_workers:
+            self.workers.append(Worker())
+        debug.trace(7, f'BatsppExecutor.start() => {len(self.workers)} workers')
+
+    def close(self) -> None:
+        """Stop workers"""
+        for worker in self.workers:
+            worker.close()
+        self.workers = []
+
+    def run(
+            self,
+            file:str,
+            args: BatsppArgs = BatsppArgs(),
+            opts: BatsppOpts = BatsppOpts(),
+            fail_fast: int = 0,
+            ) -> str:
+        """
+        Run Batspp test FILE and return TAP result, stopping after FAIL_FAST failures (if any),
+        files with tests requiring sudo are run with bats
+        """
+        assert file, 'File path cannot be empty'
+        with TemporaryDirectory(prefix='batspp-') as temp_dir:
+            bats_file = gh.form_path(temp_dir, f'tests.{BATS_EXTENSION}')
+            self.batspp_test.transpile_and_save_bats(file, bats_file, args=args, opts=opts)
+            if self.batspp_test.interpreter.sudo_required:
+                warning(f'tests of {file} require sudo, these are run with bats')
+                return gh.run(f'sudo bats {args.run_opts} {bats_file}')
+            return self.run_bats(bats_file, fail_fast=fail_fast)
+
+    def run_stream(
+            self,
+            file:str,
+            args: BatsppArgs = BatsppArgs(),
+            opts: BatsppOpts = BatsppOpts(),
+            output = None,
+            fail_fast: int = 0,
+            ):
+        """
+        Run Batspp test FILE, generator of TestResult as these are completed (in order),
+        also the TAP lines are written to OUTPUT stream, files with tests requiring sudo
+        are run with bats
+        """
+        assert file, 'File path cannot be empty'
+        with TemporaryDirectory(prefix='batspp-') as temp_dir:
+            bats_file = gh.form_path(temp_dir, f'tests.{BATS_EXTENSION}')
+            self.batspp_test.transpile_and_save_bats(file, bats_file, args=args, opts=opts)
+            interpreter = self.batspp_test.interpreter
+            if interpreter.sudo_required:
+                warning(f'tests of {file} require sudo, these are run with bats')
+                yield from self.batspp_test.stream_bats(
+                    f'sudo bats {args.run_opts} {bats_file}',
+                    tests_lines = interpreter.tests_lines,
+                    output = output,
+                    fail_fast = fail_fast,
+                    tests_names = interpreter.tests_names,
+                    )
+                return
+            # NOTE: the lines of each test are complete, so
+            #       its result is yielded without waiting the next
+            parser = TapParser(source_lines=interpreter.tests_lines)
+            for lines in self.stream_tap(bats_file, fail_fast=fail_fast):
+                for line in lines:
+                    if output:
+                        output.write(f'{line}\n')
+                        output.flush()
+                    yield from parser.feed(line)
+                yield from parser.close()
+
+    def run_files_stream(
+            self,
+            files:list,
+            args: BatsppArgs = BatsppArgs(),
+            opts: BatsppOpts = BatsppOpts(),
+            output = None,
+            fail_fast: int = 0,
+            ):
+        """
+        Run Batspp test FILES, generator of TestResult grouped by file,
+        also the TAP lines are written to OUTPUT stream, with FAIL_FAST the
+        run is stopped after that number of failures, the tests of the
+        pending files are yielded as skipped
+        """
+        number, failures = 0, 0
+        for file in files:
+            file_args, file_opts = copy_args_opts(args, opts)
+            if fail_fast and failures >= fail_fast:
+                self.batspp_test.transpile_to_bats(file, args=file_args, opts=file_opts)
+                interpreter = self.batspp_test.interpreter
+                results = [
+                    TestResult(0, name, SKIPPED, diagnostics=[NOT_RUN], line=line)
+                    for name, line in zip(interpreter.tests_names, interpreter.tests_lines)
+                    ]
+            else:
+                remaining = fail_fast - failures if fail_fast else 0
+                results = self.run_stream(file, args=file_args, opts=file_opts, output=output, fail_fast=remaining)
+            for result in results:
+                number += 1
+                failures += result.status == FAILED
+                result.number, result.file = number, file
+                yield result
+
+    def run_bats(self, bats_file:str, fail_fast:int = 0) -> str:
+        """Run generated BATS_FILE and return TAP result, stopping after FAIL_FAST failures (if any)"""
+        return '\n'.join(line for lines in self.stream_tap(bats_file, fail_fast=fail_fast) for line in lines)
+
+    def stream_tap(self, bats_file:str, fail_fast:int = 0):
+        """
+        Run generated BATS_FILE, generator of the TAP lines of the plan and then of each
+        test as these are completed (in order), stopping after FAIL_FAST failures (if any)
+        """
+        assert bats_file, 'File path cannot be empty'
+        with TemporaryDirectory(prefix='batspp-') as temp_dir:
+            content = gh.read_file(bats_file)
+            script, titles = convert_bats_to_script(
+                content,
+                bats_file = os_path.abspath(bats_file),
+                run_dir = temp_dir,
+                )
+            script_file = gh.form_path(temp_dir, 'tests.bash')
+            gh.write_file(script_file, script)
+            yield [f'1..{len(titles)}']
+            results = self.execute_stream(
+                script_file, len(titles), fail_fast=fail_fast, timeout=get_test_timeout(content),
+                )
+            for number, result in results:
+                yield format_result(number, titles[number - 1], result)
+
+    def execute(self, script_file:str, num_tests:int, fail_fast:int = 0, timeout:int = 0) -> list:
+        """
+        Run the NUM_TESTS tests of SCRIPT_FILE on the workers, returns a list of
+        (status, output) per test, with FAIL_FAST the workers are stopped after
+        that number of failures, and the tests not run are None, tests running
+        longer than TIMEOUT seconds (if any) are killed
+        """
+        results = [None] * num_tests
+        for number, result in self.execute_stream(script_file, num_tests, fail_fast=fail_fast, timeout=timeout):
+            results[number - 1] = result
+        debug.trace(7, f'BatsppExecutor.execute({script_file}, {num_tests}) => {results}')
+        return results
+
+    def execute_stream(self, script_file:str, num_tests:int, fail_fast:int = 0, timeout:int = 0):
+        """
+        Run the NUM_TESTS tests of SCRIPT_FILE on the workers as execute does,
+        generator of (number, result) in order, as soon as each test and the
+        previous ones are completed
+        """
+        self.start()
+
+        pending = Queue()
+        for number in range(1, num_tests + 1):
+            pending.put(number)
+        completed = Queue()
+        stop, lock = Event(), Lock()
+        failures = [0]
+
+        # Each thread puts the completed tests on the queue, then None
+        def serve(index):
+            worker = self.workers[index]
+            try:
+                worker.load(script_file)
+                while not stop.is_set():
+                    try:
+                        number = pending.get_nowait()
+                    except Empty:
+                        break
+                    result = worker.run_test(number, timeout=timeout)
+                    # Tests of killed workers were not completed
+                    if stop.is_set() and not worker.is_alive():
+                        break
+                    completed.put((number, result))
+                    if fail_fast and result[0]:
+                        with lock:
+                            failures[0] += 1
+                            if failures[0] >= fail_fast and not stop.is_set():
+                                stop.set()
+                                for other in self.workers:
+                                    if other is not worker:
+                                        other.kill()
+
+                    # Workers killed by a timeout are replaced for the next tests
+                    if not worker.is_alive() and not stop.is_set():
+                        worker = Worker()
+                        with lock:
+                            self.workers[index] = worker
+                        worker.load(script_file)
+                worker.unload()
+            finally:
+                completed.put(None)
+
+        # Each worker is served by a thread, as these mostly wait on pipes
+        threads = [Thread(target=serve, args=(index,)) for index in range(min(len(self.workers), num_tests))]
+        for thread in threads:
+            thread.start()
+        try:
+            results, next_number, finished = {}, 1, 0
+            while finished < len(threads):
+                item = completed.get()
+                if item is None:
+                    finished += 1
+                    continue
+                results[item[0]] = item[1]
+                while next_number in results:
+                    yield next_number, results.pop(next_number)
+                    next_number += 1
+
+            # Tests not run after the failures limit
+            for number in range(next_number, num_tests + 1):
+                yield number, results.pop(number, None)
+        finally:
+            # NOTE: runs left by the caller are stopped after their current test
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+            # Replace lost workers for the next runs
+            self.workers = [worker for worker in self.workers if worker.is_alive()]
+
+
+class Worker:
+    """Long-lived bash process running tests"""
+
+    def __init__(self) -> None:
+        self.process = Popen(
+            ['bash', '--noprofile', '--norc', '-c', WORKER_SCRIPT],
+            stdin=PIPE, stdout=PIPE, stderr=DEVNULL,
+            start_new_session=True,
+            )
+        self.buffer = b''
+
+    def send(self, line:str) -> None:
+        """Send command LINE to the worker"""
+        self.process.stdin.write(f'{line}\n'.encode())
+        self.process.stdin.flush()
+
+    def load(self, script_file:str) -> None:
+        """Load SCRIPT_FILE, sourcing it once for all the tests run"""
+        self.send(f'load {script_file}')
+
+    def unload(self) -> None:
+        """Unload last loaded script"""
+        if self.is_alive():
+            self.send('end')
+
+    def run_test(self, number:int, timeout:int = 0) -> tuple:
+        """Run test NUMBER, returns status and output, the worker is killed after TIMEOUT seconds (if any)"""
+        if not self.is_alive():
+            return 1, 'batspp: worker exited unexpectedly'
+        self.send(f'run {number}')
+        try:
+            status, output = self.read_fields(2, timeout=timeout)
+        # NOTE: tests cannot be stopped alone, so the whole worker is killed
+        except TimeoutError:
+            self.kill()
+            self.close()
+            return 1, f'batspp: test timed out after {timeout}s'
+        if status is None:
+            return 1, 'batspp: worker exited unexpectedly'
+        return int(status), output
+
+    def read_fields(self, count:int, timeout:int = 0) -> list:
+        """
+        Read COUNT NUL-delimited fields, or Nones if the worker exited,
+        raises TimeoutError if these are not read in TIMEOUT seconds (if any)
+        """
+        deadline = monotonic() + timeout if timeout else 0
+        fields = []
+        while len(fields) < count:
+            if b'\0' in self.buffer:
+                field, self.buffer = self.buffer.split(b'\0', 1)
+                fields.append(field.decode(errors='replace'))
+                continue
+            if deadline and not select([self.process.stdout], [], [], max(0, deadline - monotonic()))[0]:
+                raise TimeoutError(f'worker did not reply in {timeout}s')
+            data = os_read(self.process.stdout.fileno(), READ_SIZE)
+            if not data:
+                self.close()
+                return [None] * count
+            self.buffer += data
+        return fields
+
+    def kill(self) -> None:
+        """Kill the worker and the running test, with its child processes"""
+        if self.is_alive():
+            try:
+                os_killpg(self.process.pid, SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    def is_alive(self) -> bool:
+        """Whether the worker process is still running"""
+        return self.process.poll() is None
+
+    def close(self) -> None:
+        """Stop the worker"""
+        if self.is_alive():
+            self.process.stdin.close()
+            self.process.wait()
+        self.process.stdout.close()
+
+
+def convert_bats_to_script(
+        content:str,
+        bats_file:str,
+        run_dir:str,
+        ) -> tuple:
+    """
+    Convert bats CONTENT into a bash script where each test is a
+    numbered function, returns the script and the tests titles
+    """
+    titles = []
+
+    def replace_test(match):
+        titles.append(match.group(1))
+        return f'function {TEST_FUNCTION_PREFIX}{len(titles)} () {{'
+
+    # Variables used by generated tests are set as bats does
+    result = (
+        f'BATS_TEST_FILENAME="{bats_file}"\n'
+        f'BATS_RUN_TMPDIR="{run_dir}"\n'
+        f'BATS_TMPDIR="{run_dir}"\n'
+        )
+    result += '\n'.join([
+        TEST_PATTERN.sub(replace_test, line) for line in content.splitlines()
+        ])
+
+    debug.trace(7, f'batspp_executor.convert_bats_to_script() => {titles}')
+    return result, titles
+
+
+def get_test_timeout(content:str) -> int:
+    """Return BATS_TEST_TIMEOUT seconds set by bats CONTENT or the environment, 0 if not set"""
+    match = TIMEOUT_PATTERN.search(content)
+    value = match.group(1) if match else os_environ.get('BATS_TEST_TIMEOUT', '')
+    return int(value) if value.isdigit() else 0
+
+
+def format_result(number:int, title:str, result:'tuple|None') -> list:
+    """
+    Format RESULT of test NUMBER with TITLE as TAP lines, the output
+    of failed tests is commented, and tests not run (None) are skipped
+    """
+    if result is None:
+        return [f'ok {number} {title} # skip', f'# {NOT_RUN}']
+    status, output = result
+    lines = [f'{"not ok" if status else "ok"} {number} {title}']
+    if status and output:
+        lines += [f'# {line}' for line in output.splitlines()]
+    return lines
+
+
+def format_tap(titles:list, results:list) -> str:
+    """Format tests TITLES and RESULTS as TAP, as format_result does for each test"""
+    lines = [f'1..{len(titles)}']
+    for number, (title, result) in enumerate(zip(titles, results), start=1):
+        lines += format_result(number, title, result)
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    warning_not_intended_for_cmd()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+#
+# Batspp pipeline module
+#
+# This provides the transpilation as pure functions, each call
+# uses its own lexer, parser and interpreter and doesn't modify
+# its arguments, so these are safe to call from many threads, and
+# from process pools as functions and results can be pickled.
+#
+
+
+"""Batspp pipeline module"""
+
+
+# Standard packages
+from copy import copy
+from io import StringIO
+
+# Installed packages
+from mezcla import debug
+from mezcla import glue_helpers as gh
+
+# Local packages
+from batspp._cache import compute_cell_key
+from batspp._lexer import Lexer
+from batspp._token import Token, TokenVariant
+from batspp._parser import Parser
+from batspp._interpreter import Interpreter
+from batspp._ast_nodes import TestsSuite
+from batspp._ipynb_to_batspp import IpynbToBatspp
+from batspp._settings import BATSPP_EXTENSION, IPYNB_EXTENSION
+from batspp.batspp_opts import BatsppOpts
+from batspp.batspp_args import BatsppArgs
+from batspp._exceptions import (
+    BatsppError, warning_not_intended_for_cmd,
+    )
+
+
+class Transpilation:
+    """
+    Result of transpiling Batspp tests, the Bats CONTENT and the
+    TESTS_LINES and TESTS_NAMES of its tests, whether its commands
+    require sudo (SUDO_REQUIRED) and its FIXTURES ({name: bytes})
+    """
+
+    def __init__(
+            self,
+            content: str,
+            tests_lines: list,
+            tests_names: list,
+            sudo_required: bool = False,
+            fixtures: 'dict|None' = None,
+            ) -> None:
+        self.content = content
+        self.tests_lines = tests_lines
+        self.tests_names = tests_names
+        self.sudo_required = sudo_required
+        self.fixtures = fixtures if fixtures else {}
+
+
+def copy_args_opts(args: BatsppArgs, opts: BatsppOpts) -> tuple:
+    """Return copies of ARGS and OPTS, so these are not modified when transpiling a file"""
+    args, opts = copy(args), copy(opts)
+    args.sources = list(args.sources) if args.sources else None
+    return args, opts
+
+
+def is_embedded_file(file: str) -> bool:
+    """Whether tests of FILE are embedded in a script, i.e. it's not a Batspp or notebook file"""
+    return not file.endswith((f'.{BATSPP_EXTENSION}', f'.{IPYNB_EXTENSION}'))
+
+
+def resolve_args_opts(file: str, args: BatsppArgs, opts: BatsppOpts) -> tuple:
+    """
+    Return copies of ARGS and OPTS to transpile FILE: when not given, tests are embedded
+    if it's a script, and scripts with embedded tests are sources of their own tests
+    """
+    args, opts = copy_args_opts(args, opts)
+    if opts.embedded_tests is None:
+        opts.embedded_tests = is_embedded_file(file)
+    if opts.embedded_tests and file not in (args.sources or []):
+        args.sources = (args.sources or []) + [file]
+    return args, opts
+
+
+def read_tests(file: str) -> str:
+    """Return Batspp tests text of FILE, notebooks are converted as these are read"""
+    if not file.endswith(f'.{IPYNB_EXTENSION}'):
+        return gh.read_file(file)
+    sink = StringIO()
+    with open(file, encoding='utf-8') as notebook:
+        IpynbToBatspp().convert_stream(notebook, sink)
+    return sink.getvalue()
+
+
+def read_tokens(file: str, opts: BatsppOpts, cells_cache = None) -> list:
+    """
+    Return tokens of Batspp tests FILE with OPTS, the cells of notebooks are
+    tokenized one by one, taking the unchanged cells from CELLS_CACHE (if any)
+    """
+    if not cells_cache or opts.embedded_tests or not file.endswith(f'.{IPYNB_EXTENSION}'):
+        return Lexer().tokenize(read_tests(file), bool(opts.embedded_tests))
+
+    # Tokens of cells are spliced moving their lines after
+    # the previous cells, as the text of cells ends with newline
+    converter = IpynbToBatspp()
+    result, offset = [], 0
+    with open(file, encoding='utf-8') as notebook:
+        for cell in converter.iter_cells(notebook):
+            key = compute_cell_key(cell)
+            entry = cells_cache.load(key)
+            if entry is None:
+                text = converter.convert_cell(cell)
+                try:
+                    tokens = Lexer().tokenize(text)
+                # NOTE: errors are raised with the lines of the whole notebook
+                except BatsppError:
+                    return Lexer().tokenize(read_tests(file))
+                entry = {
+                    'lines': len(text.splitlines()),
+                    'tokens': [token.to_dict() for token in tokens if token.variant is not TokenVariant.EOF],
+                    }
+                cells_cache.save(key, entry)
+            result += [Token.from_dict(token, line_offset=offset) for token in entry['tokens']]
+            offset += entry['lines']
+    result.append(Token(TokenVariant.EOF, None, None))
+    debug.trace(7, f'batspp_pipeline.read_tokens({file}) => {len(result)} tokens')
+    return result
+
+
+def transpile_tokens(
+        tokens: list,
+        args: 'BatsppArgs|None' = None,
+        opts: 'BatsppOpts|None' = None,
+        ) -> Transpilation:
+    """Return transpilation of Batspp tests TOKENS with ARGS and OPTS"""
+    embedded_tests = bool(opts and opts.embedded_tests)
+    return transpile_tree(Parser().parse(tokens, embedded_tests), args=args, opts=opts)
+
+
+def transpile_tree(
+        tree: TestsSuite,
+        args: 'BatsppArgs|None' = None,
+        opts: 'BatsppOpts|None' = None,
+        ) -> Transpilation:
+    """Return transpilation of Batspp tests TREE (i.e. with some tests selected) with ARGS and OPTS"""
+    args, opts = copy_args_opts(args or BatsppArgs(), opts or BatsppOpts())
+    opts.embedded_tests = bool(opts.embedded_tests)
+    interpreter = Interpreter()
+    content = interpreter.interpret(tree, opts=opts, args=args)
+    return Transpilation(
+        content = content,
+        tests_lines = interpreter.tests_lines,
+        tests_names = interpreter.tests_names,
+        sudo_required = interpreter.sudo_required,
+        fixtures = interpreter.fixtures,
+        )
+
+
+def transpile_text(
+        text: str,
+        args: 'BatsppArgs|None' = None,
+        opts: 'BatsppOpts|None' = None,
+        ) -> Transpilation:
+    """Return transpilation of Batspp tests TEXT with ARGS and OPTS"""
+    embedded_tests = bool(opts and opts.embedded_tests)
+    return transpile_tokens(Lexer().tokenize(text, embedded_tests), args=args, opts=opts)
+
+
+def transpile_file(
+        file: str,
+        args: 'BatsppArgs|None' = None,
+        opts: 'BatsppOpts|None' = None,
+        cells_cache = None,
+        ) -> Transpilation:
+    """
+    Return transpilation of Batspp test FILE with ARGS and OPTS,
+    the unchanged cells of notebooks are taken from CELLS_CACHE (if any)
+    """
+    assert file, 'File path cannot be empty'
+    args, opts = resolve_args_opts(file, args or BatsppArgs(), opts or BatsppOpts())
+    result = transpile_tokens(read_tokens(file, opts, cells_cache), args=args, opts=opts)
+    debug.trace(7, f'batspp_pipeline.transpile_file({file}) => {len(result.tests_lines)} tests')
+    return result
+
+
+if __name__ == '__main__':
+    warning_not_intended_for_cmd()
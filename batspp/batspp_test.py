@@ -8,26 +8,84 @@
 
 
 # Standard packages
-from re import search as re_search
+from asyncio import (
+    Queue as AsyncQueue,
+    Semaphore,
+    create_subprocess_exec,
+    create_task,
+    gather,
+    get_running_loop,
+    )
+from base64 import b64decode, b64encode
+from functools import partial
+from os import (
+    chmod as os_chmod,
+    cpu_count as os_cpu_count,
+    killpg as os_killpg,
+    makedirs as os_makedirs,
+    path as os_path,
+    stat as os_stat,
+    )
+from shlex import split as shlex_split
+from signal import SIGINT, SIGKILL
+from subprocess import Popen, PIPE, STDOUT
+from tempfile import TemporaryDirectory
+from threading import Timer
+from re import (
+    search as re_search,
+    sub as re_sub,
+    )
 
 # Installed packages
+from mezcla import debug
 from mezcla import glue_helpers as gh
 
 # Local packages
 from batspp._lexer import Lexer
 from batspp._parser import Parser
-from batspp._interpreter import Interpreter
-from batspp._ipynb_to_batspp import IpynbToBatspp
+from batspp._interpreter import (
+    Interpreter, FIXTURES_EXTENSION, BUNDLE_SEPARATOR,
+    )
+from batspp._tap import (
+    TapParser, TestResult, FAILED, SKIPPED, NOT_RUN, build_missing_results, get_exit_diagnostics,
+    )
+from batspp._sharding import (
+    estimate_durations, partition_tests, get_shard_path,
+    )
+from batspp._cache import (
+    Cache, MemoryCache, ResultCache, compute_key, fingerprint_test, CELLS_ENTRIES,
+    )
+from batspp._history import order_tests
+from batspp._selection import compile_filter, select_tests
+from batspp._journal import Journal
+from batspp._ast_nodes import TestsSuite
 from batspp._settings import (
     BATSPP_EXTENSION, BATS_EXTENSION
 )
 from batspp.batspp_opts import BatsppOpts
 from batspp.batspp_args import BatsppArgs
+# NOTE: copy_args_opts is also imported from here
+from batspp.batspp_pipeline import (
+    Transpilation, copy_args_opts, resolve_args_opts, read_tokens, transpile_file, transpile_tree,
+    )
 from batspp._exceptions import (
-    warning_not_intended_for_cmd,
+    error, warning_not_intended_for_cmd,
     )
 
 
+# Constants
+#
+# Memory-backed folder for the tests files of run_text,
+# when it's not available the default temporal folder is used
+MEMORY_DIR = '/dev/shm'
+
+# Seconds to wait the diagnostics of the last failure with fail fast
+FAIL_FAST_GRACE = 0.2
+
+# Maximum length in bytes of the lines of bats read by the async API
+ASYNC_LINE_LIMIT = 2 ** 24
+
+
 def add_prefix_to_filename(file:str, prefix:str) -> str:
     """Adds PREFIX to FILE path"""
     return f'{gh.dir_path(file)}/{prefix}{gh.basename(file)}'
@@ -62,12 +120,30 @@ def resolve_path(path:str, alternative:str) -> str:
     return result
 
 
+def get_fixtures_dir(bats_file:str) -> str:
+    """Return fixtures directory path of BATS_FILE, e.g. /tmp/test.bats => /tmp/test.fixtures"""
+    result = re_sub(fr'\.{BATS_EXTENSION}$', '', bats_file)
+    return f'{result}.{FIXTURES_EXTENSION}'
+
+
 class BatsppTest:
     """
-    This is responsible to parse and run Batspp tests
+    This is responsible to parse and run Batspp tests,
+    instances keep the state of the last transpiled file,
+    so these cannot be shared between threads, for that
+    use the functions of batspp_pipeline instead
     """
 
-    def __init__(self) -> None:
+    def __init__(
+            self,
+            cache_dir:str = '',
+            results: 'ResultCache|None' = None,
+            history: 'dict|None' = None,
+            order: 'list|None' = None,
+            journal: 'Journal|None' = None,
+            test_filter: str = '',
+            selectors: 'dict|None' = None,
+            ) -> None:
         # Most used classes
         #
         # this avoid to instanciate a new class
@@ -75,7 +151,30 @@ class BatsppTest:
         self.lexer = Lexer()
         self.parser = Parser()
         self.interpreter = Interpreter()
-        self.ipynb_to_text = IpynbToBatspp()
+
+        # Generated tests are cached on CACHE_DIR (if any),
+        # and with RESULTS the tests that passed are skipped
+        self.cache = Cache(cache_dir) if cache_dir else None
+        self.results = results
+
+        # The tokens of notebooks cells are kept in memory (and on the
+        # cache), so only the changed cells are converted and tokenized
+        self.cells_cache = MemoryCache(self.cache, max_entries=CELLS_ENTRIES)
+
+        # Tests are reordered by their HISTORY
+        # ({(file, name): TestResult}) using the ORDER keys
+        self.history = history if history else {}
+        self.order = order if order else []
+
+        # Only the tests with a name matching TEST_FILTER
+        # and selected by the SELECTORS ({file: lines}) are kept
+        self.filter = compile_filter(test_filter)
+        self.selectors = selectors if selectors else {}
+
+        # Results are appended to the JOURNAL (if any) as these are
+        # completed, and the tests completed on it are not run again
+        self.journal = journal
+        self.hashes = {}
 
     def _is_not_batspp_file(self, file:str) -> bool:
         """Whether is FILE is a batspp test file"""
@@ -89,33 +188,204 @@ class BatsppTest:
         """Whether is FILE is not a Jupyter notebook file"""
         return not self.is_ipynb_file(file)
 
-    def transpile_to_bats(
+    def parse(
             self,
             file: str,
             args: BatsppArgs = BatsppArgs(),
             opts: BatsppOpts = BatsppOpts()
-            ) -> str:
-        """Return transpiled Bats content from Batspp test FILE"""
+            ) -> TestsSuite:
+        """
+        Return abstract syntax tree from Batspp test FILE, ARGS and OPTS are not
+        modified, these are resolved for the file with resolve_args_opts
+        """
         assert file, 'File path cannot be empty'
+        _args, opts = resolve_args_opts(file, args, opts)
+        return self.parser.parse(read_tokens(file, opts, self.cells_cache), opts.embedded_tests)
 
-        # Check for embedded tests
-        if opts.embedded_tests is None:
-            opts.embedded_tests = self._is_not_batspp_file(file) and self.is_not_ipynb_file(file)
+    def parse_text(
+            self,
+            text: str,
+            opts: BatsppOpts = BatsppOpts()
+            ) -> TestsSuite:
+        """Return abstract syntax tree from Batspp tests TEXT"""
+        tokens = self.lexer.tokenize(text, opts.embedded_tests)
+        return self.parser.parse(tokens, opts.embedded_tests)
 
-        # Check for sources files
-        if opts.embedded_tests:
-            if args.sources:
-                args.sources.append(file)
-            else:
-                args.sources = [file]
+    def transpile_to_bats(
+            self,
+            file: str,
+            args: BatsppArgs = BatsppArgs(),
+            opts: BatsppOpts = BatsppOpts()
+            ) -> str:
+        """Return transpiled Bats content from Batspp test FILE, unchanged files are taken from the cache"""
+        args, opts = resolve_args_opts(file, args, opts)
+
+        # NOTE: reordered tests depend on the history, so these are not cached,
+        #       neither the selections of tests
+        key = compute_key(file, args, opts) if self.cache and not self.order and not self.is_selecting() else ''
+        entry = self.cache.load(key) if key else None
+        if entry:
+            # The interpreter state of the cached
+            # transpilation is restored for the callers
+            transpilation = load_cache_entry(entry)
+            self.interpreter.reset_global_state_variables()
+            self.interpreter.tests_lines = transpilation.tests_lines
+            self.interpreter.tests_names = transpilation.tests_names
+            self.interpreter.sudo_required = transpilation.sudo_required
+            self.interpreter.fixtures = transpilation.fixtures
+            return transpilation.content
 
-        # Transpilation
-        content = gh.read_file(file)
-        content = self.ipynb_to_text.convert(content) if self.is_ipynb_file(file) else content
-        tokens = self.lexer.tokenize(content, opts.embedded_tests)
-        tree = self.parser.parse(tokens, opts.embedded_tests)
+        tree = self.parse(file, args=args, opts=opts)
+        self.select_tests(file, tree)
+        self.reorder_tests(file, tree)
         result = self.interpreter.interpret(tree, opts=opts, args=args)
 
+        if key:
+            self.cache.save(key, build_cache_entry(Transpilation(
+                content = result,
+                tests_lines = self.interpreter.tests_lines,
+                tests_names = self.interpreter.tests_names,
+                sudo_required = self.interpreter.sudo_required,
+                fixtures = self.interpreter.fixtures,
+                )))
+        return result
+
+    def add_to_cache(
+            self,
+            file: str,
+            transpilation: Transpilation,
+            args: BatsppArgs = BatsppArgs(),
+            opts: BatsppOpts = BatsppOpts(),
+            ) -> None:
+        """Add TRANSPILATION of FILE with ARGS and OPTS made elsewhere (e.g. on a process pool) to the cache"""
+        if self.cache:
+            args, opts = resolve_args_opts(file, args, opts)
+            self.cache.save(compute_key(file, args, opts), build_cache_entry(transpilation))
+
+    async def transpile_to_bats_async(
+            self,
+            file: str,
+            args: BatsppArgs = BatsppArgs(),
+            opts: BatsppOpts = BatsppOpts(),
+            executor = None,
+            ) -> str:
+        """
+        Return transpiled Bats content from Batspp test FILE as transpile_to_bats does,
+        without blocking the event loop, the work is run on EXECUTOR (default of the loop if None)
+        """
+        transpilation = await self.transpile_async(file, args=args, opts=opts, executor=executor)
+        return transpilation.content
+
+    async def transpile_async(
+            self,
+            file: str,
+            args: BatsppArgs = BatsppArgs(),
+            opts: BatsppOpts = BatsppOpts(),
+            executor = None,
+            ) -> Transpilation:
+        """
+        Return transpilation of Batspp test FILE, unchanged files are taken from the cache,
+        otherwise it's run on EXECUTOR (default of the loop if None) with the functions of
+        batspp_pipeline, so the instance is not shared and process pools can be used
+        """
+        args, opts = resolve_args_opts(file, args, opts)
+        key = compute_key(file, args, opts) if self.cache and not self.order and not self.is_selecting() else ''
+        entry = self.cache.load(key) if key else None
+        if entry:
+            return load_cache_entry(entry)
+
+        if self.order or self.is_selecting():
+            function = partial(transpile_selected, file, args, opts, pattern=self.filter,
+                               lines=self.selectors.get(file), history=self.history, order=self.order)
+        else:
+            function = partial(transpile_file, file, args, opts)
+        result = await get_running_loop().run_in_executor(executor, function)
+        if key:
+            self.cache.save(key, build_cache_entry(result))
+        return result
+
+    def is_selecting(self) -> bool:
+        """Whether only some tests are selected"""
+        return bool(self.filter or self.selectors)
+
+    def select_tests(self, file:str, tree: TestsSuite) -> None:
+        """Keep only the selected tests of TREE of FILE, if any selection was given"""
+        if self.is_selecting():
+            tree.tests = select_tests(tree.tests, pattern=self.filter, lines=self.selectors.get(file))
+
+    def reorder_tests(self, file:str, tree: TestsSuite) -> None:
+        """Reorder tests of TREE of FILE by their history, if any ordering was given"""
+        if self.order:
+            tree.tests = order_tests(tree.tests, file, self.history, self.order)
+
+    def get_tests_order(
+            self,
+            files: list,
+            args: BatsppArgs = BatsppArgs(),
+            opts: BatsppOpts = BatsppOpts()
+            ) -> list:
+        """
+        Return names of the selected tests of FILES prefixed with their file
+        (i.e. "tests.batspp :: first"), in the order these are run
+        """
+        result = []
+        for file in files:
+            file_args, file_opts = resolve_args_opts(file, args, opts)
+            tree = self.parse(file, args=file_args, opts=file_opts)
+            self.select_tests(file, tree)
+            self.reorder_tests(file, tree)
+            result += [f'{file}{BUNDLE_SEPARATOR}{test.reference}' for test in tree.tests]
+        return result
+
+    def transpile_shards(
+            self,
+            files: list,
+            shards: int,
+            output_dir: str,
+            durations: 'dict|None' = None,
+            args: BatsppArgs = BatsppArgs(),
+            opts: BatsppOpts = BatsppOpts()
+            ) -> list:
+        """
+        Transpile Batspp test FILES into SHARDS self-contained bats files saved on OUTPUT_DIR,
+        tests are balanced by their DURATIONS ({(file, name): seconds}), returns the saved paths
+        """
+        assert files, 'Files cannot be empty'
+        durations = durations if durations else {}
+        os_makedirs(output_dir, exist_ok=True)
+
+        # Each file is parsed with its own arguments, as
+        # embedded tests files are sources of their tests
+        suites, tests = [], []
+        for file in files:
+            file_args, file_opts = resolve_args_opts(file, args, opts)
+            tree = self.parse(file, args=file_args, opts=file_opts)
+            self.select_tests(file, tree)
+            suites.append((file, tree, file_args))
+            tests += [(len(suites) - 1, test) for test in tree.tests]
+
+        estimated = estimate_durations([
+            durations.get((suites[index][0], test.reference)) for index, test in tests
+            ])
+        result = []
+        for number, indexes in enumerate(partition_tests(estimated, shards), start=1):
+            shard_suites = []
+            for suite_index, (file, tree, file_args) in enumerate(suites):
+                shard_tests = [tests[i][1] for i in indexes if tests[i][0] == suite_index]
+                if shard_tests:
+                    shard_tree = TestsSuite(
+                        tests = shard_tests,
+                        setup_commands = list(tree.setup_commands or []),
+                        teardown_commands = tree.teardown_commands,
+                        data = tree.data,
+                        )
+                    shard_suites.append((file, shard_tree, file_args))
+            output = get_shard_path(output_dir, number, shards, BATS_EXTENSION)
+            gh.write_file(output, self.interpreter.interpret_bundle(shard_suites, opts=opts, args=args))
+            make_executable(output)
+            self.save_fixtures(output)
+            result.append(output)
+
         return result
 
     def transpile_and_save_bats(
@@ -129,9 +399,18 @@ class BatsppTest:
            if OUTPUT is not provided or is a dir, a default is used 'generated_<file>.bats'"""
         assert file, 'File path cannot be empty'
         output = resolve_path(output, file)
-        transpiled_text = self.transpile_to_bats(file, args=args, opts=opts)
-        gh.write_file(output, transpiled_text)
-        gh.run(f'chmod +x {output}')
+        self.save_bats(self.transpile_to_bats(file, args=args, opts=opts), output)
+
+    def save_bats(self, content:str, output:str) -> None:
+        """Save transpiled CONTENT to OUTPUT path, also the fixtures of the last transpiled test"""
+        os_makedirs(gh.dir_path(output) or '.', exist_ok=True)
+        gh.write_file(output, content)
+        make_executable(output)
+        self.save_fixtures(output)
+
+    def save_fixtures(self, output:str) -> None:
+        """Save expected fixtures of the last transpiled test next to OUTPUT bats file"""
+        save_fixtures(self.interpreter.fixtures, output)
 
     def run(
             self,
@@ -141,10 +420,456 @@ class BatsppTest:
             ) -> str:
         """Run Batspp test FILE and return result"""
         assert file, 'File path cannot be empty'
-        temp_bats = f'{gh.get_temp_file()}.{BATS_EXTENSION}'
-        self.transpile_and_save_bats(file, temp_bats, args=args, opts=opts)
-        sudo = 'sudo' if 'sudo' in gh.read_file(temp_bats) else ''
-        return gh.run(f'{sudo} bats {args.run_opts} {temp_bats}')
+        with TemporaryDirectory(prefix='batspp-') as temp_dir:
+            temp_bats = gh.form_path(temp_dir, f'tests.{BATS_EXTENSION}')
+            self.transpile_and_save_bats(file, temp_bats, args=args, opts=opts)
+            sudo = 'sudo' if self.interpreter.sudo_required else ''
+            return gh.run(f'{sudo} bats {args.run_opts} {temp_bats}')
+
+    def run_text(
+            self,
+            text:str,
+            args: BatsppArgs = BatsppArgs(),
+            opts: BatsppOpts = BatsppOpts(),
+            output = None,
+            ) -> list:
+        """
+        Run Batspp tests TEXT and return the list of TestResult,
+        also the TAP lines are written to OUTPUT stream as these arrive
+        """
+        args, opts = copy_args_opts(args, opts)
+        opts.embedded_tests = bool(opts.embedded_tests)
+
+        # NOTE: bats resolves the path of the tests files, so these
+        #       cannot be given by stdin or a file descriptor, instead
+        #       a memory-backed folder is used when it's available
+        memory_dir = MEMORY_DIR if os_path.isdir(MEMORY_DIR) else None
+        with TemporaryDirectory(prefix='batspp-', dir=memory_dir) as temp_dir:
+            # Embedded tests are sources of their own tests
+            if opts.embedded_tests:
+                source_file = gh.form_path(temp_dir, 'tests.bash')
+                gh.write_file(source_file, text)
+                args.sources = (args.sources or []) + [source_file]
+
+            tree = self.parse_text(text, opts=opts)
+            bats_file = gh.form_path(temp_dir, f'tests.{BATS_EXTENSION}')
+            gh.write_file(bats_file, self.interpreter.interpret(tree, opts=opts, args=args))
+            self.save_fixtures(bats_file)
+            sudo = 'sudo' if self.interpreter.sudo_required else ''
+            return list(self.stream_bats(
+                f'{sudo} bats {args.run_opts} {bats_file}',
+                tests_lines = self.interpreter.tests_lines,
+                output = output,
+                tests_names = self.interpreter.tests_names,
+                ))
+
+    def run_stream(
+            self,
+            file:str,
+            args: BatsppArgs = BatsppArgs(),
+            opts: BatsppOpts = BatsppOpts(),
+            output = None,
+            ):
+        """
+        Run Batspp test FILE, generator of TestResult as these are completed,
+        also the TAP lines are written to OUTPUT stream as these arrive
+        """
+        assert file, 'File path cannot be empty'
+        yield from self.run_files_stream([file], args=args, opts=opts, output=output)
+
+    def run_files_stream(
+            self,
+            files:list,
+            args: BatsppArgs = BatsppArgs(),
+            opts: BatsppOpts = BatsppOpts(),
+            jobs: int = 0,
+            output = None,
+            fail_fast: int = 0,
+            ):
+        """
+        Run Batspp test FILES with a single bats call using JOBS (if any),
+        generator of TestResult grouped by file as these are completed,
+        also the TAP lines are written to OUTPUT stream as these arrive,
+        the tests completed on the journal (if any) are yielded first and
+        the tests skipped by the results cache (if any) are yielded last,
+        with FAIL_FAST the run is stopped after that number of failures
+        """
+        assert files, 'Files cannot be empty'
+
+        with TemporaryDirectory(prefix='batspp-') as temp_dir:
+            # All files are transpiled first, results are mapped
+            # to their files by the number of tests of each one
+            bats_files, tests_files, tests_lines, tests_names = [], [], [], []
+            fingerprints, skipped, resumed = [], [], []
+            sudo_required = False
+            for number, file in enumerate(files, start=1):
+                file_args, file_opts = resolve_args_opts(file, args, opts)
+                bats_file = gh.form_path(temp_dir, f'{number}_{gh.basename(file)}.{BATS_EXTENSION}')
+                if self.results or self.journal:
+                    tree = self.parse(file, args=file_args, opts=file_opts)
+                    self.select_tests(file, tree)
+                    self.reorder_tests(file, tree)
+                    file_fingerprints, file_skipped, file_resumed = self.skip_completed_tests(
+                        file, tree, args=file_args, opts=file_opts,
+                        )
+                    fingerprints += file_fingerprints
+                    skipped += [(file, test) for test in file_skipped]
+                    resumed += file_resumed
+                    self.save_bats(self.interpreter.interpret(tree, opts=file_opts, args=file_args), bats_file)
+                else:
+                    self.transpile_and_save_bats(file, bats_file, args=file_args, opts=file_opts)
+                bats_files.append(bats_file)
+                tests_files += [file] * len(self.interpreter.tests_lines)
+                tests_lines += self.interpreter.tests_lines
+                tests_names += self.interpreter.tests_names
+                sudo_required = sudo_required or self.interpreter.sudo_required
+
+            sudo = 'sudo' if sudo_required else ''
+            jobs_opts = f'--jobs {jobs}' if jobs else ''
+            results = self.stream_bats(
+                f'{sudo} bats {jobs_opts} {args.run_opts} {" ".join(bats_files)}',
+                tests_lines = tests_lines,
+                tests_files = tests_files,
+                output = output,
+                fail_fast = fail_fast,
+                tests_names = tests_names,
+                )
+            if not self.results and not self.journal:
+                yield from results
+                return
+
+            # NOTE: bats is not run if all tests were skipped or resumed
+            if not tests_lines and (skipped or resumed):
+                results = []
+
+            # Results of the journal are yielded first, as these were
+            # completed before, then the results are recorded by the
+            # fingerprint of their tests, renumbered after the former
+            for number, result in enumerate(resumed, start=1):
+                result.number = number
+                yield result
+            for result in results:
+                if 0 < result.number <= len(fingerprints):
+                    for recorder in [self.results, self.journal]:
+                        if recorder:
+                            recorder.record(fingerprints[result.number - 1], result)
+                result.number += len(resumed)
+                yield result
+            for number, (file, test) in enumerate(skipped, start=len(resumed) + len(tests_lines) + 1):
+                yield TestResult(
+                    number = number,
+                    name = test.reference,
+                    status = SKIPPED,
+                    diagnostics = ['unchanged since it passed'],
+                    line = test.data.line,
+                    file = file,
+                    )
+
+    async def run_async(
+            self,
+            files: list,
+            args: BatsppArgs = BatsppArgs(),
+            opts: BatsppOpts = BatsppOpts(),
+            jobs: int = 0,
+            semaphore: 'Semaphore|None' = None,
+            executor = None,
+            ):
+        """
+        Run Batspp test FILES with a single bats call using JOBS (if any), async generator
+        of TestResult grouped by file as these are completed, the transpilation is run on
+        EXECUTOR and the run waits for SEMAPHORE (if any), bats is killed if it's cancelled,
+        the tests not run are yielded as failed at the end if bats exited with an error
+        """
+        assert files, 'Files cannot be empty'
+        if semaphore:
+            await semaphore.acquire()
+        try:
+            with TemporaryDirectory(prefix='batspp-') as temp_dir:
+                bats_files, tests_files, tests_lines, tests_names = [], [], [], []
+                sudo_required = False
+                for number, file in enumerate(files, start=1):
+                    file_args, file_opts = copy_args_opts(args, opts)
+                    bats_file = gh.form_path(temp_dir, f'{number}_{gh.basename(file)}.{BATS_EXTENSION}')
+                    transpilation = await self.transpile_async(file, args=file_args, opts=file_opts,
+                                                               executor=executor)
+                    save_transpilation(transpilation, bats_file)
+                    bats_files.append(bats_file)
+                    tests_files += [file] * len(transpilation.tests_lines)
+                    tests_lines += transpilation.tests_lines
+                    tests_names += transpilation.tests_names
+                    sudo_required = sudo_required or transpilation.sudo_required
+
+                command = (
+                    (['sudo'] if sudo_required else []) + ['bats'] +
+                    (['--jobs', str(jobs)] if jobs else []) + shlex_split(args.run_opts) + bats_files
+                    )
+                process = await create_subprocess_exec(
+                    *command, stdout=PIPE, stderr=STDOUT, start_new_session=True, limit=ASYNC_LINE_LIMIT,
+                    )
+                try:
+                    parser = TapParser(source_lines=tests_lines)
+                    numbers = set()
+                    async for line in process.stdout:
+                        for result in parser.feed(line.decode(errors='replace')):
+                            numbers.add(result.number)
+                            yield set_result_file(result, tests_files)
+                    for result in parser.close():
+                        numbers.add(result.number)
+                        yield set_result_file(result, tests_files)
+                    status = await process.wait()
+
+                    # The same as stream_bats, the tests not run failed with the output of bats
+                    if status and not tests_lines:
+                        error(f'bats exited with status {status}: {" ".join(parser.unparsed)}')
+                    if status:
+                        for result in build_missing_results(
+                                tests_lines, numbers,
+                                status = FAILED,
+                                diagnostics = get_exit_diagnostics(status, parser.unparsed),
+                                tests_names = tests_names,
+                                ):
+                            yield set_result_file(result, tests_files)
+                finally:
+                    if process.returncode is None:
+                        kill_process_group(process.pid)
+                        await process.wait()
+        finally:
+            if semaphore:
+                semaphore.release()
+
+    async def run_many_async(
+            self,
+            files: list,
+            args: BatsppArgs = BatsppArgs(),
+            opts: BatsppOpts = BatsppOpts(),
+            concurrency: int = 0,
+            executor = None,
+            ):
+        """
+        Run each Batspp test of FILES on its own bats call, up to CONCURRENCY
+        (the number of CPUs by default) at once, async generator of TestResult
+        as these are completed, numbered by file, cancelling it kills all the bats
+        """
+        assert concurrency >= 0, 'concurrency cannot be negative'
+        semaphore = Semaphore(concurrency or os_cpu_count() or 1)
+        queue = AsyncQueue()
+
+        # Each run puts its results on the queue, then
+        # None when it's finished, or the exception raised
+        async def run_file(file):
+            try:
+                async for result in self.run_async([file], args=args, opts=opts,
+                                                   semaphore=semaphore, executor=executor):
+                    queue.put_nowait(result)
+            except Exception as exc:  # pylint: disable=broad-except
+                queue.put_nowait(exc)
+                return
+            queue.put_nowait(None)
+
+        tasks = [create_task(run_file(file)) for file in files]
+        try:
+            pending = len(tasks)
+            while pending:
+                item = await queue.get()
+                if isinstance(item, Exception):
+                    raise item
+                if item is None:
+                    pending -= 1
+                else:
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+            await gather(*tasks, return_exceptions=True)
+
+    def skip_completed_tests(
+            self,
+            file: str,
+            tree: TestsSuite,
+            args: BatsppArgs = BatsppArgs(),
+            opts: BatsppOpts = BatsppOpts()
+            ) -> tuple:
+        """
+        Remove from TREE of FILE the tests completed on the journal, and the tests that passed
+        on their last run as recorded on the results cache, returns the fingerprints of the
+        remaining tests, the removed tests by the results cache, and the results of the journal
+        """
+        fingerprints, kept, skipped, resumed = [], [], [], []
+        for test in tree.tests:
+            fingerprint = fingerprint_test(test, tree, args, opts, hashes=self.hashes)
+            completed = self.journal.get(file, fingerprint) if self.journal else None
+            if completed:
+                resumed.append(completed)
+            elif self.results and self.results.is_passed(fingerprint):
+                skipped.append(test)
+            else:
+                kept.append(test)
+                fingerprints.append(fingerprint)
+        tree.tests = kept
+        debug.trace(7, f'BatsppTest.skip_completed_tests({file}) => {len(skipped)} skipped, {len(resumed)} resumed')
+        return fingerprints, skipped, resumed
+
+    def stream_bats(
+            self,
+            command:str,
+            tests_lines: list,
+            tests_files: 'list|None' = None,
+            output = None,
+            fail_fast: int = 0,
+            tests_names: 'list|None' = None,
+            ):
+        """
+        Run bats COMMAND, generator of TestResult with their TESTS_LINES and
+        TESTS_FILES (if any), also the TAP lines are written to OUTPUT stream,
+        with FAIL_FAST bats is stopped after that number of failures, and the
+        tests not run (named by TESTS_NAMES) are yielded as skipped at the end,
+        or as failed with the output of bats if it exited with an error
+        """
+        tests_files = tests_files if tests_files else []
+        tests_names = tests_names if tests_names else []
+        parser = TapParser(source_lines=tests_lines)
+        failures, stopped_at, numbers = 0, 0, set()
+        stopper = None
+
+        def complete(result):
+            numbers.add(result.number)
+            # Tests completed after the stop were interrupted
+            if stopped_at and result.number > stopped_at:
+                result.status, result.diagnostics = SKIPPED, [NOT_RUN]
+            return set_result_file(result, tests_files)
+
+        # NOTE: bats output is read line by line, so memory does
+        #       not depend on the output of the tests
+        with Popen(command, shell=True, stdout=PIPE, stderr=STDOUT, text=True,
+                   start_new_session=True) as process:
+            for line in process.stdout:
+                if output:
+                    output.write(line)
+                    output.flush()
+                for result in parser.feed(line):
+                    yield complete(result)
+
+                # Bats is interrupted after a grace time, so the
+                # diagnostics of the last failure are still written
+                if fail_fast and not stopper and line.startswith('not ok'):
+                    failures += 1
+                    if failures >= fail_fast:
+                        stopped_at = parser.current.number
+                        stopper = Timer(FAIL_FAST_GRACE, interrupt_process_group, (process.pid,))
+                        stopper.start()
+        if stopper:
+            stopper.cancel()
+        for result in parser.close():
+            yield complete(result)
+
+        # Tests not run are listed, so the report is complete,
+        # these failed if bats exited with an error before them
+        status = process.returncode
+        debug.trace(7, f'BatsppTest.stream_bats() => status {status}, {len(numbers)} results')
+        if not stopper and status and not tests_lines:
+            error(f'bats exited with status {status}: {" ".join(parser.unparsed)}')
+        if stopper or status:
+            for result in build_missing_results(
+                    tests_lines, numbers,
+                    status = SKIPPED if stopper else FAILED,
+                    diagnostics = [NOT_RUN] if stopper else get_exit_diagnostics(status, parser.unparsed),
+                    tests_names = tests_names,
+                    ):
+                yield set_result_file(result, tests_files)
+
+
+def build_cache_entry(transpilation: Transpilation) -> dict:
+    """Return cache entry of TRANSPILATION, fixtures are encoded as base64"""
+    return {
+        'content': transpilation.content,
+        'tests_lines': transpilation.tests_lines,
+        'tests_names': transpilation.tests_names,
+        'sudo_required': transpilation.sudo_required,
+        'fixtures': {
+            name: b64encode(data).decode() for name, data in transpilation.fixtures.items()
+            },
+        }
+
+
+def load_cache_entry(entry: dict) -> Transpilation:
+    """Return transpilation of cache ENTRY, as built by build_cache_entry"""
+    return Transpilation(
+        content = entry['content'],
+        tests_lines = entry['tests_lines'],
+        tests_names = entry['tests_names'],
+        sudo_required = entry['sudo_required'],
+        fixtures = {name: b64decode(data) for name, data in entry['fixtures'].items()},
+        )
+
+
+def transpile_selected(
+        file: str,
+        args: BatsppArgs,
+        opts: BatsppOpts,
+        pattern = None,
+        lines: 'list|None' = None,
+        history: 'dict|None' = None,
+        order: 'list|None' = None,
+        ) -> Transpilation:
+    """
+    Return transpilation of Batspp test FILE with ARGS and OPTS, keeping only the tests matching
+    PATTERN and selected by LINES (if any), reordered by their HISTORY with the ORDER keys (if any),
+    as BatsppTest does, this can be run on process pools as batspp_pipeline.transpile_file
+    """
+    args, opts = resolve_args_opts(file, args, opts)
+    tree = Parser().parse(read_tokens(file, opts), opts.embedded_tests)
+    if pattern or lines:
+        tree.tests = select_tests(tree.tests, pattern=pattern, lines=lines)
+    if order:
+        tree.tests = order_tests(tree.tests, file, history or {}, order)
+    return transpile_tree(tree, args=args, opts=opts)
+
+
+def save_transpilation(transpilation: Transpilation, output: str) -> None:
+    """Save the content of TRANSPILATION to OUTPUT path, and its fixtures next to it"""
+    os_makedirs(gh.dir_path(output) or '.', exist_ok=True)
+    gh.write_file(output, transpilation.content)
+    make_executable(output)
+    save_fixtures(transpilation.fixtures, output)
+
+
+def save_fixtures(fixtures: dict, output: str) -> None:
+    """Save FIXTURES ({name: bytes}) on the fixtures directory of OUTPUT bats file, if any"""
+    if not fixtures:
+        return
+    fixtures_dir = get_fixtures_dir(output)
+    os_makedirs(fixtures_dir, exist_ok=True)
+    for name, data in fixtures.items():
+        with open(gh.form_path(fixtures_dir, name), 'wb') as fixture:
+            fixture.write(data)
+
+
+def make_executable(path: str) -> None:
+    """Make file at PATH executable, as chmod +x does"""
+    os_chmod(path, os_stat(path).st_mode | 0o111)
+
+
+def interrupt_process_group(pid: int) -> None:
+    """Interrupt process group of PID as Ctrl-C does, if it's still running"""
+    try:
+        os_killpg(pid, SIGINT)
+    except ProcessLookupError:
+        pass
+
+
+def kill_process_group(pid: int) -> None:
+    """Kill process group of PID, if it's still running"""
+    try:
+        os_killpg(pid, SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def set_result_file(result: TestResult, tests_files: list) -> TestResult:
+    """Set RESULT file from the list of TESTS_FILES of each test number"""
+    if 0 < result.number <= len(tests_files):
+        result.file = tests_files[result.number - 1]
+    return result
 
 
 if __name__ == '__main__':
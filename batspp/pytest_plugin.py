@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+#
+# Batspp pytest plugin
+#
+# This collects Batspp tests files as pytest files, and each
+# of their tests as a pytest item, run through Batspp, so these
+# can be selected (-k), distributed (pytest-xdist) and reported
+# (--durations, --junitxml) as any other test.
+#
+# The plugin is opt-in, enabled with 'pytest -p batspp.pytest_plugin'
+# or 'pytest_plugins = ["batspp.pytest_plugin"]' on a conftest.py.
+#
+
+
+"""
+Batspp pytest plugin
+
+This collects Batspp tests files as pytest files,
+and each of their tests as a pytest item
+"""
+
+
+# Standard packages
+from fnmatch import fnmatch
+
+# Installed packages
+import pytest
+
+# Local packages
+from batspp.batspp_opts import BatsppOpts
+from batspp.batspp_args import BatsppArgs
+from batspp.batspp_test import BatsppTest
+from batspp.batspp_pipeline import is_embedded_file
+from batspp._inventory import list_tests
+from batspp._discovery import has_embedded_tests
+from batspp._tap import FAILED, SKIPPED
+
+
+# Constants
+FILES_OPTION = 'batspp_files'
+SOURCES_OPTION = 'batspp_sources'
+TIMEOUT_OPTION = 'batspp_timeout'
+DEFAULT_FILES = ['*.batspp']
+
+
+def pytest_addoption(parser) -> None:
+    """Add the ini options of the plugin"""
+    parser.addini(FILES_OPTION, 'Globs of Batspp tests files to collect, i.e "*.batspp *.ipynb *.sh"',
+                  type='args', default=DEFAULT_FILES)
+    parser.addini(SOURCES_OPTION, 'Files to be sourced by the Batspp tests', type='args', default=[])
+    parser.addini(TIMEOUT_OPTION, 'Default timeout in seconds for each Batspp test', default='0')
+
+
+def pytest_collect_file(file_path, parent):
+    """Collect FILE_PATH if it matches the files globs, scripts only if they have embedded tests"""
+    name = file_path.name
+    if not any(fnmatch(name, pattern) for pattern in parent.config.getini(FILES_OPTION)):
+        return None
+    if is_embedded_file(name) and not has_embedded_tests(str(file_path)):
+        return None
+    return BatsppFile.from_parent(parent, path=file_path)
+
+
+def get_args_opts(config) -> tuple:
+    """Return Batspp arguments and options of pytest CONFIG, tests are embedded in scripts"""
+    args = BatsppArgs(
+        sources = config.getini(SOURCES_OPTION),
+        timeout = int(config.getini(TIMEOUT_OPTION)),
+        )
+    return args, BatsppOpts(embedded_tests=None)
+
+
+class BatsppFile(pytest.File):
+    """Batspp tests file, its tests are listed without generating them"""
+
+    def collect(self):
+        args, opts = get_args_opts(self.config)
+        tests = list_tests(str(self.path), args=args, opts=opts)
+
+        # NOTE: pytest requires unique names, tests can share their title
+        names = [test['name'] for test in tests]
+        for test in tests:
+            name = test['name'] if names.count(test['name']) == 1 else f'{test["name"]} (line {test["line"]})'
+            yield BatsppItem.from_parent(self, name=name, line=test['line'])
+
+
+class BatsppItem(pytest.Item):
+    """Single Batspp test at LINE of its file, run alone through Batspp"""
+
+    def __init__(self, *, line: int, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.line = line
+
+    def runtest(self) -> None:
+        args, opts = get_args_opts(self.config)
+        file = str(self.path)
+        test = BatsppTest(selectors={file: [self.line]})
+        # NOTE: tests without result (i.e. bats didn't run) are failed
+        reported = False
+        for result in test.run_files_stream([file], args=args, opts=opts):
+            if result.line != self.line:
+                continue
+            reported = True
+            if result.status == FAILED:
+                raise BatsppTestFailure(result)
+            if result.status == SKIPPED:
+                pytest.skip(' '.join(result.diagnostics) or 'skipped by Batspp')
+        if not reported:
+            pytest.fail(f'Batspp test "{self.name}" at line {self.line} has no result', pytrace=False)
+
+    def repr_failure(self, excinfo, style=None):
+        if isinstance(excinfo.value, BatsppTestFailure):
+            result = excinfo.value.result
+            return '\n'.join([f'Batspp test "{result.name}" failed at line {self.line}'] + result.diagnostics)
+        return super().repr_failure(excinfo, style=style)
+
+    def reportinfo(self) -> tuple:
+        return self.path, self.line - 1, f'batspp: {self.name}'
+
+
+class BatsppTestFailure(Exception):
+    """Failure of a Batspp test, with its RESULT"""
+
+    def __init__(self, result) -> None:
+        super().__init__(result.name)
+        self.result = result
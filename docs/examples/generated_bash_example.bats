@@ -6,7 +6,7 @@
 
 # Constants
 VERBOSE_DEBUG="| hexdump -C"
-TEMP_DIR="/tmp/batspp-182958"
+TEMP_DIR="${TMP:-/tmp}/batspp-$$"
 
 # One time global setup
 source /home/angrygingy/Desktop/work-repos/batspp/tools/../docs/examples/bash_example.bash
@@ -6,7 +6,7 @@
 
 # Constants
 VERBOSE_DEBUG="| hexdump -C"
-TEMP_DIR="/tmp/batspp-182722"
+TEMP_DIR="${TMP:-/tmp}/batspp-$$"
 
 # One time global setup
 shopt -s expand_aliases
@@ -6,7 +6,7 @@
 
 # Constants
 VERBOSE_DEBUG="| hexdump -C"
-TEMP_DIR="/tmp/batspp-32342"
+TEMP_DIR="${TMP:-/tmp}/batspp-$$"
 
 # Setup function
 # $1 -> test name
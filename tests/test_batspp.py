@@ -13,6 +13,9 @@
 
 
 # Standard packages
+from json import loads as json_loads
+from time import time
+from xml.dom.minidom import parse as xml_parse
 from os import (
     path as os_path,
     makedirs as os_makedirs,
@@ -126,6 +129,65 @@ class TestBatspp(TestWrapper):
         result = gh.run(f'SOURCES=./some_file_to_load.bash python3 {BATSPP_PATH} --output {test_file}')
         self.assertTrue(expected_source in result)
 
+    def test_discover(self):
+        """Test --discover argument"""
+        debug.trace(debug.DETAILED, f"TestBatspp.test_discover({self})")
+
+        directory = f'{self.temp_file}-tree'
+        os_makedirs(f'{directory}/sub')
+        gh.write_file(f'{directory}/a.batspp', self.simple_test)
+        gh.write_file(f'{directory}/sub/lib.sh', 'function f () { echo 3; }\n# $ f\n# 3\n')
+        gh.write_file(f'{directory}/sub/plain.sh', 'echo 3\n')
+
+        # Discovered files are saved mirroring the folder, and run
+        result = gh.run(f'python3 {BATSPP_PATH} --discover {directory} --save {directory}-out/ 2>&1')
+        self.assertIn(f'# transpiled {directory}/sub/lib.sh in ', result)
+        self.assertIn('# discovered 2 files, transpiled in ', result)
+        self.assertIn(f'ok 2 {directory}/sub/lib.sh :: test of line 3', result)
+        self.assertIn('# total time ', result)
+        self.assertTrue(gh.file_exists(f'{directory}-out/a.bats'))
+        self.assertTrue(gh.file_exists(f'{directory}-out/sub/lib.sh.bats'))
+
+        result = gh.run(f'python3 {BATSPP_PATH} --discover {directory} --exclude sub --skip_run 2>&1')
+        self.assertIn('# discovered 1 files', result)
+
+    def test_check(self):
+        """Test --check argument"""
+        debug.trace(debug.DETAILED, f"TestBatspp.test_check({self})")
+
+        test_file = f'{self.temp_file}.batspp'
+        gh.write_file(test_file, '# Test first\n$ echo 1\n1\n\n# Test second\n$ echo $(\n2\n')
+        result = gh.run(f'python3 {BATSPP_PATH} --check {test_file} 2>&1; echo status=$?')
+        self.assertIn(f'{{"file": "{test_file}", "line": 6, "column": null, "message": "bash: ', result)
+        self.assertIn('# checked 1 files, 1 errors in ', result)
+        self.assertIn('status=1', result)
+
+    def test_list(self):
+        """Test --list argument"""
+        debug.trace(debug.DETAILED, f"TestBatspp.test_list({self})")
+
+        test_file = f'{self.temp_file}.batspp'
+        gh.write_file(test_file, '# Test first\n$ echo 1\n1\n\n# Test second\n$ echo 2\n2\n$ echo 3\n3\n')
+        result = gh.run(f'python3 {BATSPP_PATH} --list {test_file}')
+        self.assertEqual(
+            [json_loads(line) for line in result.splitlines()],
+            [
+                {'file': test_file, 'name': 'first', 'line': 1, 'assertions': 1, 'sources': []},
+                {'file': test_file, 'name': 'second', 'line': 5, 'assertions': 2, 'sources': []},
+                ],
+            )
+
+    def test_filter(self):
+        """Test --filter argument and line selectors"""
+        debug.trace(debug.DETAILED, f"TestBatspp.test_filter({self})")
+
+        test_file = f'{self.temp_file}.batspp'
+        gh.write_file(test_file, '# Test first\n$ echo 1\n1\n\n# Test second\n$ echo 2\n2\n\n# Test third\n$ echo 3\n3\n')
+        result = gh.run(f'python3 {BATSPP_PATH} --filter "^(first|third)$" {test_file}')
+        self.assertEqual(result, '1..2\nok 1 first\nok 2 third')
+        result = gh.run(f'python3 {BATSPP_PATH} {test_file}:6 {test_file}:9')
+        self.assertEqual(result, '1..2\nok 1 second\nok 2 third')
+
     def test_temp_dir(self):
         """Test --temp_dir argument"""
         debug.trace(debug.DETAILED, f"TestBatspp.test_temp_dir({self})")
@@ -137,13 +199,13 @@ class TestBatspp(TestWrapper):
         result = gh.run(f'python3 {BATSPP_PATH} --output --temp_dir /tmp/temporal_folder/ {test_file}')
         self.assertTrue('TEMP_DIR="/tmp/temporal_folder/"' in result)
 
-        # Not temporal dir specified (uses default /tmp)
+        # Not temporal dir specified (uses TMP or /tmp when running)
         result = gh.run(f'python3 {BATSPP_PATH} --output {test_file}')
-        self.assertTrue('TEMP_DIR="/tmp/batspp-' in result)
+        self.assertTrue('TEMP_DIR="${TMP:-/tmp}/batspp-$$"' in result)
 
-        # Changind TMP env var
-        result = gh.run(f'TMP=/tmp/another/ python3 {BATSPP_PATH} --output {test_file}')
-        self.assertTrue('TEMP_DIR="/tmp/another/batspp-' in result)
+        # Generated tests do not depend on the TMP env var
+        another_result = gh.run(f'TMP=/tmp/another/ python3 {BATSPP_PATH} --output {test_file}')
+        self.assertEqual(result, another_result)
 
     def test_copy_dir(self):
         """Test --copy_dir argument"""
@@ -254,6 +316,331 @@ class TestBatspp(TestWrapper):
         result = gh.run(f'python3 {BATSPP_PATH} --debug "| wc -l" --output {test_file}')
         self.assertTrue('VERBOSE_DEBUG="| wc -l"' in result)
 
+    def test_fixtures_threshold(self):
+        """Test --fixtures_threshold argument"""
+        debug.trace(debug.DETAILED, f"TestBatspp.test_fixtures_threshold({self})")
+
+        test_file = f'{self.temp_file}.batspp'
+        gh.write_file(test_file, self.simple_test)
+
+        # Large expected outputs are compared against fixtures
+        result = gh.run(f'python3 {BATSPP_PATH} --fixtures_threshold 5 --output {test_file}')
+        self.assertTrue('FIXTURES_DIR="${BATS_TEST_FILENAME%.bats}.fixtures"' in result)
+        self.assertTrue('cmp -s <(printf' in result)
+        result = gh.run(f'python3 {BATSPP_PATH} --fixtures_threshold 5 {test_file}')
+        self.assertEqual(result, '1..1\nok 1 test of line 3')
+
+        # Test env var
+        result = gh.run(f'FIXTURES_THRESHOLD=1000 python3 {BATSPP_PATH} --output {test_file}')
+        self.assertFalse('cmp -s' in result)
+
+    def test_capture_limit(self):
+        """Test --capture_limit argument"""
+        debug.trace(debug.DETAILED, f"TestBatspp.test_capture_limit({self})")
+
+        test_file = f'{self.temp_file}.batspp'
+        gh.write_file(test_file, self.simple_test)
+
+        result = gh.run(f'python3 {BATSPP_PATH} --capture_limit 4 --output {test_file}')
+        self.assertTrue('"$( ( echo "hello world" ) | capture_digest 4)"' in result)
+        self.assertTrue('function capture_digest () {' in result)
+        result = gh.run(f'python3 {BATSPP_PATH} --capture_limit 4 {test_file}')
+        self.assertEqual(result, '1..1\nok 1 test of line 3')
+
+        # Overflows are reported with the observed size
+        gh.write_file(test_file, self.simple_test.replace('hello world\n', 'hello\n'))
+        result = gh.run(f'CAPTURE_LIMIT=4 python3 {BATSPP_PATH} {test_file}')
+        self.assertTrue('not ok 1' in result)
+        self.assertTrue('[batspp: output truncated at 4 of 12 bytes, sha256 ' in result)
+
+    def test_timeout(self):
+        """Test --timeout argument"""
+        debug.trace(debug.DETAILED, f"TestBatspp.test_timeout({self})")
+
+        test_file = f'{self.temp_file}.batspp'
+        gh.write_file(test_file, self.simple_test)
+
+        result = gh.run(f'python3 {BATSPP_PATH} --timeout 30 --output {test_file}')
+        self.assertTrue('BATS_TEST_TIMEOUT="35"' in result)
+        self.assertTrue('function timed_eval () {' in result)
+        result = gh.run(f'python3 {BATSPP_PATH} --timeout 30 {test_file}')
+        self.assertEqual(result, '1..1\nok 1 test of line 3')
+
+        # Hanging commands are killed, the test directive overrides the default
+        gh.write_file(test_file, '# Test hanging (timeout=1)\n$ sleep 60; echo done\ndone\n')
+        result = gh.run(f'TIMEOUT=30 python3 {BATSPP_PATH} {test_file}')
+        self.assertTrue('not ok 1 hanging' in result)
+        self.assertTrue('batspp: assertion of line 2 timed out after 1s' in result)
+        self.assertEqual(result.count('timed out'), 1)
+
+        # Hanging setup commands are killed by bats, even without --timeout
+        gh.write_file(test_file, '# Test hanging (timeout=1)\n$ sleep 60\n$ echo hi\nhi\n')
+        result = gh.run(f'python3 {BATSPP_PATH} --output {test_file}')
+        self.assertTrue('BATS_TEST_TIMEOUT="6"' in result)
+        start = time()
+        result = gh.run(f'python3 {BATSPP_PATH} {test_file}')
+        self.assertTrue('not ok 1 hanging # timeout after 6s' in result)
+        self.assertLess(time() - start, 30)
+
+        # Setup commands exceeding the deadline fail the test
+        gh.write_file(test_file, '# Test slow setup (timeout=1)\n$ sleep 2\n$ echo hi\nhi\n')
+        for options in ['', '--timeout 1 --workers 2']:
+            result = gh.run(f'python3 {BATSPP_PATH} {options} {test_file}')
+            self.assertTrue('not ok 1 slow setup' in result)
+            self.assertTrue('batspp: test timed out before line 3' in result)
+
+    def test_workers(self):
+        """Test --workers argument"""
+        debug.trace(debug.DETAILED, f"TestBatspp.test_workers({self})")
+
+        test_file = f'{self.temp_file}.batspp'
+        gh.write_file(test_file, self.simple_test)
+
+        result = gh.run(f'python3 {BATSPP_PATH} --workers 2 {test_file}')
+        self.assertEqual(result, '1..1\nok 1 test of line 3')
+
+        # Test env var
+        gh.write_file(test_file, self.simple_test.replace('hello world\n', 'bye\n'))
+        result = gh.run(f'WORKERS=2 python3 {BATSPP_PATH} --omit_trace {test_file}')
+        self.assertTrue(result.startswith('1..1\nnot ok 1 test of line 3\n# `['))
+
+    def test_reports(self):
+        """Test --junit_report and --json_report arguments"""
+        debug.trace(debug.DETAILED, f"TestBatspp.test_reports({self})")
+
+        test_file = f'{self.temp_file}.batspp'
+        gh.write_file(test_file, self.simple_test)
+        junit_file = f'{self.temp_file}.xml'
+        json_file = f'{self.temp_file}.jsonl'
+
+        result = gh.run(f'python3 {BATSPP_PATH} --junit_report {junit_file} --json_report {json_file} {test_file}')
+        self.assertEqual(result, '1..1\nok 1 test of line 3')
+        self.assertTrue('<testcase classname="' in gh.read_file(junit_file))
+        self.assertTrue('"name": "test of line 3", "status": "passed"' in gh.read_file(json_file))
+
+        # Test env var, also with workers
+        gh.write_file(json_file, '')
+        gh.run(f'JSON_REPORT={json_file} python3 {BATSPP_PATH} --workers 2 {test_file}')
+        self.assertTrue('"status": "passed"' in gh.read_file(json_file))
+
+    def test_shards(self):
+        """Test --shards, --durations and --merge arguments"""
+        debug.trace(debug.DETAILED, f"TestBatspp.test_shards({self})")
+
+        test_file = f'{self.temp_file}.batspp'
+        gh.write_file(test_file, self.simple_test + '# Test another\n$ echo bye\nbye\n')
+        shards_dir = f'{self.temp_file}-shards'
+
+        result = gh.run(f'python3 {BATSPP_PATH} --shards 2 --save {shards_dir} {test_file}')
+        self.assertEqual(result, f'{shards_dir}/shard_1.bats\n{shards_dir}/shard_2.bats')
+        for number in [1, 2]:
+            gh.run(f'bats --timing {shards_dir}/shard_{number}.bats > {shards_dir}/shard_{number}.tap')
+
+        # Shards results are merged into one report
+        json_file = f'{self.temp_file}.jsonl'
+        result = gh.run(f'python3 {BATSPP_PATH} --merge --json_report {json_file} {shards_dir}/shard_1.tap {shards_dir}/shard_2.tap')
+        self.assertEqual(result, (
+            f'ok 1 {test_file} :: test of line 3\n'
+            f'ok 2 {test_file} :: another\n'
+            '1..2'
+            ))
+        self.assertTrue(f'"file": "{test_file}", "number": 2, "name": "another"' in gh.read_file(json_file))
+
+        # Merged reports are used as durations
+        result = gh.run(f'python3 {BATSPP_PATH} --shards 2 --durations {json_file} --save {shards_dir} {test_file}')
+        self.assertTrue('shard_2.bats' in result)
+
+    def test_many_files(self):
+        """Test many positional files and --jobs argument"""
+        debug.trace(debug.DETAILED, f"TestBatspp.test_many_files({self})")
+
+        first_file = f'{self.temp_file}-first.batspp'
+        gh.write_file(first_file, self.simple_test)
+        second_file = f'{self.temp_file}-second.batspp'
+        gh.write_file(second_file, '# Test another\n$ echo bye\nbye\n')
+
+        # Results are grouped by file
+        expected = (
+            f'ok 1 {first_file} :: test of line 3\n'
+            f'ok 2 {second_file} :: another\n'
+            '1..2'
+            )
+        result = gh.run(f'python3 {BATSPP_PATH} --jobs 1 {first_file} {second_file}')
+        self.assertEqual(result, expected)
+        result = gh.run(f'python3 {BATSPP_PATH} --workers 2 {first_file} {second_file}')
+        self.assertEqual(result, expected)
+
+        # Errors of bats fail the tests not run, and failed runs exit with 1
+        result = gh.run(f'python3 {BATSPP_PATH} --run_options=--bogus {first_file} {second_file}; echo status=$?')
+        self.assertTrue(result.startswith(f'not ok 1 {first_file} :: test of line 3\n# not run, bats exited with status 1\n'))
+        self.assertIn("# Error: Bad command line option '--bogus'", result)
+        self.assertTrue(result.endswith('1..2\nstatus=1'))
+        result = gh.run(f'python3 {BATSPP_PATH} {first_file} {second_file}; echo status=$?')
+        self.assertTrue(result.endswith('1..2\nstatus=0'))
+
+        # Generated files are saved on a folder
+        save_dir = f'{self.temp_file}-generated/'
+        gh.run(f'python3 {BATSPP_PATH} --skip_run --save {save_dir} {first_file} {second_file}')
+        self.assertEqual(len(gh.get_directory_listing(save_dir)), 2)
+
+    def test_skip_passed(self):
+        """Test --skip_passed, --force and --max_age arguments"""
+        debug.trace(debug.DETAILED, f"TestBatspp.test_skip_passed({self})")
+
+        test_file = f'{self.temp_file}.batspp'
+        gh.write_file(test_file, self.simple_test)
+        cache_dir = f'{self.temp_file}-cache'
+        command = f'python3 {BATSPP_PATH} --skip_passed --cache_dir {cache_dir}'
+
+        result = gh.run(f'{command} {test_file}')
+        self.assertEqual(result, f'ok 1 {test_file} :: test of line 3\n1..1')
+
+        # Skipped tests are listed
+        result = gh.run(f'{command} --max_age 3600 {test_file}')
+        self.assertEqual(result, (
+            f'ok 1 {test_file} :: test of line 3 # skip\n'
+            '# unchanged since it passed\n'
+            '1..1'
+            ))
+        result = gh.run(f'{command} --force {test_file}')
+        self.assertEqual(result, f'ok 1 {test_file} :: test of line 3\n1..1')
+
+    def test_order(self):
+        """Test --history and --order arguments"""
+        debug.trace(debug.DETAILED, f"TestBatspp.test_order({self})")
+
+        test_file = f'{self.temp_file}.batspp'
+        gh.write_file(test_file, '# Test first\n$ echo 1\n1\n\n# Test second\n$ echo 2\n3\n')
+        history = f'{self.temp_file}-history.jsonl'
+        command = f'python3 {BATSPP_PATH} --omit_trace --history {history} --order failed'
+
+        # Failed tests are run first on the next run
+        result = gh.run(f'{command} {test_file}')
+        self.assertTrue(result.startswith('1..2\nok 1 first\nnot ok 2 second'))
+        result = gh.run(f'{command} --junit_report {history}.xml --json_report {history}.json {test_file}')
+        self.assertTrue(result.startswith('1..2\nnot ok 1 second\n'))
+        self.assertTrue('<property name="order" value="failed"/>' in gh.read_file(f'{history}.xml'))
+
+        # The order of the tests is recorded on the reports
+        tests_order = [f'{test_file} :: second', f'{test_file} :: first']
+        properties = xml_parse(f'{history}.xml').getElementsByTagName('property')
+        self.assertEqual(properties[1].getAttribute('name'), 'tests_order')
+        self.assertEqual(json_loads(properties[1].getAttribute('value')), tests_order)
+        self.assertEqual(
+            json_loads(gh.read_file(f'{history}.json').splitlines()[0]),
+            {'properties': {'order': 'failed', 'tests_order': tests_order}},
+            )
+
+        # Unknown ordering keys are errors
+        result = gh.run(f'{command},random {test_file}')
+        self.assertTrue('invalid --order key "random"' in result)
+
+    def test_fail_fast(self):
+        """Test --fail_fast argument"""
+        debug.trace(debug.DETAILED, f"TestBatspp.test_fail_fast({self})")
+
+        test_file = f'{self.temp_file}.batspp'
+        gh.write_file(test_file, '# Test failing\n$ echo 1\n2\n\n# Test pending\n$ echo 1\n1\n')
+        report_file = f'{self.temp_file}-report.jsonl'
+        result = gh.run(f'python3 {BATSPP_PATH} --omit_trace --fail_fast 1 --json_report {report_file} {test_file}')
+        self.assertTrue(result.startswith(f'not ok 1 {test_file} :: failing\n'))
+        self.assertTrue(result.endswith(f'ok 2 {test_file} :: pending # skip\n# not run, stopped after the failures limit\n1..2'))
+        self.assertEqual(len(gh.read_file(report_file).splitlines()), 2)
+
+        # Stopped runs exit with 1, also on the workers and with many files
+        another_file = f'{self.temp_file}-another.batspp'
+        gh.write_file(another_file, self.simple_test)
+        for options in ['', '--workers 2']:
+            result = gh.run(f'python3 {BATSPP_PATH} {options} --fail_fast 1 {test_file} {another_file} > /dev/null; echo status=$?')
+            self.assertEqual(result, 'status=1')
+
+    def test_resume(self):
+        """Test --journal and --resume arguments"""
+        debug.trace(debug.DETAILED, f"TestBatspp.test_resume({self})")
+
+        test_file = f'{self.temp_file}.batspp'
+        gh.write_file(test_file, '# Test first\n$ echo 1\n1\n\n# Test second\n$ echo 2\n2\n')
+        journal_file = f'{self.temp_file}-journal.jsonl'
+        command = f'python3 {BATSPP_PATH} --journal {journal_file}'
+        expected = f'ok 1 {test_file} :: first\nok 2 {test_file} :: second\n1..2'
+
+        result = gh.run(f'{command} {test_file}')
+        self.assertEqual(result, expected)
+
+        # Interrupted runs are resumed, reporting all the tests
+        gh.write_file(journal_file, gh.read_file(journal_file).splitlines()[0] + '\n')
+        result = gh.run(f'{command} --resume {test_file}')
+        self.assertEqual(result, expected)
+        self.assertEqual(len(gh.read_file(journal_file).splitlines()), 2)
+
+    def test_watch(self):
+        """Test --watch argument"""
+        debug.trace(debug.DETAILED, f"TestBatspp.test_watch({self})")
+
+        test_file = f'{self.temp_file}.batspp'
+        gh.write_file(test_file, '# Test first\n$ echo 1\n1\n\n# Test second\n$ echo 2\n2\n')
+
+        # Only the changed test is run again
+        result = gh.run(
+            f'(timeout 4 python3 {BATSPP_PATH} --omit_trace --watch {test_file} &);'
+            ' sleep 2;'
+            f' printf "# Test first\\n\\$ echo 1\\n1\\n\\n# Test second\\n\\$ echo 2\\n3\\n" > {test_file};'
+            ' sleep 2'
+            )
+        lines = [line for line in result.splitlines() if not line.startswith('# (in test file')]
+        self.assertEqual(lines[:2], [f'ok 1 {test_file} :: first', f'ok 2 {test_file} :: second'])
+        self.assertTrue(lines[2].endswith(' 2 run, 0 unchanged: 2 passed, 0 failed', 0, lines[2].index(' (')))
+        self.assertEqual(lines[3], f'not ok 2 {test_file} :: second')
+        self.assertTrue(' 1 run, 1 unchanged: 1 passed, 1 failed (' in lines[-1])
+
+    def test_watch_sources(self):
+        """Test --watch argument, with changes to --sources files"""
+        debug.trace(debug.DETAILED, f"TestBatspp.test_watch_sources({self})")
+
+        test_file = f'{self.temp_file}.batspp'
+        source_file = f'{self.temp_file}.bash'
+        gh.write_file(test_file, '# Test greeting\n$ greet\nhello\n')
+        gh.write_file(source_file, 'greet () { echo hello; }')
+
+        # Changes to the sources run again all the tests
+        result = gh.run(
+            f'(timeout 4 python3 {BATSPP_PATH} --omit_trace --sources {source_file} --watch {test_file} &);'
+            ' sleep 2;'
+            f' echo "greet () ( echo bye )" > {source_file};'
+            ' sleep 2'
+            )
+        lines = [line for line in result.splitlines() if not line.startswith('# (in test file')]
+        self.assertEqual(lines[0], f'ok 1 {test_file} :: greeting')
+        self.assertEqual(lines[2], f'not ok 1 {test_file} :: greeting')
+        self.assertTrue(' 1 run, 0 unchanged: 0 passed, 1 failed (' in lines[-1])
+
+    def test_serve(self):
+        """Test --serve argument, and the requests sent to the server"""
+        debug.trace(debug.DETAILED, f"TestBatspp.test_serve({self})")
+
+        test_file = f'{self.temp_file}.batspp'
+        socket_file = f'{self.temp_file}.sock'
+        gh.write_file(test_file, '# Test greeting\n$ echo $GREETING\nhello\n')
+
+        # Without the server requests are processed by the client
+        result = gh.run(f'GREETING=hello python3 {BATSPP_PATH} --socket {socket_file} --output {test_file}')
+        self.assertIn('@test "greeting"', result)
+
+        result = gh.run(
+            f'(timeout 5 python3 {BATSPP_PATH} --serve --socket {socket_file} &);'
+            ' sleep 1.5;'
+            f' GREETING=hello python3 {BATSPP_PATH} --socket {socket_file} --server_env GREETING {test_file};'
+            f' GREETING=hello python3 {BATSPP_PATH} --socket {socket_file} {test_file} | grep "ok";'
+            f' python3 {BATSPP_PATH} --socket {socket_file} --output {test_file} | grep "@test";'
+            ' sleep 4'
+            )
+        # NOTE: only the common variables are sent without --server_env
+        self.assertEqual(
+            result.splitlines(),
+            [f'# batspp serving on {socket_file}', '1..1', 'ok 1 greeting', 'not ok 1 greeting', '@test "greeting" {'],
+            )
+        self.assertFalse(gh.file_exists(socket_file))
+
     def test_embedded_tests(self):
         """Test --embedded_tests argument"""
         debug.trace(debug.DETAILED, f"TestBatspp.test_embedded_tests({self})")
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+#
+# Tests for batspp_executor module
+#
+# This test must be runned with the command:
+# $ PYTHONPATH="$(pwd):$PYTHONPATH" ./tests/test_batspp_executor.py
+#
+
+
+"""Tests for batspp_executor module"""
+
+
+# Standard packages
+from shutil import which
+from sys import path as sys_path
+from time import monotonic
+
+# Installed packages
+import pytest
+from mezcla import debug
+from mezcla import glue_helpers as gh
+
+# Local packages
+sys_path.insert(0, './batspp')
+from batspp.batspp_opts import BatsppOpts
+
+
+# Reference to the module being tested
+import batspp.batspp_executor as THE_MODULE
+
+
+class TestBatsppExecutor:
+    """Class for testcase definition"""
+
+    simple_test = (
+        '# Test passing\n'
+        '$ echo "hello world"\n'
+        'hello world\n\n'
+        '# Test failing\n'
+        '$ echo "hello world"\n'
+        'bye world\n\n'
+        )
+
+    def test_run(self):
+        """Ensure run works as expected"""
+        debug.trace(7, f'TestBatsppExecutor.test_run({self})')
+        temp_file = f'{gh.get_temp_file()}.batspp'
+        gh.write_file(temp_file, self.simple_test)
+        with THE_MODULE.BatsppExecutor(workers=2) as executor:
+            result = executor.run(temp_file, opts=BatsppOpts(omit_trace=True))
+            assert result == (
+                '1..2\n'
+                'ok 1 passing\n'
+                'not ok 2 failing\n'
+                '# `[ "$(echo "hello world")" == "$(echo -e \'bye world\\n\')" ]\' failed'
+                )
+
+            # Workers are reused between runs
+            workers = list(executor.workers)
+            executor.run(temp_file, opts=BatsppOpts(omit_trace=True))
+            assert executor.workers == workers
+
+    def test_run_files_stream_fail_fast(self):
+        """Ensure run_files_stream stops after the failures limit"""
+        debug.trace(7, f'TestBatsppExecutor.test_run_files_stream_fail_fast({self})')
+        files = [f'{gh.get_temp_file()}.batspp' for _ in range(2)]
+        gh.write_file(files[0], self.simple_test)
+        gh.write_file(files[1], self.simple_test)
+        with THE_MODULE.BatsppExecutor(workers=1) as executor:
+            results = list(executor.run_files_stream(files, opts=BatsppOpts(omit_trace=True), fail_fast=1))
+        assert [(result.number, result.status) for result in results] == [
+            (1, 'passed'), (2, 'failed'), (3, 'skipped'), (4, 'skipped'),
+            ]
+        assert results[3].file == files[1]
+
+    def test_run_bats_isolation(self):
+        """Ensure tests run on a worker do not affect each other"""
+        debug.trace(7, f'TestBatsppExecutor.test_run_bats_isolation({self})')
+        bats_file = f'{gh.get_temp_file()}.bats'
+        gh.write_file(bats_file, (
+            'GLOBAL=loaded\n'
+            '@test "first" {\n'
+            '\tLOCAL=first\n'
+            '\t[ "$GLOBAL" == loaded ]\n'
+            '}\n'
+            '@test "second" {\n'
+            '\t[ -z "$LOCAL" ]\n'
+            '\t[ "$BATS_TEST_NUMBER" == 2 ]\n'
+            '}\n'
+            '@test "exiting" {\n'
+            '\texit 3\n'
+            '}\n'
+            ))
+        with THE_MODULE.BatsppExecutor(workers=1) as executor:
+            result = executor.run_bats(bats_file)
+            assert result == '1..3\nok 1 first\nok 2 second\nnot ok 3 exiting'
+            assert len(executor.workers) == 1
+
+    def test_run_bats_timeout(self):
+        """Ensure tests are killed after BATS_TEST_TIMEOUT, and the next tests are still run"""
+        debug.trace(7, f'TestBatsppExecutor.test_run_bats_timeout({self})')
+        bats_file = f'{gh.get_temp_file()}.bats'
+        gh.write_file(bats_file, (
+            'BATS_TEST_TIMEOUT="1"\n'
+            '@test "hanging" {\n'
+            '\tsleep 30\n'
+            '}\n'
+            '@test "next" {\n'
+            '\ttrue\n'
+            '}\n'
+            ))
+        with THE_MODULE.BatsppExecutor(workers=1) as executor:
+            start = monotonic()
+            result = executor.run_bats(bats_file)
+            assert monotonic() - start < 10
+            assert result == '1..2\nnot ok 1 hanging\n# batspp: test timed out after 1s\nok 2 next'
+            assert len(executor.workers) == 1
+
+    def test_run_stream(self):
+        """Ensure run_stream yields each result as the test is completed"""
+        debug.trace(7, f'TestBatsppExecutor.test_run_stream({self})')
+        temp_file = f'{gh.get_temp_file()}.batspp'
+        gh.write_file(temp_file, '# Test quick\n$ echo 1\n1\n\n# Test slow\n$ sleep 2; echo 2\n2\n')
+        with THE_MODULE.BatsppExecutor(workers=1) as executor:
+            start = monotonic()
+            results = executor.run_stream(temp_file)
+            assert next(results).name == 'quick'
+            assert monotonic() - start < 2
+            assert [result.status for result in results] == ['passed']
+
+    @pytest.mark.skipif(not which('sudo'), reason='sudo is not installed')
+    def test_run_sudo(self):
+        """Ensure files with tests requiring sudo are run with bats"""
+        debug.trace(7, f'TestBatsppExecutor.test_run_sudo({self})')
+        temp_file = f'{gh.get_temp_file()}.batspp'
+        gh.write_file(temp_file, '# Test root\n$ sudo -n true; echo $?\n0\n')
+        with THE_MODULE.BatsppExecutor(workers=1) as executor:
+            results = list(executor.run_stream(temp_file))
+        assert [result.name for result in results] == ['root']
+
+
+def test_convert_bats_to_script():
+    """Test for convert_bats_to_script()"""
+    script, titles = THE_MODULE.convert_bats_to_script(
+        '@test "some test" {\n\ttrue\n}\n@test "another test" {\n\t:\n}\n',
+        bats_file='/tmp/tests.bats',
+        run_dir='/tmp/run',
+        )
+    assert titles == ['some test', 'another test']
+    assert 'BATS_TEST_FILENAME="/tmp/tests.bats"\n' in script
+    assert 'function batspp_test_1 () {\n\ttrue\n}\n' in script
+    assert 'function batspp_test_2 () {\n\t:\n}' in script
+    assert '@test' not in script
+
+
+def test_get_test_timeout(monkeypatch):
+    """Test for get_test_timeout()"""
+    monkeypatch.delenv('BATS_TEST_TIMEOUT', raising=False)
+    assert THE_MODULE.get_test_timeout('BATS_TEST_TIMEOUT="35"\n@test "some" {\n}\n') == 35
+    assert THE_MODULE.get_test_timeout('@test "some" {\n}\n') == 0
+    monkeypatch.setenv('BATS_TEST_TIMEOUT', '7')
+    assert THE_MODULE.get_test_timeout('@test "some" {\n}\n') == 7
+
+
+def test_format_tap():
+    """Test for format_tap()"""
+    assert THE_MODULE.format_tap([], []) == '1..0'
+    assert THE_MODULE.format_tap(['pending test'], [None]) == (
+        f'1..1\nok 1 pending test # skip\n# {THE_MODULE.NOT_RUN}'
+        )
+    actual = THE_MODULE.format_tap(
+        ['some test', 'another test'],
+        [(0, 'hidden output'), (1, 'first line\nsecond line')],
+        )
+    assert actual == (
+        '1..2\n'
+        'ok 1 some test\n'
+        'not ok 2 another test\n'
+        '# first line\n'
+        '# second line'
+        )
+
+
+if __name__ == '__main__':
+    debug.trace_current_context()
+    pytest.main([__file__])
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+#
+# Tests for batspp_pipeline module
+#
+# This test must be runned with the command:
+# $ PYTHONPATH="$(pwd):$PYTHONPATH" ./tests/test_batspp_pipeline.py
+#
+
+
+"""Tests for batspp_pipeline module"""
+
+
+# Standard packages
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from json import dumps as json_dumps
+from pickle import dumps as pickle_dumps
+from sys import path as sys_path
+
+# Installed packages
+import pytest
+from mezcla import debug
+from mezcla import glue_helpers as gh
+
+# Local packages
+sys_path.insert(0, './batspp')
+from batspp.batspp_args import BatsppArgs
+from batspp.batspp_opts import BatsppOpts
+from batspp.batspp_test import BatsppTest
+from batspp._cache import MemoryCache
+
+
+# Reference to the module being tested
+import batspp.batspp_pipeline as THE_MODULE
+
+
+def write_tests_files(number: int) -> list:
+    """Write NUMBER tests files of different kinds, returns their paths"""
+    result = []
+    for index in range(number):
+        if index % 3 == 0:
+            file = f'{gh.get_temp_file()}-{index}.batspp'
+            gh.write_file(file, ''.join(
+                f'# Test echo {index} {test}\n$ echo {index} {test}\n{index} {test}\n\n' for test in range(index % 7 + 1)
+                ))
+        elif index % 3 == 1:
+            file = f'{gh.get_temp_file()}-{index}.bash'
+            gh.write_file(file, f'function f{index} () {{ echo {index}; }}\n# $ f{index}\n# {index}\n')
+        else:
+            file = f'{gh.get_temp_file()}-{index}.batspp'
+            size = index % 30 + 20
+            gh.write_file(file, f'# Test large {index}\n$ seq {size}\n' + ''.join(
+                f'{line}\n' for line in range(1, size + 1)
+                ) + f'\n# Test sudo {index}\n$ sudo true; echo ok\nok\n')
+        result.append(file)
+    return result
+
+
+def transpile(file: str) -> tuple:
+    """Return the transpilation of FILE as a comparable tuple"""
+    result = THE_MODULE.transpile_file(file, args=ARGS, opts=BatsppOpts())
+    return (result.content, result.tests_lines, result.tests_names, result.sudo_required, result.fixtures)
+
+
+ARGS = BatsppArgs(sources=['/dev/null'], fixtures_threshold=64)
+
+
+def test_transpile_file():
+    """Ensure transpile_file doesn't modify its arguments"""
+    file = f'{gh.get_temp_file()}.bash'
+    gh.write_file(file, 'function greet () { echo hi; }\n# $ greet\n# hi\n')
+    args, opts = BatsppArgs(sources=['/dev/null']), BatsppOpts()
+    first = THE_MODULE.transpile_file(file, args=args, opts=opts)
+    second = THE_MODULE.transpile_file(file, args=args, opts=opts)
+    assert args.sources == ['/dev/null']
+    assert opts.embedded_tests is None
+    assert first.content == second.content
+    assert f'source {file}' in first.content
+    assert first.tests_names == ['test of line 3']
+
+    # Results can be sent to other processes
+    assert pickle_dumps(first)
+
+
+def test_resolve_args_opts():
+    """Test for resolve_args_opts"""
+    args, opts = THE_MODULE.resolve_args_opts('script.bash', BatsppArgs(), BatsppOpts())
+    assert (args.sources, opts.embedded_tests) == (['script.bash'], True)
+    args, opts = THE_MODULE.resolve_args_opts('script.bash', args, opts)
+    assert args.sources == ['script.bash']
+    args, opts = THE_MODULE.resolve_args_opts('tests.batspp', BatsppArgs(), BatsppOpts())
+    assert (args.sources, opts.embedded_tests) == (None, False)
+
+
+def test_concurrent_transpilation():
+    """Ensure concurrent transpilations on threads and processes match the serial ones"""
+    files = write_tests_files(300)
+    serial = [transpile(file) for file in files]
+    assert any(result[3] for result in serial)
+    assert any(result[4] for result in serial)
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        assert list(executor.map(transpile, files)) == serial
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        assert list(executor.map(transpile, files, chunksize=16)) == serial
+    assert ARGS.sources == ['/dev/null']
+
+
+def test_read_tokens():
+    """Ensure tokens of notebooks read by cells match the ones of the whole notebook"""
+    file = f'{gh.get_temp_file()}.ipynb'
+    cells = [
+        {'cell_type': 'markdown', 'source': [f'# Test {index}']} if index % 2 == 0 else
+        {'cell_type': 'code', 'source': [f'echo {index}'], 'outputs': [{'output_type': 'stream', 'text': [f'{index}\n']}]}
+        for index in range(20)
+        ]
+    gh.write_file(file, json_dumps({'cells': cells}))
+    opts = BatsppOpts()
+    cache = MemoryCache()
+    expected = [str(token) for token in THE_MODULE.read_tokens(file, opts)]
+    assert [str(token) for token in THE_MODULE.read_tokens(file, opts, cache)] == expected
+    assert len(cache.entries) == len(cells)
+
+    # Only the changed cell is tokenized again
+    cells[5]['source'] = ['echo 5; echo five']
+    gh.write_file(file, json_dumps({'cells': cells}))
+    expected = [str(token) for token in THE_MODULE.read_tokens(file, opts)]
+    assert [str(token) for token in THE_MODULE.read_tokens(file, opts, cache)] == expected
+    assert len(cache.entries) == len(cells) + 1
+
+
+def test_batspp_test_defaults():
+    """Ensure the default arguments of BatsppTest are not modified"""
+    file = f'{gh.get_temp_file()}.bash'
+    gh.write_file(file, 'function greet () { echo hi; }\n# $ greet\n# hi\n')
+    batspp_test = BatsppTest()
+    first = batspp_test.transpile_to_bats(file)
+    assert batspp_test.transpile_to_bats(file) == first
+    args, opts = BatsppTest.transpile_to_bats.__defaults__
+    assert (args.sources, opts.embedded_tests) == (None, None)
+    assert first == THE_MODULE.transpile_file(file).content
+
+
+if __name__ == '__main__':
+    debug.trace_current_context()
+    pytest.main([__file__])
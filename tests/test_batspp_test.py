@@ -11,6 +11,15 @@
 
 
 # Standard packages
+from asyncio import (
+    create_task,
+    gather,
+    run as asyncio_run,
+    sleep as asyncio_sleep,
+    )
+from concurrent.futures import ProcessPoolExecutor
+from io import StringIO
+from time import sleep, time
 from sys import path as sys_path
 
 # Installed packages
@@ -20,7 +29,11 @@ from mezcla import glue_helpers as gh
 
 # Local packages
 sys_path.insert(0, './batspp')
-## NOTE: this is empty for now
+from batspp.batspp_args import BatsppArgs
+from batspp.batspp_opts import BatsppOpts
+from batspp._cache import ResultCache, MemoryCache
+from batspp.batspp_pipeline import transpile_file
+from batspp._journal import Journal
 
 
 # Reference to the module being tested
@@ -56,6 +69,84 @@ class TestBatssTest:
         assert '@test' in result
         assert 'echo "hello world"' in result
 
+    def test_transpile_and_save_bats_fixtures(self):
+        """Ensure transpile_and_save_bats saves fixtures of large expected outputs"""
+        input_temp_file = f'{gh.get_temp_file()}.batspp'
+        gh.write_file(input_temp_file, self.simple_test)
+        output_temp_file = f'{gh.get_temp_file()}.bats'
+        batspp_test = THE_MODULE.BatsppTest()
+        args = BatsppArgs(fixtures_threshold=5)
+        batspp_test.transpile_and_save_bats(input_temp_file, output_temp_file, args=args)
+        result = gh.read_file(output_temp_file)
+        assert 'cmp -s' in result
+        fixtures_dir = THE_MODULE.get_fixtures_dir(output_temp_file)
+        fixtures = gh.get_directory_listing(fixtures_dir)
+        assert len(fixtures) == 1
+        assert gh.read_file(gh.form_path(fixtures_dir, fixtures[0])) == 'hello world\n'
+
+    def test_transpile_to_bats_cache(self):
+        """Ensure transpile_to_bats takes unchanged files from the cache"""
+        temp_file = f'{gh.get_temp_file()}.batspp'
+        gh.write_file(temp_file, self.simple_test)
+        cache_dir = f'{gh.get_temp_file()}-cache'
+        args = BatsppArgs(fixtures_threshold=5)
+        result = THE_MODULE.BatsppTest(cache_dir=cache_dir).transpile_to_bats(temp_file, args=args)
+
+        # The cached content and interpreter state are used
+        batspp_test = THE_MODULE.BatsppTest(cache_dir=cache_dir)
+        batspp_test.parse = None
+        assert batspp_test.transpile_to_bats(temp_file, args=args) == result
+        assert batspp_test.interpreter.tests_lines == [3]
+        assert list(batspp_test.interpreter.fixtures.values()) == [b'hello world\n']
+
+    def test_transpile_to_bats_selection(self):
+        """Ensure only the selected tests are transpiled"""
+        temp_file = f'{gh.get_temp_file()}.batspp'
+        gh.write_file(temp_file, '# Test first\n$ echo 1\n1\n\n# Test second\n$ echo 2\n2\n')
+        batspp_test = THE_MODULE.BatsppTest(test_filter='^s')
+        result = batspp_test.transpile_to_bats(temp_file)
+        assert '@test "second"' in result and '@test "first"' not in result
+        batspp_test = THE_MODULE.BatsppTest(selectors={temp_file: [2]}, cache_dir=f'{gh.get_temp_file()}-cache')
+        result = batspp_test.transpile_to_bats(temp_file)
+        assert '@test "first"' in result and '@test "second"' not in result
+        assert batspp_test.interpreter.tests_names == ['first']
+
+    def test_add_to_cache(self):
+        """Ensure transpilations made elsewhere are taken from the cache"""
+        temp_file = f'{gh.get_temp_file()}.bash'
+        gh.write_file(temp_file, 'function greet () { echo hi; }\n# $ greet\n# hi\n')
+        batspp_test = THE_MODULE.BatsppTest()
+        batspp_test.cache = MemoryCache()
+        opts = BatsppOpts(embedded_tests=None)
+        batspp_test.add_to_cache(temp_file, transpile_file(temp_file, opts=opts), opts=opts)
+        batspp_test.parse = None
+        assert batspp_test.transpile_to_bats(temp_file, opts=opts) == transpile_file(temp_file).content
+        assert batspp_test.interpreter.tests_names == ['test of line 3']
+
+    def test_transpile_shards(self):
+        """Ensure transpile_shards works as expected"""
+        files = []
+        for name in ['first', 'second']:
+            files.append(f'{gh.get_temp_file()}.batspp')
+            gh.write_file(files[-1], (
+                f'# Test {name} slow\n$ echo {name}\n{name}\n\n'
+                f'# Test {name} fast\n$ echo {name}\n{name}\n'
+                ))
+        output_dir = f'{gh.get_temp_file()}-shards'
+        batspp_test = THE_MODULE.BatsppTest()
+
+        # Slow tests are split between the shards
+        durations = {
+            (files[0], 'first slow'): 10.0, (files[0], 'first fast'): 1.0,
+            (files[1], 'second slow'): 10.0, (files[1], 'second fast'): 1.0,
+            }
+        shards = batspp_test.transpile_shards(files, 2, output_dir, durations=durations)
+        assert shards == [f'{output_dir}/shard_1.bats', f'{output_dir}/shard_2.bats']
+        contents = [gh.read_file(shard) for shard in shards]
+        assert f'@test "{files[0]} :: first slow"' in contents[0]
+        assert f'@test "{files[1]} :: second slow"' in contents[1]
+        assert gh.run(f'bats {shards[0]}').startswith('1..2\nok 1 ')
+
     def test_run(self):
         """Ensure run works as expected"""
         temp_file = f'{gh.get_temp_file()}.batspp'
@@ -64,6 +155,216 @@ class TestBatssTest:
         result = batspp_test.run(temp_file)
         assert '1..1\nok 1 test of line 3' == result
 
+    def test_run_text(self):
+        """Ensure run_text works as expected"""
+        batspp_test = THE_MODULE.BatsppTest()
+        output = StringIO()
+        results = batspp_test.run_text(self.simple_test + '# Test failing\n$ echo bye\nhello\n', output=output)
+        assert [(result.name, result.status, result.line) for result in results] == [
+            ('test of line 3', 'passed', 3),
+            ('failing', 'failed', 6),
+            ]
+        assert output.getvalue().startswith('1..2\n')
+        assert not batspp_test.interpreter.sudo_required
+
+        # Embedded tests are sourced from the text
+        results = batspp_test.run_text(
+            'function greet () { echo "hi $1"; }\n# $ greet you\n# hi you\n',
+            opts=BatsppOpts(embedded_tests=True),
+            )
+        assert [result.status for result in results] == ['passed']
+
+    def test_run_stream(self):
+        """Ensure run_stream works as expected"""
+        temp_file = f'{gh.get_temp_file()}.batspp'
+        gh.write_file(temp_file, self.simple_test + '# Test failing\n$ echo bye\nhello\n')
+        batspp_test = THE_MODULE.BatsppTest()
+        output = StringIO()
+        results = list(batspp_test.run_stream(temp_file, output=output))
+        assert [result.status for result in results] == ['passed', 'failed']
+        assert [result.name for result in results] == ['test of line 3', 'failing']
+        assert results[1].line == 6
+        assert output.getvalue().startswith('1..2\nok 1 test of line 3\nnot ok 2 failing\n')
+
+    def test_run_files_stream(self):
+        """Ensure run_files_stream works as expected"""
+        files = [f'{gh.get_temp_file()}.batspp' for _ in range(3)]
+        gh.write_file(files[0], self.simple_test)
+        gh.write_file(files[1], '# no tests here\n')
+        gh.write_file(files[2], '# Test first\n$ echo 1\n1\n\n# Test second\n$ echo 2\n3\n')
+        batspp_test = THE_MODULE.BatsppTest()
+        results = list(batspp_test.run_files_stream(files, jobs=1))
+        assert [(result.file, result.name, result.line) for result in results] == [
+            (files[0], 'test of line 3', 3),
+            (files[2], 'first', 1),
+            (files[2], 'second', 5),
+            ]
+        assert [result.status for result in results] == ['passed', 'passed', 'failed']
+
+    def test_run_files_stream_bats_error(self):
+        """Ensure the tests not run by bats because of an error are failed with its output"""
+        files = [f'{gh.get_temp_file()}.batspp' for _ in range(2)]
+        for file in files:
+            gh.write_file(file, self.simple_test)
+        batspp_test = THE_MODULE.BatsppTest()
+        results = list(batspp_test.run_files_stream(files, args=BatsppArgs(run_opts='--bogus')))
+        assert [(result.file, result.status) for result in results] == [(files[0], 'failed'), (files[1], 'failed')]
+        assert results[0].diagnostics[0] == 'not run, bats exited with status 1'
+        assert "Error: Bad command line option '--bogus'" in results[0].diagnostics
+
+    def test_transpile_to_bats_async(self):
+        """Ensure transpile_to_bats_async works as transpile_to_bats"""
+        files = [f'{gh.get_temp_file()}.batspp' for _ in range(2)]
+        gh.write_file(files[0], self.simple_test)
+        gh.write_file(files[1], '# Test first\n$ echo 1\n1\n')
+        batspp_test = THE_MODULE.BatsppTest()
+
+        async def transpile_all():
+            return [await batspp_test.transpile_to_bats_async(file) for file in files]
+
+        assert asyncio_run(transpile_all()) == [batspp_test.transpile_to_bats(file) for file in files]
+
+    def test_run_async(self):
+        """Ensure run_async and run_many_async work as expected"""
+        files = [f'{gh.get_temp_file()}.batspp' for _ in range(2)]
+        gh.write_file(files[0], self.simple_test)
+        gh.write_file(files[1], '# Test first\n$ echo 1\n1\n\n# Test second\n$ echo 2\n3\n')
+        batspp_test = THE_MODULE.BatsppTest()
+
+        async def collect(results):
+            return [(result.file, result.name, result.status) async for result in results]
+
+        results = asyncio_run(collect(batspp_test.run_async(files)))
+        assert results == [
+            (files[0], 'test of line 3', 'passed'),
+            (files[1], 'first', 'passed'),
+            (files[1], 'second', 'failed'),
+            ]
+
+        # Each file runs on its own bats, results arrive by file
+        results = asyncio_run(collect(batspp_test.run_many_async(files, concurrency=2)))
+        assert sorted(results) == sorted([
+            (files[0], 'test of line 3', 'passed'),
+            (files[1], 'first', 'passed'),
+            (files[1], 'second', 'failed'),
+            ])
+
+    def test_run_async_bats_error(self):
+        """Ensure the tests not run by run_async failed if bats exited with an error"""
+        file = f'{gh.get_temp_file()}.batspp'
+        gh.write_file(file, '# Setup\n$ fi\n\n# Test first\n$ echo 1\n1\n')
+        batspp_test = THE_MODULE.BatsppTest()
+
+        async def collect():
+            return [result async for result in batspp_test.run_async([file])]
+
+        results = asyncio_run(collect())
+        assert [(result.file, result.name, result.status) for result in results] == [(file, 'first', 'failed')]
+        assert results[0].diagnostics[0] == 'not run, bats exited with status 1'
+        assert any('syntax error' in line for line in results[0].diagnostics)
+
+    def test_async_process_pool(self):
+        """Ensure the async API transpiles on process pools, also the selected tests"""
+        file = f'{gh.get_temp_file()}.batspp'
+        gh.write_file(file, '# Test first\n$ echo 1\n1\n\n# Test second\n$ echo 2\n3\n')
+        batspp_test = THE_MODULE.BatsppTest(test_filter='sec')
+
+        async def collect(executor):
+            content = await batspp_test.transpile_to_bats_async(file, executor=executor)
+            results = [(result.name, result.status) async for result in batspp_test.run_async([file], executor=executor)]
+            return content, results
+
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            content, results = asyncio_run(collect(executor))
+        assert content == batspp_test.transpile_to_bats(file)
+        assert '@test "first"' not in content
+        assert results == [('second', 'failed')]
+
+    def test_run_async_cancel(self):
+        """Ensure bats is killed when run_async is cancelled"""
+        temp_file = f'{gh.get_temp_file()}.batspp'
+        marker = f'{temp_file}.marker'
+        gh.write_file(temp_file, (
+            '# Test first\n$ echo 1\n1\n\n'
+            '# Test second\n$ echo 2\n2\n\n'
+            f'# Test slow\n$ sleep 1; touch {marker}; echo 3\n3\n'
+            ))
+        batspp_test = THE_MODULE.BatsppTest()
+
+        # NOTE: the first result is completed when the second starts
+        async def cancel_after_first():
+            names = []
+
+            async def consume():
+                async for result in batspp_test.run_async([temp_file]):
+                    names.append(result.name)
+
+            task = create_task(consume())
+            while not names:
+                await asyncio_sleep(0.01)
+            task.cancel()
+            await gather(task, return_exceptions=True)
+            return names
+
+        assert asyncio_run(cancel_after_first()) == ['first']
+        sleep(1.5)
+        assert not gh.file_exists(marker)
+
+    def test_run_files_stream_fail_fast(self):
+        """Ensure run_files_stream stops after the failures limit"""
+        files = [f'{gh.get_temp_file()}.batspp' for _ in range(2)]
+        gh.write_file(files[0], '# Test failing\n$ echo 1\n2\n\n# Test slow\n$ sleep 30; echo 1\n1\n')
+        gh.write_file(files[1], '# Test pending\n$ echo 1\n1\n')
+        batspp_test = THE_MODULE.BatsppTest()
+        start = time()
+        results = list(batspp_test.run_files_stream(files, opts=BatsppOpts(omit_trace=True), fail_fast=1))
+        assert time() - start < 10
+        assert [(result.number, result.name, result.status) for result in results] == [
+            (1, 'failing', 'failed'),
+            (2, 'slow', 'skipped'),
+            (3, 'pending', 'skipped'),
+            ]
+
+        # The diagnostics of the failure are kept
+        assert any('failed' in line for line in results[0].diagnostics)
+        assert results[2].file == files[1]
+        assert results[2].diagnostics == [THE_MODULE.NOT_RUN]
+
+    def test_run_files_stream_results_cache(self):
+        """Ensure run_files_stream skips tests that passed"""
+        temp_file = f'{gh.get_temp_file()}.batspp'
+        gh.write_file(temp_file, '# Test first\n$ echo 1\n1\n\n# Test second\n$ echo 2\n3\n')
+        results_dir = f'{gh.get_temp_file()}-results'
+
+        def run(**kwargs):
+            batspp_test = THE_MODULE.BatsppTest(results=ResultCache(results_dir, **kwargs))
+            return [(result.number, result.name, result.status)
+                    for result in batspp_test.run_files_stream([temp_file])]
+
+        assert run() == [(1, 'first', 'passed'), (2, 'second', 'failed')]
+        assert run() == [(1, 'second', 'failed'), (2, 'first', 'skipped')]
+        assert run(force=True) == [(1, 'first', 'passed'), (2, 'second', 'failed')]
+
+    def test_run_files_stream_journal(self):
+        """Ensure run_files_stream resumes the tests completed on the journal"""
+        temp_file = f'{gh.get_temp_file()}.batspp'
+        gh.write_file(temp_file, '# Test first\n$ echo 1\n1\n\n# Test second\n$ echo 2\n3\n')
+        journal_file = f'{gh.get_temp_file()}.jsonl'
+
+        def run(resume):
+            with Journal(journal_file, resume=resume) as journal:
+                batspp_test = THE_MODULE.BatsppTest(journal=journal)
+                return [(result.number, result.name, result.status, result.file)
+                        for result in batspp_test.run_files_stream([temp_file])]
+
+        expected = [(1, 'first', 'passed', temp_file), (2, 'second', 'failed', temp_file)]
+        assert run(resume=False) == expected
+
+        # Only the tests not completed are run
+        gh.write_file(journal_file, gh.read_file(journal_file).splitlines()[0] + '\n')
+        assert run(resume=True) == expected
+        assert len(gh.read_file(journal_file).splitlines()) == 2
+
     def test_add_prefix_to_filename(self):
         """Ensure add_prefix_to_filename works as expected"""
         filename = '/example/some/file.txt'
@@ -77,6 +378,11 @@ class TestBatssTest:
         result = THE_MODULE.merge_filename_into_path(filename, path)
         assert result == '/another/folder/file.txt'
 
+    def test_get_fixtures_dir(self):
+        """Ensure get_fixtures_dir works as expected"""
+        assert THE_MODULE.get_fixtures_dir('/some/test.bats') == '/some/test.fixtures'
+        assert THE_MODULE.get_fixtures_dir('/some/test.txt') == '/some/test.txt.fixtures'
+
     def test_replace_extension(self):
         """Ensure replace_extension works as expected"""
         filename = '/example/some/file.txt'
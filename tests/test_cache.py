@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+#
+# Tests for _cache module
+#
+# This test must be runned with the command:
+# $ PYTHONPATH="$(pwd):$PYTHONPATH" ./tests/test_cache.py
+#
+
+
+"""Tests for _cache module"""
+
+
+# Standard packages
+from os import stat as os_stat
+from sys import path as sys_path
+
+# Installed packages
+import pytest
+from mezcla import debug
+from mezcla import glue_helpers as gh
+
+# Local packages
+sys_path.insert(0, './batspp')
+from batspp.batspp_args import BatsppArgs
+from batspp.batspp_opts import BatsppOpts
+from batspp._ast_nodes import TestsSuite, Test, Assertion, AssertionType
+from batspp._tap import TestResult
+
+
+# Reference to the module being tested
+import batspp._cache as THE_MODULE
+
+
+class TestCache:
+    """Class for testcase definition"""
+
+    def test_load_save(self):
+        """Ensure saved entries are loaded"""
+        debug.trace(7, f'TestCache.test_load_save({self})')
+        directory = f'{gh.get_temp_file()}-cache'
+        cache = THE_MODULE.Cache(directory)
+        assert cache.load('abcdef') is None
+
+        cache.save('abcdef', {'content': 'some content'})
+        assert cache.load('abcdef') == {'content': 'some content'}
+        assert cache.get_path('abcdef') == f'{directory}/ab/abcdef.json'
+
+        # No temporal files are left on the cache
+        assert gh.get_directory_listing(f'{directory}/ab') == ['abcdef.json']
+
+        # Entries can be read by other users as the umask allows
+        assert os_stat(cache.get_path('abcdef')).st_mode & 0o777 == 0o666 & ~THE_MODULE.get_umask()
+
+        # Unreadable entries are misses
+        gh.write_file(cache.get_path('abcdef'), '{"content": ')
+        assert cache.load('abcdef') is None
+
+
+class TestMemoryCache:
+    """Class for testcase definition"""
+
+    def test_load_save(self):
+        """Ensure entries are kept in memory, also on the backing cache"""
+        debug.trace(7, f'TestMemoryCache.test_load_save({self})')
+        backing = THE_MODULE.Cache(f'{gh.get_temp_file()}-cache')
+        backing.save('aaaa', {'content': 'first'})
+        cache = THE_MODULE.MemoryCache(backing, max_entries=2)
+        assert cache.load('aaaa') == {'content': 'first'}
+
+        cache.save('bbbb', {'content': 'second'})
+        assert backing.load('bbbb') == {'content': 'second'}
+
+        # The oldest entries are evicted
+        cache.save('cccc', {'content': 'third'})
+        assert list(cache.entries) == ['bbbb', 'cccc']
+        assert THE_MODULE.MemoryCache().load('aaaa') is None
+
+
+class TestResultCache:
+    """Class for testcase definition"""
+
+    def test_is_passed(self):
+        """Ensure only passed results within the max age are used"""
+        debug.trace(7, f'TestResultCache.test_is_passed({self})')
+        directory = f'{gh.get_temp_file()}-results'
+        cache = THE_MODULE.ResultCache(directory)
+        cache.record('aaaa', TestResult(1, 'passing', 'passed'))
+        cache.record('bbbb', TestResult(2, 'failing', 'failed'))
+        assert cache.is_passed('aaaa')
+        assert not cache.is_passed('bbbb')
+        assert not cache.is_passed('cccc')
+
+        # Forced and stale results are not used
+        assert not THE_MODULE.ResultCache(directory, force=True).is_passed('aaaa')
+        entry = cache.load('aaaa')
+        cache.save('aaaa', {**entry, 'time': entry['time'] - 100})
+        assert THE_MODULE.ResultCache(directory, max_age=1000).is_passed('aaaa')
+        assert not THE_MODULE.ResultCache(directory, max_age=10).is_passed('aaaa')
+
+
+def test_fingerprint_test():
+    """Test for fingerprint_test()"""
+    source = f'{gh.get_temp_file()}.bash'
+    gh.write_file(source, 'alias one="echo 1"\n')
+    args = BatsppArgs(sources=[source])
+
+    def build_tree(expected):
+        test = Test(reference='some test', assertions=[
+            Assertion(atype=AssertionType.OUTPUT, actual=['one'], expected=[expected]),
+            ])
+        return TestsSuite(tests=[test], setup_commands=['cd /tmp'])
+
+    tree = build_tree('1')
+    fingerprint = THE_MODULE.fingerprint_test(tree.tests[0], tree, args, BatsppOpts())
+    assert fingerprint == THE_MODULE.fingerprint_test(tree.tests[0], tree, args, BatsppOpts())
+
+    # Assertions, global setups and sources change the fingerprint
+    other_tree = build_tree('2')
+    assert fingerprint != THE_MODULE.fingerprint_test(other_tree.tests[0], other_tree, args, BatsppOpts())
+    tree.setup_commands = ['cd /']
+    assert fingerprint != THE_MODULE.fingerprint_test(tree.tests[0], tree, args, BatsppOpts())
+    tree.setup_commands = ['cd /tmp']
+    gh.write_file(source, 'alias one="echo 2"\n')
+    assert fingerprint != THE_MODULE.fingerprint_test(tree.tests[0], tree, args, BatsppOpts())
+
+
+def test_hash_path():
+    """Test for hash_path()"""
+    directory = f'{gh.get_temp_file()}-dir'
+    gh.run(f'mkdir -p {directory}/sub')
+    gh.write_file(f'{directory}/sub/file.txt', 'some content')
+    result = THE_MODULE.hash_path(directory)
+    assert result == THE_MODULE.hash_path(directory)
+    assert THE_MODULE.hash_path(f'{directory}/su*') == THE_MODULE.hash_path(f'{directory}/sub')
+    gh.write_file(f'{directory}/sub/file.txt', 'another content')
+    assert result != THE_MODULE.hash_path(directory)
+
+
+def test_compute_key():
+    """Test for compute_key()"""
+    file = f'{gh.get_temp_file()}.batspp'
+    source = f'{gh.get_temp_file()}.bash'
+    gh.write_file(file, '$ echo 1\n1\n')
+    gh.write_file(source, 'alias one="echo 1"\n')
+    args = BatsppArgs(sources=[source])
+    key = THE_MODULE.compute_key(file, args, BatsppOpts())
+    assert key == THE_MODULE.compute_key(file, BatsppArgs(sources=[source]), BatsppOpts())
+
+    # Options, arguments, and sources change the key
+    assert key != THE_MODULE.compute_key(file, args, BatsppOpts(omit_trace=True))
+    assert key != THE_MODULE.compute_key(file, BatsppArgs(sources=[source], timeout=3), BatsppOpts())
+    assert key != THE_MODULE.compute_key(file, args, BatsppOpts(), kind='inventory')
+    gh.write_file(source, 'alias one="echo 2"\n')
+    assert key != THE_MODULE.compute_key(file, args, BatsppOpts())
+
+
+def test_compute_cell_key():
+    """Test for compute_cell_key()"""
+    cell = {'cell_type': 'code', 'source': ['echo 1'], 'outputs': []}
+    key = THE_MODULE.compute_cell_key(cell)
+    assert key == THE_MODULE.compute_cell_key(dict(cell))
+    assert key != THE_MODULE.compute_cell_key({**cell, 'source': ['echo 2']})
+    assert key != THE_MODULE.compute_cell_key({**cell, 'outputs': [{'output_type': 'stream', 'text': ['1']}]})
+
+
+if __name__ == '__main__':
+    debug.trace_current_context()
+    pytest.main([__file__])
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+#
+# Tests for _checking module
+#
+# This test must be runned with the command:
+# $ PYTHONPATH="$(pwd):$PYTHONPATH" ./tests/test_checking.py
+#
+
+
+"""Tests for _checking module"""
+
+
+# Standard packages
+from sys import path as sys_path
+
+# Installed packages
+import pytest
+from mezcla import debug
+from mezcla import glue_helpers as gh
+
+# Local packages
+sys_path.insert(0, './batspp')
+
+
+# Reference to the module being tested
+import batspp._checking as THE_MODULE
+
+
+def test_blank_block():
+    """Test for blank_block"""
+    lines = ['# Test one', '$ echo 1', '1', '', '# Test two', '$ echo 2', '2']
+    assert THE_MODULE.blank_block(lines, 2)
+    assert lines == ['', '', '', '', '# Test two', '$ echo 2', '2']
+    assert not THE_MODULE.blank_block(lines, 4)
+    assert not THE_MODULE.blank_block(lines, 10)
+
+
+def test_check_file():
+    """Test for check_file"""
+    file = f'{gh.get_temp_file()}.batspp'
+    gh.write_file(file, '# Test one\n$ echo 1\n1\n')
+    assert THE_MODULE.check_file(file) == []
+
+    # All the errors of the file are found, with the line of their
+    # test or assertion, also the ones found by bash on the generated script
+    gh.write_file(file, (
+        '# Test one (timeout=x)\n$ echo 1\n1\n\n'
+        '# Test two\n$ echo 2\n2\n$ if true; then echo 2\n2\n\n'
+        '# Test three (foo=1)\n$ echo 3\n3\n\n'
+        '# Test four\n$ echo "4\n4\n'
+        ))
+    errors = THE_MODULE.check_file(file)
+    assert [(error['line'], error['message'].split(' ')[0]) for error in errors] == [
+        (1, 'Invalid'), (11, 'Invalid'), (8, 'bash:'), (16, 'bash:'),
+        ]
+    assert errors[0] == {'file': file, 'line': 1, 'column': None, 'message': 'Invalid test option "timeout=x"'}
+
+
+def test_check_files():
+    """Test for check_files"""
+    files = [f'{gh.get_temp_file()}-{number}.batspp' for number in range(3)]
+    for file in files:
+        gh.write_file(file, '# Test one\n$ echo 1\n1\n')
+    gh.write_file(files[1], '# Test one\n$ echo $(\n1\n')
+    results = list(THE_MODULE.check_files(files, workers=2))
+    assert [file for file, _ in results] == files
+    assert [len(errors) for _, errors in results] == [0, 1, 0]
+
+
+if __name__ == '__main__':
+    debug.trace_current_context()
+    pytest.main([__file__])
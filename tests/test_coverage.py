@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+#
+# Tests for _coverage module
+#
+# This test must be runned with the command:
+# $ PYTHONPATH="$(pwd):$PYTHONPATH" ./tests/test_coverage.py
+#
+
+
+"""Tests for _coverage module"""
+
+
+# Standard packages
+from json import dumps as json_dumps
+from os import makedirs
+from shutil import which
+from sys import path as sys_path
+
+# Installed packages
+import pytest
+from mezcla import debug
+from mezcla import glue_helpers as gh
+
+# Local packages
+sys_path.insert(0, './batspp')
+from batspp.batspp_args import BatsppArgs
+from batspp.batspp_test import BatsppTest
+
+
+# Reference to the module being tested
+import batspp._coverage as THE_MODULE
+
+
+def test_build_kcov_command():
+    """Test for build_kcov_command"""
+    exclude = THE_MODULE.get_exclude_patterns('/tmp/batspp-1')
+    assert '/tmp/batspp-1' in exclude
+    assert any(pattern.endswith('bats-run') for pattern in exclude)
+    assert THE_MODULE.build_kcov_command('out/1', 'test.bats', '--timing', ['/usr/lib/', '/tmp/x']) == [
+        'kcov', '--exclude-pattern=/usr/lib/,/tmp/x', 'out/1', 'bats', '--timing', 'test.bats',
+        ]
+
+
+def test_load_summary():
+    """Test for load_summary and format_summary"""
+    directory = f'{gh.get_temp_file()}-coverage'
+    makedirs(gh.form_path(directory, THE_MODULE.MERGED_DIR))
+    gh.write_file(gh.form_path(directory, THE_MODULE.MERGED_DIR, THE_MODULE.COVERAGE_JSON), json_dumps({
+        'files': [
+            {'file': '/src/b.bash', 'percent_covered': '50.00', 'covered_lines': '2', 'total_lines': '4'},
+            {'file': '/src/a.bash', 'percent_covered': '100.00', 'covered_lines': '4', 'total_lines': '4'},
+            ],
+        }))
+    summary = THE_MODULE.load_summary(directory)
+    assert [entry['file'] for entry in summary] == ['/src/a.bash', '/src/b.bash']
+    assert summary[1] == {'file': '/src/b.bash', 'covered': 2, 'total': 4, 'percent': 50.0}
+    assert THE_MODULE.format_summary(summary).splitlines() == [
+        '# coverage 100.00%     4/4     /src/a.bash',
+        '# coverage  50.00%     2/4     /src/b.bash',
+        '# coverage  75.00%     6/8     total',
+        ]
+    assert THE_MODULE.load_summary(f'{directory}-missing') == []
+
+
+def test_run_kcov():
+    """Test for run_kcov and parse_kcov_output"""
+    assert THE_MODULE.run_kcov(['sh', '-c', 'echo 1..1; exit 3']) == (3, ['1..1'])
+
+    # Tests without result failed if kcov or bats exited with an error
+    lines = ['1..2', 'ok 1 first', "bats: unbound variable"]
+    results = THE_MODULE.parse_kcov_output(1, lines, [1, 5], ['first', 'second'])
+    assert [(result.number, result.name, result.status, result.line) for result in results] == [
+        (1, 'first', 'passed', 1), (2, 'second', 'failed', 5),
+        ]
+    assert results[1].diagnostics == ['not run, bats exited with status 1', 'bats: unbound variable']
+    assert len(THE_MODULE.parse_kcov_output(0, lines, [1, 5], ['first', 'second'])) == 1
+
+
+@pytest.mark.skipif(not which(THE_MODULE.KCOV), reason='kcov is not installed')
+def test_run_coverage():
+    """Test for run_coverage"""
+    source = f'{gh.get_temp_file()}.bash'
+    gh.write_file(source, 'function one () {\n  echo 1\n}\nfunction two () {\n  echo 2\n}\n')
+    files = [f'{gh.get_temp_file()}-{number}.batspp' for number in range(2)]
+    gh.write_file(files[0], '$ one\n1\n')
+    gh.write_file(files[1], '$ one\n1\n\n$ one\n2\n')
+    directory = f'{gh.get_temp_file()}-coverage'
+    results = list(THE_MODULE.run_coverage(BatsppTest(), files, directory, args=BatsppArgs(sources=[source])))
+    assert [(result.number, result.status, result.file) for result in results] == [
+        (1, 'passed', files[0]), (2, 'passed', files[1]), (3, 'failed', files[1]),
+        ]
+    summary = THE_MODULE.load_summary(gh.form_path(directory, THE_MODULE.MERGED_DIR))
+    assert [entry['file'] for entry in summary] == [source]
+
+
+if __name__ == '__main__':
+    debug.trace_current_context()
+    pytest.main([__file__])
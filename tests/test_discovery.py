@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+#
+# Tests for _discovery module
+#
+# This test must be runned with the command:
+# $ PYTHONPATH="$(pwd):$PYTHONPATH" ./tests/test_discovery.py
+#
+
+
+"""Tests for _discovery module"""
+
+
+# Standard packages
+from os import makedirs
+from sys import path as sys_path
+
+# Installed packages
+import pytest
+from mezcla import debug
+from mezcla import glue_helpers as gh
+
+# Local packages
+sys_path.insert(0, './batspp')
+from batspp.batspp_args import BatsppArgs
+from batspp.batspp_opts import BatsppOpts
+from batspp.batspp_pipeline import transpile_file
+
+
+# Reference to the module being tested
+import batspp._discovery as THE_MODULE
+
+
+def write_tree() -> str:
+    """Write a folder with tests files, returns its path"""
+    directory = f'{gh.get_temp_file()}-tree'
+    for folder in ['src/sub', '.git', 'vendor']:
+        makedirs(gh.form_path(directory, folder), exist_ok=True)
+    files = {
+        'src/a.batspp': '# Test one\n$ echo 1\n1\n',
+        'src/sub/b.batspp': '# Test two\n$ echo 2\n2\n',
+        'src/sub/lib.sh': 'function f () { echo 3; }\n# $ f\n# 3\n',
+        'src/sub/arrow.bash': 'function g () { echo 4; }\n# g => 4\n',
+        'src/plain.sh': 'echo "# $ not a test"\n',
+        '.git/x.batspp': '# Test x\n$ echo x\nx\n',
+        'vendor/v.batspp': '# Test v\n$ echo v\nv\n',
+        'README.md': '# $ echo readme\n',
+        }
+    for name, content in files.items():
+        gh.write_file(gh.form_path(directory, name), content)
+    return directory
+
+
+def test_has_embedded_tests():
+    """Test for has_embedded_tests"""
+    directory = write_tree()
+    assert THE_MODULE.has_embedded_tests(f'{directory}/src/sub/lib.sh')
+    assert THE_MODULE.has_embedded_tests(f'{directory}/src/sub/arrow.bash')
+    assert not THE_MODULE.has_embedded_tests(f'{directory}/src/plain.sh')
+    assert not THE_MODULE.has_embedded_tests(f'{directory}/missing.sh')
+
+
+def test_discover_files():
+    """Test for discover_files"""
+    directory = write_tree()
+    relative = lambda files: [file[len(directory) + 1:] for file in files]
+    assert relative(THE_MODULE.discover_files(directory)) == [
+        'src/a.batspp', 'src/sub/arrow.bash', 'src/sub/b.batspp', 'src/sub/lib.sh', 'vendor/v.batspp',
+        ]
+    assert relative(THE_MODULE.discover_files(directory, include=['*.sh', 'src/a.*'], exclude=['.*', 'vendor'])) == [
+        'src/a.batspp', 'src/sub/lib.sh',
+        ]
+    assert relative(THE_MODULE.discover_files(directory, exclude=['sub'])) == [
+        '.git/x.batspp', 'src/a.batspp', 'vendor/v.batspp',
+        ]
+
+
+def test_transpile_files():
+    """Ensure files are transpiled on the pool as serially, errors are reported by file"""
+    directory = write_tree()
+    files = THE_MODULE.discover_files(directory)
+    gh.write_file(files[0], '# Test\n$ echo "x\n')
+    args, opts = BatsppArgs(), BatsppOpts()
+    results = list(THE_MODULE.transpile_files(files, args, opts, workers=2))
+    assert [file for file, _result, _seconds in results] == files
+    assert isinstance(results[0][1], Exception)
+    for file, result, seconds in results[1:]:
+        assert result.content == transpile_file(file, args=args, opts=opts).content
+        assert seconds >= 0
+
+
+def test_get_mirror_path():
+    """Test for get_mirror_path"""
+    assert THE_MODULE.get_mirror_path('tests/sub/a.batspp', 'tests', 'out') == 'out/sub/a.bats'
+    assert THE_MODULE.get_mirror_path('tests/lib.sh', 'tests', 'out/') == 'out/lib.sh.bats'
+    assert THE_MODULE.get_mirror_path('/other/b.ipynb', 'tests', 'out') == 'out/b.bats'
+
+
+if __name__ == '__main__':
+    debug.trace_current_context()
+    pytest.main([__file__])
@@ -35,7 +35,10 @@ class TestExceptions:
         """Test for error()"""
         debug.trace(debug.QUITE_DETAILED,
                     f"TestExceptions.test_error(); self={self}")
-        ## TODO: WORK-IN-PROGRESS
+        with pytest.raises(THE_MODULE.BatsppError) as exc_info:
+            THE_MODULE.error('invalid syntax', text_line='$ echo "x', line=2, column=6)
+        assert str(exc_info.value).startswith('invalid syntax\nline 2: $ echo "x\n')
+        assert (exc_info.value.message, exc_info.value.line, exc_info.value.column) == ('invalid syntax', 2, 6)
 
 
 if __name__ == '__main__':
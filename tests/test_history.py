@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+#
+# Tests for _history module
+#
+# This test must be runned with the command:
+# $ PYTHONPATH="$(pwd):$PYTHONPATH" ./tests/test_history.py
+#
+
+
+"""Tests for _history module"""
+
+
+# Standard packages
+from sys import path as sys_path
+
+# Installed packages
+import pytest
+from mezcla import debug
+from mezcla import glue_helpers as gh
+
+# Local packages
+sys_path.insert(0, './batspp')
+from batspp._ast_nodes import Test
+from batspp._tap import TestResult
+
+
+# Reference to the module being tested
+import batspp._history as THE_MODULE
+
+
+def test_load_update_history():
+    """Test for load_history() and update_history()"""
+    path = f'{gh.get_temp_file()}.jsonl'
+    assert THE_MODULE.load_history(path) == {}
+
+    THE_MODULE.update_history(path, [
+        TestResult(1, 'first', 'failed', duration=2.0, file='a.batspp'),
+        TestResult(2, 'second', 'passed', duration=1.0, file='a.batspp'),
+        ])
+    THE_MODULE.update_history(path, [
+        TestResult(1, 'first', 'passed', duration=3.0, file='a.batspp'),
+        TestResult(2, 'second', 'skipped', file='a.batspp'),
+        ])
+
+    # Skipped tests keep their previous entry
+    history = THE_MODULE.load_history(path)
+    assert sorted(history) == [('a.batspp', 'first'), ('a.batspp', 'second')]
+    assert (history[('a.batspp', 'first')].status, history[('a.batspp', 'first')].duration) == ('passed', 3.0)
+    assert history[('a.batspp', 'second')].status == 'passed'
+
+    # No temporal files are left
+    listing = gh.get_directory_listing(gh.dir_path(path))
+    assert not [name for name in listing if name.startswith(f'{gh.basename(path)}.')]
+
+
+def test_order_tests():
+    """Test for order_tests()"""
+    tests = [Test(reference=name) for name in ['fast', 'slow failing', 'new', 'slow']]
+    history = {
+        ('a.batspp', 'fast'): TestResult(1, 'fast', 'passed', duration=1.0),
+        ('a.batspp', 'slow failing'): TestResult(2, 'slow failing', 'failed', duration=5.0),
+        ('a.batspp', 'slow'): TestResult(3, 'slow', 'passed', duration=6.0),
+        }
+
+    def order(keys, file='a.batspp'):
+        return [test.reference for test in THE_MODULE.order_tests(tests, file, history, keys)]
+
+    assert order([]) == ['fast', 'slow failing', 'new', 'slow']
+    assert order(['failed']) == ['slow failing', 'fast', 'new', 'slow']
+    assert order(['slowest']) == ['slow', 'slow failing', 'new', 'fast']
+    assert order(['failed', 'slowest']) == ['slow failing', 'slow', 'new', 'fast']
+
+    # Tests of other files have no history
+    assert order(['failed', 'slowest'], file='b.batspp') == ['fast', 'slow failing', 'new', 'slow']
+
+    with pytest.raises(AssertionError):
+        order(['random'])
+
+
+if __name__ == '__main__':
+    debug.trace_current_context()
+    pytest.main([__file__])
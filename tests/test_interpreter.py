@@ -23,6 +23,7 @@ from mezcla import debug
 # Local packages
 sys_path.insert(0, './batspp')
 from batspp._token import TokenData
+from batspp.batspp_args import BatsppArgs
 from batspp._ast_nodes import (
     AssertionType, Assertion,
     Test, TestsSuite,
@@ -93,6 +94,152 @@ class TestInterpreter:
         assert ' == ' in actual_assertion
         assert actual_assertion.endswith(' ]')
         assert interpreter.debug_required
+        assert not interpreter.sudo_required
+
+        node.setup_commands = ['sudo touch /etc/some-file']
+        interpreter.visit_Assertion(node)
+        assert interpreter.sudo_required
+
+    # pylint: disable=invalid-name
+    def test_visit_Assertion_fixture(self):
+        """Test for visit_Assertion() with large expected outputs"""
+        debug.trace(debug.QUITE_DETAILED,
+                    f"TestInterpreter.test_visit_Assertion_fixture(); self={self}")
+        data = TokenData(text_line='some line', line=3, column=3)
+        interpreter = THE_MODULE.Interpreter()
+        interpreter.args = BatsppArgs(fixtures_threshold=10)
+
+        # Expected outputs above the threshold are stored out-of-line
+        node = Assertion(
+            atype=AssertionType.OUTPUT,
+            actual=['cat file.txt'],
+            expected=['some long text', 'over two lines'],
+            data=data,
+            )
+        actual = interpreter.visit_Assertion(node)
+        assert len(interpreter.fixtures) == 1
+        name, content = list(interpreter.fixtures.items())[0]
+        assert content == b'some long text\nover two lines\n'
+        assert actual.splitlines()[-1] == (
+            f'\tcmp -s <(printf \'%s\\n\' "$(cat file.txt)") "$FIXTURES_DIR/{name}"'
+            )
+        assert 'over two lines' not in actual
+
+        # Short expected outputs are still inlined
+        node = Assertion(
+            atype=AssertionType.OUTPUT,
+            actual=['echo hi'],
+            expected=['hi'],
+            data=data,
+            )
+        actual = interpreter.visit_Assertion(node)
+        assert len(interpreter.fixtures) == 1
+        assert actual.splitlines()[-1].startswith('\t[ ')
+
+    # pylint: disable=invalid-name
+    def test_visit_Assertion_capture_limit(self):
+        """Test for visit_Assertion() with bounded capture of outputs"""
+        debug.trace(debug.QUITE_DETAILED,
+                    f"TestInterpreter.test_visit_Assertion_capture_limit(); self={self}")
+        data = TokenData(text_line='some line', line=3, column=3)
+        interpreter = THE_MODULE.Interpreter()
+        interpreter.args = BatsppArgs(capture_limit=4)
+
+        node = Assertion(
+            atype=AssertionType.OUTPUT,
+            actual=['cat file.txt'],
+            expected=['some text'],
+            data=data,
+            )
+        actual = interpreter.visit_Assertion(node)
+        actual_assertion = actual.splitlines()[-1]
+        assert '"$( ( cat file.txt ) | capture_digest 4)" == ' in actual_assertion
+        assert "'some\\x0a[batspp: output truncated at 4 of 10 bytes, sha256 " in actual_assertion
+        assert interpreter.capture_required
+
+    # pylint: disable=invalid-name
+    def test_visit_Test_timeout(self):
+        """Test for visit_Test() with timeouts"""
+        debug.trace(debug.QUITE_DETAILED,
+                    f"TestInterpreter.test_visit_Test_timeout(); self={self}")
+        data = TokenData(text_line='some line', line=3, column=3)
+        interpreter = THE_MODULE.Interpreter()
+        interpreter.args = BatsppArgs(timeout=10)
+
+        assertion = Assertion(
+            atype=AssertionType.OUTPUT,
+            actual=['sleep 1; echo it\'s done'],
+            expected=['it\'s done'],
+            data=data,
+            )
+
+        # The default timeout applies to every test
+        node = Test(reference='slow test', assertions=[assertion], data=data)
+        actual = interpreter.visit_Test(node)
+        assert '\ttest_deadline=$((SECONDS + 10))\n' in actual
+        assert (
+            '"$(timed_eval "$((test_deadline - SECONDS))" 3 '
+            '\'sleep 1; echo it\'\\\'\'s done\')" == '
+            ) in actual
+        assert '\t[ ! -e "$timeout_flag" ]\n' in actual
+
+        # Commands that timed out on the debug trace are not evaluated again
+        assert '\t[ -e "$timeout_flag" ] || [ "$(timed_eval ' in actual
+
+        # Setup commands are checked against the deadline, before the assertions and the teardown
+        assert '\tcheck_deadline 3\n\tshopt -s expand_aliases\n' in actual
+        assert '\tcheck_deadline 3\n\n\trun_teardown\n' in actual
+
+        # Test directives override the default timeout
+        node = Test(reference='slower test', assertions=[assertion], data=data, timeout=60)
+        actual = interpreter.visit_Test(node)
+        assert '\ttest_deadline=$((SECONDS + 60))\n' in actual
+        assert interpreter.max_timeout == 60
+
+        # Without timeouts commands are evaluated directly
+        interpreter.args = BatsppArgs()
+        node = Test(reference='fast test', assertions=[assertion], data=data)
+        actual = interpreter.visit_Test(node)
+        assert 'timed_eval' not in actual
+        assert 'timeout_flag' not in actual
+        assert 'check_deadline' not in actual
+
+    def test_interpret_bundle(self):
+        """Test for interpret_bundle()"""
+        debug.trace(debug.QUITE_DETAILED,
+                    f"TestInterpreter.test_interpret_bundle(); self={self}")
+        data = TokenData(text_line='some line', line=3, column=3)
+        interpreter = THE_MODULE.Interpreter()
+
+        def build_suite(command):
+            assertion = Assertion(
+                atype=AssertionType.OUTPUT,
+                actual=[command],
+                expected=['hi'],
+                data=data,
+                )
+            test = Test(reference='some test', assertions=[assertion], data=data)
+            return TestsSuite(tests=[test], setup_commands=[], teardown_commands=[], data=data)
+
+        actual = interpreter.interpret_bundle([
+            ('a.batspp', build_suite('echo hi'), BatsppArgs()),
+            ('b.bash', build_suite('greet'), BatsppArgs(sources=['b.bash'])),
+            ])
+
+        # Each suite has its own setup and teardown functions
+        assert actual.startswith('#!/usr/bin/env bats\n')
+        assert 'function run_setup_1 () {' in actual
+        assert 'function run_teardown_2 () {' in actual
+        assert '@test "a.batspp :: some test" {\n\trun_setup_1 "some-test"\n' in actual
+        assert '@test "b.bash :: some test" {\n\trun_setup_2 "some-test"\n' in actual
+        assert '\trun_teardown_2\n}' in actual
+
+        # Sources are not shared between suites
+        assert '\tsource b.bash\n' in actual.split('function run_setup_2')[1]
+        assert 'source b.bash' not in actual.split('function run_setup_2')[0]
+
+        # Empty bundles are valid tests files
+        assert interpreter.interpret_bundle([]).startswith('#!/usr/bin/env bats\n')
 
     def test_interpret(self):
         """Test for interpret()"""
@@ -137,7 +284,7 @@ class TestInterpreter:
             '\n'
             '# Constants\n'
             'VERBOSE_DEBUG=""\n'
-            'TEMP_DIR="/tmp"\n'
+            'TEMP_DIR="${TMP:-/tmp}/batspp-$$"\n'
             '\n'
             '# Setup function\n'
             '# $1 -> test name\n'
@@ -185,6 +332,47 @@ class TestInterpreter:
 
         assert actual == expected
 
+        # The tree is not modified by the setup commands of the arguments
+        args = BatsppArgs(visible_paths=['/opt/bin'])
+        first = THE_MODULE.Interpreter().interpret(test_suite_node, args=args)
+        assert test_suite_node.setup_commands == ['echo "hello world" > file.txt']
+        assert THE_MODULE.Interpreter().interpret(test_suite_node, args=args) == first
+        assert first.count('PATH=/opt/bin:$PATH') == 1
+
+
+def test_build_expected_digest():
+    """Test for build_expected_digest()"""
+    # Data under the limit is not changed
+    assert THE_MODULE.build_expected_digest(b'hello\n', 10) == b'hello\n'
+    assert THE_MODULE.build_expected_digest(b'hello\n', 5) == b'hello'
+
+    # The rest is reduced to its size and hash
+    actual = THE_MODULE.build_expected_digest(b'hello world\n', 5)
+    assert actual == (
+        b'hello\n[batspp: output truncated at 5 of 12 bytes, sha256 '
+        b'c4d600b8ffe878b4d47a70cbb334071eda47a0d3e678218ba81e444ed7810fc6]'
+        )
+
+    # Trailing newlines of the rest are normalized
+    assert THE_MODULE.build_expected_digest(b'hello world\n\n\n', 5) == actual
+
+
+def test_quote_bytes():
+    """Test for quote_bytes()"""
+    assert THE_MODULE.quote_bytes(b'hello') == "'hello'"
+    assert THE_MODULE.quote_bytes(b"it's\n") == "'it\\x27s\\x0a'"
+    assert THE_MODULE.quote_bytes(b'a\\b') == "'a\\\\b'"
+    assert THE_MODULE.quote_bytes('\u00f1'.encode()) == "'\\xc3\\xb1'"
+
+
+
+def test_uses_sudo():
+    """Test for uses_sudo()"""
+    assert THE_MODULE.uses_sudo(['ls', 'sudo ls /root'])
+    assert THE_MODULE.uses_sudo(['echo 1 | sudo tee /tmp/a'])
+    assert not THE_MODULE.uses_sudo(['echo pseudo-terminal', 'ls'])
+    assert not THE_MODULE.uses_sudo(None)
+
 
 if __name__ == '__main__':
     debug.trace_current_context()
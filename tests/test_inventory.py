@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+#
+# Tests for _inventory module
+#
+# This test must be runned with the command:
+# $ PYTHONPATH="$(pwd):$PYTHONPATH" ./tests/test_inventory.py
+#
+
+
+"""Tests for _inventory module"""
+
+
+# Standard packages
+from sys import path as sys_path
+
+# Installed packages
+import pytest
+from mezcla import debug
+from mezcla import glue_helpers as gh
+
+# Local packages
+sys_path.insert(0, './batspp')
+from batspp.batspp_args import BatsppArgs
+from batspp.batspp_opts import BatsppOpts
+from batspp._cache import MemoryCache
+
+
+# Reference to the module being tested
+import batspp._inventory as THE_MODULE
+
+
+TESTS_TEXT = '# Test one\n$ echo 1\n1\n\n# Test two\n$ echo 2\n2\n$ echo 3\n3\n'
+
+
+def test_list_tests():
+    """Test for list_tests"""
+    file = f'{gh.get_temp_file()}.batspp'
+    gh.write_file(file, TESTS_TEXT)
+    assert THE_MODULE.list_tests(file) == [
+        {'file': file, 'name': 'one', 'line': 1, 'assertions': 1, 'sources': []},
+        {'file': file, 'name': 'two', 'line': 5, 'assertions': 2, 'sources': []},
+        ]
+
+    # Scripts with embedded tests are sources of their tests
+    script = f'{gh.get_temp_file()}.bash'
+    gh.write_file(script, 'function f () { echo 3; }\n# $ f\n# 3\n')
+    args = BatsppArgs(sources=[file])
+    result = THE_MODULE.list_tests(script, args=args, opts=BatsppOpts(embedded_tests=None))
+    assert [test['sources'] for test in result] == [[file, script]]
+    assert args.sources == [file]
+
+
+def test_list_files():
+    """Test for list_files"""
+    files = [f'{gh.get_temp_file()}-{number}.batspp' for number in range(3)]
+    for file in files:
+        gh.write_file(file, TESTS_TEXT)
+    gh.write_file(files[1], '# Test\n$ echo "x\n')
+
+    # Inventories are in the order of the files, errors are returned by file
+    cache = MemoryCache()
+    results = list(THE_MODULE.list_files(files, cache=cache, workers=2))
+    assert [file for file, _ in results] == files
+    assert isinstance(results[1][1], Exception)
+    assert [test['name'] for test in results[2][1]] == ['one', 'two']
+    assert len(cache.entries) == 2
+
+    # Cached inventories are not parsed again
+    gh.write_file(files[1], TESTS_TEXT)
+    for entry in cache.entries.values():
+        entry['tests'][0]['name'] = 'cached'
+    results = list(THE_MODULE.list_files(files, cache=cache))
+    assert [result[0]['name'] for _, result in results] == ['cached', 'one', 'cached']
+
+
+if __name__ == '__main__':
+    debug.trace_current_context()
+    pytest.main([__file__])
@@ -9,6 +9,9 @@
 """Tests for _ipynb_to_batspp module"""
 
 # Standard packages
+import json
+import tracemalloc
+from io import StringIO
 from sys import path as sys_path
 
 # Installed packages
@@ -22,10 +25,64 @@ sys_path.insert(0, './batspp')
 # Reference to the module being tested
 import batspp._ipynb_to_batspp as THE_MODULE
 
+NOTEBOOK = {
+    'cells': [
+        {'cell_type': 'markdown', 'metadata': {}, 'source': ['Test one\n', 'with two lines']},
+        {
+            'cell_type': 'code',
+            'execution_count': 1,
+            'metadata': {},
+            'outputs': [{'name': 'stdout', 'output_type': 'stream', 'text': ['1\n', '2\n']}],
+            'source': ['echo 1\n', 'echo 2'],
+            },
+        {'cell_type': 'raw', 'metadata': {}, 'source': ['ignored']},
+        {
+            'cell_type': 'code',
+            'execution_count': 2,
+            'metadata': {'payload': 'A' * 1000000},
+            'outputs': [{'ename': 'Error', 'evalue': 'failed', 'output_type': 'error', 'traceback': []}],
+            'source': 'false',
+            },
+        ],
+    'metadata': {},
+    'nbformat': 4,
+    'nbformat_minor': 5,
+    }
+
+
 class TestIpynbToBatspp:
     """Class for testcase definition"""
 
-    ## TODO: WORK-IN-PROGRESS
+    def test_convert(self):
+        """Test for convert()"""
+        debug.trace(debug.QUITE_DETAILED, f"TestIpynbToBatspp.test_convert(); self={self}")
+        result = THE_MODULE.IpynbToBatspp().convert(json.dumps(NOTEBOOK, indent=1))
+        assert result == '# Test one\n# with two lines\n$ echo 1\n$ echo 2\n1\n2\n$ false\nError\n'
+
+    def test_convert_stream(self):
+        """Ensure cells are written as converted, and payloads are skipped"""
+        debug.trace(debug.QUITE_DETAILED, f"TestIpynbToBatspp.test_convert_stream(); self={self}")
+        source, sink = StringIO(json.dumps(NOTEBOOK)), StringIO()
+        tracemalloc.start()
+        try:
+            THE_MODULE.IpynbToBatspp().convert_stream(source, sink)
+            _current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert sink.getvalue().startswith('# Test one\n')
+        # NOTE: only the chunks are kept in memory, not the payload
+        assert peak < 500000
+
+    def test_unsupported_output(self):
+        """Ensure unsupported outputs raise an error"""
+        debug.trace(debug.QUITE_DETAILED, f"TestIpynbToBatspp.test_unsupported_output(); self={self}")
+        notebook = {'cells': [{'cell_type': 'code', 'source': ['ls'], 'outputs': [
+            {'data': {'image/png': 'iVBOR'}, 'metadata': {}, 'output_type': 'display_data'},
+            ]}]}
+        with pytest.raises(Exception, match='display_data'):
+            THE_MODULE.IpynbToBatspp().convert(json.dumps(notebook))
+        with pytest.raises(Exception, match='cells not found'):
+            THE_MODULE.IpynbToBatspp().convert('{"metadata": {}}')
 
 if __name__ == '__main__':
     debug.trace_current_context()
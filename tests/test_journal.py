@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+#
+# Tests for _journal module
+#
+# This test must be runned with the command:
+# $ PYTHONPATH="$(pwd):$PYTHONPATH" ./tests/test_journal.py
+#
+
+
+"""Tests for _journal module"""
+
+
+# Standard packages
+from sys import path as sys_path
+
+# Installed packages
+import pytest
+from mezcla import debug
+from mezcla import glue_helpers as gh
+
+# Local packages
+sys_path.insert(0, './batspp')
+from batspp._tap import TestResult
+
+
+# Reference to the module being tested
+import batspp._journal as THE_MODULE
+
+
+class TestJournal:
+    """Class for testcase definition"""
+
+    def test_record(self):
+        """Ensure only completed results are recorded and resumed"""
+        debug.trace(7, f'TestJournal.test_record({self})')
+        path = f'{gh.get_temp_file()}.jsonl'
+        with THE_MODULE.Journal(path) as journal:
+            journal.record('aaaa', TestResult(1, 'passing', 'passed', file='a.batspp'))
+            journal.record('bbbb', TestResult(2, 'not run', 'skipped', file='a.batspp'))
+            assert journal.get('a.batspp', 'aaaa') is None
+        assert len(gh.read_file(path).splitlines()) == 1
+
+        # Resumed journals are appended
+        with THE_MODULE.Journal(path, resume=True) as journal:
+            assert journal.get('a.batspp', 'aaaa').name == 'passing'
+            assert journal.get('b.batspp', 'aaaa') is None
+            journal.record('cccc', TestResult(3, 'failing', 'failed', file='a.batspp'))
+        assert len(gh.read_file(path).splitlines()) == 2
+
+        # Without resume the journal starts again
+        with THE_MODULE.Journal(path) as journal:
+            assert journal.get('a.batspp', 'aaaa') is None
+        assert gh.read_file(path) == ''
+
+
+def test_resume_truncated():
+    """Ensure resumed journals with a truncated line keep all the records"""
+    path = f'{gh.get_temp_file()}.jsonl'
+    with THE_MODULE.Journal(path) as journal:
+        journal.record('aaaa', TestResult(1, 'first', 'passed', file='a.batspp'))
+        journal.record('bbbb', TestResult(2, 'second', 'passed', file='a.batspp'))
+    with open(path, 'a', encoding='utf-8') as file:
+        file.write('{"file": "a.batspp", "fingerprint": "cccc", "numb')
+
+    with THE_MODULE.Journal(path, resume=True) as journal:
+        journal.record('cccc', TestResult(3, 'third', 'passed', file='a.batspp'))
+    assert len(THE_MODULE.load_journal(path)) == 3
+    assert len(gh.read_file(path).splitlines()) == 3
+
+
+def test_truncate_partial_line():
+    """Test for truncate_partial_line()"""
+    path = gh.get_temp_file()
+    THE_MODULE.truncate_partial_line(path)
+    for content, expected in [('', ''), ('a\nb\n', 'a\nb\n'), ('a\nb', 'a\n'), ('ab', '')]:
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        THE_MODULE.truncate_partial_line(path)
+        with open(path, encoding='utf-8') as file:
+            assert file.read() == expected
+
+
+def test_load_journal():
+    """Test for load_journal()"""
+    path = f'{gh.get_temp_file()}.jsonl'
+    assert THE_MODULE.load_journal(path) == {}
+
+    # Truncated lines of killed runs are ignored
+    gh.write_file(path, (
+        '{"file": "a.batspp", "fingerprint": "aaaa", "number": 1, "name": "first", "status": "passed"}\n'
+        '{"file": "a.batspp", "fingerprint": "bbbb", "numb'
+        ))
+    result = THE_MODULE.load_journal(path)
+    assert list(result) == [('a.batspp', 'aaaa')]
+    assert result[('a.batspp', 'aaaa')].status == 'passed'
+
+
+if __name__ == '__main__':
+    debug.trace_current_context()
+    pytest.main([__file__])
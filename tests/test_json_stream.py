@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+#
+# Tests for _json_stream module
+#
+# This test must be runned with the command:
+# $ PYTHONPATH="$(pwd):$PYTHONPATH" ./tests/test_json_stream.py
+#
+
+
+"""Tests for _json_stream module"""
+
+
+# Standard packages
+from io import StringIO
+from json import dumps as json_dumps
+from sys import path as sys_path
+
+# Installed packages
+import pytest
+from mezcla import debug
+
+# Local packages
+sys_path.insert(0, './batspp')
+
+
+# Reference to the module being tested
+import batspp._json_stream as THE_MODULE
+
+
+DOCUMENT = {
+    'text': 'quote " backslash \\ newline \n unicode á \U0001f600',
+    'numbers': [0, -1.5, 2e10, True, False, None],
+    'nested': {'empty': {}, 'list': [[], [{}]], 'payload': 'x' * 1000},
+    }
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 7, THE_MODULE.CHUNK_SIZE])
+def test_read_value(chunk_size):
+    """Ensure values are decoded whatever the chunks boundaries"""
+    stream = THE_MODULE.JsonStream(StringIO(json_dumps(DOCUMENT, indent=1)), chunk_size=chunk_size)
+    assert stream.read_value() == DOCUMENT
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, THE_MODULE.CHUNK_SIZE])
+def test_items(chunk_size):
+    """Ensure values can be skipped while iterating an object"""
+    stream = THE_MODULE.JsonStream(StringIO(json_dumps(DOCUMENT)), chunk_size=chunk_size)
+    result = {}
+    for key in stream.items():
+        if key == 'numbers':
+            result[key] = [stream.read_value() for _ in stream.elements()]
+        else:
+            stream.skip_value()
+    assert result == {'numbers': DOCUMENT['numbers']}
+
+
+def test_invalid():
+    """Ensure invalid documents raise errors"""
+    with pytest.raises(Exception, match='expected ":"'):
+        THE_MODULE.JsonStream(StringIO('{"a" 1}')).read_value()
+    with pytest.raises(Exception, match='unexpected end'):
+        THE_MODULE.JsonStream(StringIO('["a", ')).read_value()
+    with pytest.raises(Exception, match='unexpected "}"'):
+        THE_MODULE.JsonStream(StringIO('{"a": }')).read_value()
+
+
+if __name__ == '__main__':
+    debug.trace_current_context()
+    pytest.main([__file__])
@@ -210,6 +210,17 @@ class TestParser:
         assert len(parser.tests_ast_nodes_stack) == 2
         assert parser.tests_ast_nodes_stack[1].reference == 'a new forced test'
 
+        # Options are split from the title
+        parser.tokens = [
+            Token(TokenVariant.TEST, '# Test '),
+            Token(TokenVariant.TEXT, 'slow test (timeout=30)'),
+            Token(TokenVariant.EOF, None),
+            ]
+        parser.index = 0
+        parser.push_test_ast_node()
+        assert parser.tests_ast_nodes_stack[2].reference == 'slow test'
+        assert parser.tests_ast_nodes_stack[2].timeout == 30
+
     def test_break_continuation(self):
         """Test for break_continuation()"""
         debug.trace(7, f'TestParser.test_break_continuation({self})')
@@ -450,6 +461,25 @@ class TestParser:
             ])
 
 
+def test_split_test_options():
+    """Test for split_test_options()"""
+    def split(text):
+        return THE_MODULE.split_test_options(Token(TokenVariant.TEXT, text))
+
+    assert split('some title') == ('some title', {})
+    assert split('some title (timeout=5)') == ('some title', {'timeout': 5})
+    assert split('some title ( timeout = 5 )') == ('some title', {'timeout': 5})
+
+    # Parenthesis without options are part of the title
+    assert split('fibonacci (recursive)') == ('fibonacci (recursive)', {})
+
+    # Unknown options or values are rejected
+    with pytest.raises(Exception):
+        split('some title (retries=3)')
+    with pytest.raises(Exception):
+        split('some title (timeout=soon)')
+
+
 if __name__ == '__main__':
     debug.trace_current_context()
     pytest.main([__file__])
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+#
+# Tests for pytest_plugin module
+#
+# This test must be runned with the command:
+# $ PYTHONPATH="$(pwd):$PYTHONPATH" ./tests/test_pytest_plugin.py
+#
+
+
+"""Tests for pytest_plugin module"""
+
+
+# Standard packages
+from os import makedirs
+from sys import path as sys_path
+
+# Installed packages
+import pytest
+from mezcla import debug
+from mezcla import glue_helpers as gh
+
+# Local packages
+sys_path.insert(0, './batspp')
+
+
+def test_collect_and_run():
+    """Ensure tests of Batspp files are collected and run as pytest items"""
+    directory = f'{gh.get_temp_file()}-plugin'
+    makedirs(directory)
+    gh.write_file(f'{directory}/pytest.ini', '[pytest]\nbatspp_files = *.batspp *.sh\n')
+    gh.write_file(f'{directory}/test.batspp', (
+        '# Test first\n$ echo 1\n1\n\n'
+        '# Test second\n$ echo 2\n3\n\n'
+        '# Test first\n$ echo 3\n3\n'
+        ))
+    gh.write_file(f'{directory}/lib.sh', 'function f () { echo 3; }\n# $ f\n# 3\n')
+    gh.write_file(f'{directory}/plain.sh', 'echo 3\n')
+
+    result = gh.run(f'cd {directory} && python3 -m pytest -p batspp.pytest_plugin -p no:cacheprovider -v')
+    assert 'test.batspp::first (line 1) PASSED' in result
+    assert 'test.batspp::second FAILED' in result
+    assert 'test.batspp::first (line 9) PASSED' in result
+    assert 'lib.sh::test of line 3 PASSED' in result
+    assert 'plain.sh' not in result
+    assert 'Batspp test "second" failed at line 5' in result
+
+    # Tests can be selected by name
+    result = gh.run(f'cd {directory} && python3 -m pytest -p batspp.pytest_plugin -p no:cacheprovider -k second')
+    assert '1 failed, 3 deselected' in result
+
+
+def test_no_result():
+    """Ensure tests without a result fail"""
+    directory = f'{gh.get_temp_file()}-plugin'
+    makedirs(directory)
+    gh.write_file(f'{directory}/test.batspp', '# Test first\n$ echo 1\n1\n')
+    gh.write_file(f'{directory}/conftest.py', (
+        'from batspp.batspp_test import BatsppTest\n'
+        'BatsppTest.run_files_stream = lambda *args, **kwargs: iter([])\n'
+        ))
+
+    result = gh.run(f'cd {directory} && python3 -m pytest -p batspp.pytest_plugin -p no:cacheprovider -v')
+    assert 'test.batspp::first FAILED' in result
+    assert 'Batspp test "first" at line 1 has no result' in result
+
+
+if __name__ == '__main__':
+    debug.trace_current_context()
+    pytest.main([__file__])
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+#
+# Tests for _selection module
+#
+# This test must be runned with the command:
+# $ PYTHONPATH="$(pwd):$PYTHONPATH" ./tests/test_selection.py
+#
+
+
+"""Tests for _selection module"""
+
+
+# Standard packages
+from sys import path as sys_path
+
+# Installed packages
+import pytest
+from mezcla import debug
+from mezcla import glue_helpers as gh
+
+# Local packages
+sys_path.insert(0, './batspp')
+from batspp.batspp_test import BatsppTest
+
+
+# Reference to the module being tested
+import batspp._selection as THE_MODULE
+
+
+TESTS_TEXT = (
+    '# Test one\n$ echo 1\n1\n\n'
+    '# Test two\n$ echo 2\n2\n\n'
+    '# Test three\n$ echo 3\n3\n\n'
+    '# Continue of two\n$ echo 22\n22\n'
+    )
+
+
+def test_parse_selector():
+    """Test for parse_selector"""
+    assert THE_MODULE.parse_selector('tests.batspp:10') == ('tests.batspp', 10)
+    assert THE_MODULE.parse_selector('tests.batspp') == ('tests.batspp', None)
+
+    # Existing files are not selectors
+    file = f'{gh.get_temp_file()}:10'
+    gh.write_file(file, '')
+    assert THE_MODULE.parse_selector(file) == (file, None)
+
+
+def test_compile_filter():
+    """Test for compile_filter"""
+    assert THE_MODULE.compile_filter('') is None
+    assert THE_MODULE.compile_filter('^t').search('two')
+    with pytest.raises(Exception, match='invalid tests filter'):
+        THE_MODULE.compile_filter('(')
+
+
+def test_select_tests():
+    """Test for select_tests"""
+    tests = BatsppTest().parse_text(TESTS_TEXT).tests
+    select = lambda **kwargs: [test.reference for test in THE_MODULE.select_tests(tests, **kwargs)]
+    assert select() == ['one', 'two', 'three']
+    assert select(pattern=THE_MODULE.compile_filter('^t')) == ['two', 'three']
+
+    # Lines select the test of the line, or the last before it,
+    # continuations select the test they continue
+    assert select(lines=[5]) == ['two']
+    assert select(lines=[11]) == ['three']
+    assert select(lines=[14, 1]) == ['one', 'two']
+    assert select(lines=[14], pattern=THE_MODULE.compile_filter('three')) == []
+
+
+if __name__ == '__main__':
+    debug.trace_current_context()
+    pytest.main([__file__])
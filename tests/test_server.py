@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+#
+# Tests for _server module
+#
+# This test must be runned with the command:
+# $ PYTHONPATH="$(pwd):$PYTHONPATH" ./tests/test_server.py
+#
+
+
+"""Tests for _server module"""
+
+
+# Standard packages
+from os import getcwd, getuid
+from sys import path as sys_path
+from threading import Thread
+
+# Installed packages
+import pytest
+from mezcla import debug
+from mezcla import glue_helpers as gh
+
+# Local packages
+sys_path.insert(0, './batspp')
+from batspp._checking import check_file
+
+
+# Reference to the module being tested
+import batspp._server as THE_MODULE
+
+
+TESTS_TEXT = (
+    '# Test first\n'
+    '$ echo $GREETING\n'
+    'hello\n'
+    '\n'
+    '# Test second\n'
+    '$ echo 2\n'
+    '3\n'
+    )
+
+
+@pytest.fixture(name='server')
+def fixture_server():
+    """Server running on a thread"""
+    server = THE_MODULE.BatsppServer(f'{gh.get_temp_file()}.sock')
+    thread = Thread(target=server.serve_forever)
+    thread.start()
+    yield server
+    server.shutdown()
+    thread.join()
+    server.server_close()
+
+
+def request(server, **request):
+    """Return the reply messages of REQUEST to SERVER"""
+    return list(THE_MODULE.send_request(THE_MODULE.connect(server.path), request))
+
+
+def test_connect():
+    """Test for connect without a server"""
+    assert THE_MODULE.connect(f'{gh.get_temp_file()}.sock') is None
+
+
+def test_connect_other_user(server, monkeypatch):
+    """Ensure sockets of other users are refused"""
+    assert THE_MODULE.is_user_socket(server.path)
+    monkeypatch.setattr(THE_MODULE, 'os_getuid', lambda: getuid() + 1)
+    assert not THE_MODULE.is_user_socket(server.path)
+    assert THE_MODULE.connect(server.path) is None
+
+    path = gh.get_temp_file()
+    gh.write_file(path, 'not a socket')
+    assert not THE_MODULE.is_user_socket(path)
+
+
+def test_get_request_env(monkeypatch):
+    """Test for get_request_env"""
+    monkeypatch.setenv('LC_ALL', 'C')
+    monkeypatch.setenv('BATS_TEST_TIMEOUT', '5')
+    monkeypatch.setenv('API_TOKEN', 'secret')
+    monkeypatch.setenv('GREETING', 'hello')
+    env = THE_MODULE.get_request_env(['GREETING'])
+    assert env['LC_ALL'] == 'C'
+    assert env['BATS_TEST_TIMEOUT'] == '5'
+    assert env['GREETING'] == 'hello'
+    assert 'API_TOKEN' not in env
+    assert 'GREETING' not in THE_MODULE.get_request_env()
+
+
+def test_server(server):
+    """Test for BatsppServer requests"""
+    debug.trace(7, f'test_server({server})')
+    file = f'{gh.get_temp_file()}.batspp'
+    gh.write_file(file, TESTS_TEXT)
+
+    # Transpiled tests are taken from the memory the second time
+    messages = request(server, command=THE_MODULE.TRANSPILE, files=[file])
+    assert '@test "first"' in messages[0]['content']
+    assert messages[-1] == {'ok': True}
+    assert request(server, command=THE_MODULE.TRANSPILE, files=[file]) == messages
+    assert len(server.test.cache.entries) == 1
+
+    assert request(server, command=THE_MODULE.CHECK, files=[file]) == [{'file': file, 'errors': []}, {'ok': True}]
+    messages = request(server, command=THE_MODULE.LIST, files=[file])
+    assert [message.get('name') for message in messages] == ['first', 'second', None]
+    assert messages[1]['line'] == 5
+
+    # Tests are run on the environment of the request
+    messages = request(server, command=THE_MODULE.RUN, files=[file], env={'GREETING': 'hello'}, cwd=getcwd())
+    assert [message['result']['status'] for message in messages[:-1]] == ['passed', 'failed']
+    assert messages[0]['result']['file'] == file
+
+    # The output of bats is also replied with tap
+    messages = request(server, command=THE_MODULE.RUN, files=[file], env={'GREETING': 'hello'}, tap=True)
+    tap = ''.join(message.get('tap', '') for message in messages)
+    assert tap.splitlines()[:3] == ['1..2', 'ok 1 first', 'not ok 2 second']
+    assert len([message for message in messages if 'result' in message]) == 2
+
+    # Checks reply all the errors, also the ones of bash, as --check does
+    gh.write_file(file, '# Test one (timeout=x)\n$ echo 1\n1\n\n# Test two\n$ if true; then echo 2\n2\n')
+    messages = request(server, command=THE_MODULE.CHECK, files=[file])
+    assert messages == [{'file': file, 'errors': check_file(file)}, {'ok': True}]
+    assert [error['message'].split(' ')[0] for error in messages[0]['errors']] == ['Invalid', 'bash:']
+
+    # Errors are replied, and the server keeps running
+    gh.write_file(file, '# Test\n$ echo "x\n')
+    messages = request(server, command=THE_MODULE.TRANSPILE, files=[file])
+    assert messages[-1]['ok'] is False
+    assert 'Expected' in messages[-1]['error']
+    assert request(server, command='unknown')[-1]['ok'] is False
+
+
+def test_stale_socket():
+    """Ensure stale sockets are replaced, and running servers are not"""
+    path = f'{gh.get_temp_file()}.sock'
+    server = THE_MODULE.BatsppServer(path)
+    with pytest.raises(Exception, match='already running'):
+        THE_MODULE.BatsppServer(path)
+
+    # NOTE: the socket is kept, as if the server was killed
+    server.socket.close()
+    THE_MODULE.BatsppServer(path).server_close()
+    assert not gh.file_exists(path)
+
+
+if __name__ == '__main__':
+    debug.trace_current_context()
+    pytest.main([__file__])
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+#
+# Tests for _sharding module
+#
+# This test must be runned with the command:
+# $ PYTHONPATH="$(pwd):$PYTHONPATH" ./tests/test_sharding.py
+#
+
+
+"""Tests for _sharding module"""
+
+
+# Standard packages
+from sys import path as sys_path
+
+# Installed packages
+import pytest
+from mezcla import debug
+from mezcla import glue_helpers as gh
+
+# Local packages
+sys_path.insert(0, './batspp')
+
+
+# Reference to the module being tested
+import batspp._sharding as THE_MODULE
+
+
+def test_estimate_durations():
+    """Test for estimate_durations()"""
+    assert THE_MODULE.estimate_durations([1.0, None, 3.0]) == [1.0, 2.0, 3.0]
+    assert THE_MODULE.estimate_durations([None, None]) == [THE_MODULE.DEFAULT_DURATION] * 2
+    assert THE_MODULE.estimate_durations([]) == []
+
+
+def test_partition_tests():
+    """Test for partition_tests()"""
+    # Longest tests are balanced first
+    assert THE_MODULE.partition_tests([5.0, 1.0, 1.0, 3.0, 2.0], 2) == [[0, 1], [2, 3, 4]]
+    assert THE_MODULE.partition_tests([1.0, 1.0, 1.0], 1) == [[0, 1, 2]]
+
+    # Extra shards are empty
+    assert THE_MODULE.partition_tests([1.0], 3) == [[0], [], []]
+
+    with pytest.raises(AssertionError):
+        THE_MODULE.partition_tests([1.0], 0)
+
+
+def test_get_shard_path():
+    """Test for get_shard_path()"""
+    assert THE_MODULE.get_shard_path('/tmp', 2, 5, 'bats') == '/tmp/shard_2.bats'
+    assert THE_MODULE.get_shard_path('/tmp', 2, 10, 'bats') == '/tmp/shard_02.bats'
+
+
+def test_split_bundle_name():
+    """Test for split_bundle_name()"""
+    assert THE_MODULE.split_bundle_name('a.batspp :: some test') == ('a.batspp', 'some test')
+    assert THE_MODULE.split_bundle_name('some test') == ('', 'some test')
+
+
+def test_merge_results():
+    """Test for merge_results() and read_results()"""
+    debug.trace(7, 'test_merge_results()')
+    tap_file = gh.get_temp_file()
+    gh.write_file(tap_file, (
+        '1..2\n'
+        'ok 1 a.batspp :: first test in 10ms\n'
+        'not ok 2 b.batspp :: second test in 20ms\n'
+        "#   `false' failed\n"
+        ))
+    json_file = gh.get_temp_file()
+    gh.write_file(json_file, (
+        '{"properties": {"order": "failed"}}\n'
+        '{"file": "c.batspp", "number": 1, "name": "third test", "status": "skipped", '
+        '"duration": 0.5, "diagnostics": [], "line": 3}\n'
+        ))
+
+    results = list(THE_MODULE.merge_results([tap_file, json_file]))
+    assert [result.number for result in results] == [1, 2, 3]
+    assert [result.file for result in results] == ['a.batspp', 'b.batspp', 'c.batspp']
+    assert [result.name for result in results] == ['first test', 'second test', 'third test']
+    assert [result.status for result in results] == ['passed', 'failed', 'skipped']
+    assert results[1].duration == 0.02
+    assert results[1].diagnostics == ["  `false' failed"]
+
+    # Merged reports are loaded as durations
+    assert THE_MODULE.load_durations(tap_file) == {
+        ('a.batspp', 'first test'): 0.01,
+        ('b.batspp', 'second test'): 0.02,
+        }
+
+
+if __name__ == '__main__':
+    debug.trace_current_context()
+    pytest.main([__file__])
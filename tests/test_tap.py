@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+#
+# Tests for _tap module
+#
+# This test must be runned with the command:
+# $ PYTHONPATH="$(pwd):$PYTHONPATH" ./tests/test_tap.py
+#
+
+
+"""Tests for _tap module"""
+
+
+# Standard packages
+from json import loads as json_loads
+from sys import path as sys_path
+from xml.dom.minidom import parse as xml_parse
+
+# Installed packages
+import pytest
+from mezcla import debug
+from mezcla import glue_helpers as gh
+
+# Local packages
+sys_path.insert(0, './batspp')
+
+
+# Reference to the module being tested
+import batspp._tap as THE_MODULE
+
+
+class TestTapParser:
+    """Class for testcase definition"""
+
+    tap_lines = [
+        '1..4',
+        'ok 1 some test',
+        'not ok 2 failing test',
+        '# (in test file tests.bats, line 20)',
+        "#   `[ 1 == 2 ]' failed",
+        'ok 3 skipped test # skip not today',
+        'ok 4 timed test in 25ms',
+        ]
+
+    def test_feed(self):
+        """Test for feed()"""
+        debug.trace(7, f'TestTapParser.test_feed({self})')
+        parser = THE_MODULE.TapParser(source_lines=[3, 7, 12])
+
+        # Results are completed when the next one arrives
+        assert parser.feed('1..4') == []
+        assert parser.plan == 4
+        assert parser.feed('ok 1 some test') == []
+        result = parser.feed('not ok 2 failing test')
+        assert len(result) == 1
+        assert result[0].name == 'some test'
+        assert result[0].status == THE_MODULE.PASSED
+        assert result[0].line == 3
+
+        # Commented lines are diagnostics of the last result
+        assert parser.feed('# (in test file tests.bats, line 20)') == []
+        result = parser.close()
+        assert result[0].status == THE_MODULE.FAILED
+        assert result[0].diagnostics == ['(in test file tests.bats, line 20)']
+        assert result[0].line == 7
+        assert parser.close() == []
+
+        # Other lines are kept, i.e. errors of bats
+        assert parser.feed('bats: unknown option --bogus') == []
+        assert parser.unparsed == ['bats: unknown option --bogus']
+
+    def test_parse(self):
+        """Test for parse()"""
+        debug.trace(7, f'TestTapParser.test_parse({self})')
+        parser = THE_MODULE.TapParser()
+        results = list(parser.parse(self.tap_lines))
+        assert [result.number for result in results] == [1, 2, 3, 4]
+        assert results[1].diagnostics == ['(in test file tests.bats, line 20)', "  `[ 1 == 2 ]' failed"]
+        assert results[2].name == 'skipped test'
+        assert results[2].status == THE_MODULE.SKIPPED
+        assert results[3].name == 'timed test'
+        assert results[3].duration == 0.025
+        assert results[3].line == 0
+
+
+def test_reporters():
+    """Test for JunitReporter and JsonReporter"""
+    junit_file = gh.get_temp_file()
+    json_file = gh.get_temp_file()
+    reporters = [
+        THE_MODULE.JunitReporter(junit_file, name='tests.batspp', properties={'order': 'failed'}),
+        THE_MODULE.JsonReporter(json_file, name='tests.batspp', properties={'order': 'failed'}),
+        ]
+    results = THE_MODULE.TapParser().parse(TestTapParser.tap_lines)
+    for result in results:
+        for reporter in reporters:
+            reporter.write(result)
+    for reporter in reporters:
+        reporter.close()
+
+    # JUnit report
+    document = xml_parse(junit_file)
+    testcases = document.getElementsByTagName('testcase')
+    assert len(testcases) == 4
+    assert testcases[1].getAttribute('name') == 'failing test'
+    assert "`[ 1 == 2 ]' failed" in testcases[1].getElementsByTagName('failure')[0].firstChild.data
+    assert testcases[2].getElementsByTagName('skipped')
+    assert document.getElementsByTagName('property')[0].getAttribute('value') == 'failed'
+
+    # JSON lines report
+    lines = gh.read_file(json_file).splitlines()[1:]
+    assert len(lines) == 4
+    assert json_loads(lines[1])['file'] == 'tests.batspp'
+    assert json_loads(lines[1])['status'] == 'failed'
+    assert json_loads(lines[3])['duration'] == 0.025
+    assert json_loads(gh.read_file(json_file).splitlines()[0]) == {'properties': {'order': 'failed'}}
+
+
+def test_result_from_dict():
+    """Test for TestResult.from_dict"""
+    result = THE_MODULE.TestResult(2, 'failing test', 'failed', duration=0.5,
+                                   diagnostics=['some error'], line=10, file='a.batspp')
+    copied = THE_MODULE.TestResult.from_dict({'file': result.file, **result.to_dict()})
+    assert vars(copied) == vars(result)
+    assert THE_MODULE.TestResult.from_dict({'number': 1, 'name': 'test', 'status': 'passed'}).file == ''
+
+
+if __name__ == '__main__':
+    debug.trace_current_context()
+    pytest.main([__file__])
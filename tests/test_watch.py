@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+#
+# Tests for _watch module
+#
+# This test must be runned with the command:
+# $ PYTHONPATH="$(pwd):$PYTHONPATH" ./tests/test_watch.py
+#
+
+
+"""Tests for _watch module"""
+
+
+# Standard packages
+from sys import path as sys_path
+from threading import Timer
+
+# Installed packages
+import pytest
+from mezcla import debug
+from mezcla import glue_helpers as gh
+
+# Local packages
+sys_path.insert(0, './batspp')
+from batspp._tap import TestResult
+
+
+# Reference to the module being tested
+import batspp._watch as THE_MODULE
+
+
+class TestWatcher:
+    """Class for testcase definition"""
+
+    def test_wait_changes(self):
+        """Ensure changed paths are detected once these are stable"""
+        debug.trace(7, f'TestWatcher.test_wait_changes({self})')
+        paths = [f'{gh.get_temp_file()}-{number}.batspp' for number in range(3)]
+        gh.write_file(paths[0], 'first')
+        gh.write_file(paths[1], 'second')
+        watcher = THE_MODULE.Watcher(paths, interval=0.01, debounce=0.05)
+
+        # Modified and created files are changes
+        Timer(0.05, gh.write_file, (paths[0], 'first modified')).start()
+        Timer(0.07, gh.write_file, (paths[2], 'third')).start()
+        changes = watcher.wait_changes()
+        assert paths[0] in changes
+        assert paths[1] not in changes
+
+        Timer(0.05, gh.write_file, (paths[1], 'second modified')).start()
+        assert watcher.wait_changes() == [paths[1]]
+
+
+class TestResultsMemory:
+    """Class for testcase definition"""
+
+    def test_record(self):
+        """Ensure only completed results are recorded"""
+        debug.trace(7, f'TestResultsMemory.test_record({self})')
+        memory = THE_MODULE.ResultsMemory()
+        passed = TestResult(1, 'passing', 'passed', file='a.batspp')
+        memory.record('aaaa', passed)
+        memory.record('bbbb', TestResult(2, 'not run', 'skipped', file='a.batspp'))
+        assert memory.get('a.batspp', 'aaaa') is passed
+        assert memory.get('a.batspp', 'bbbb') is None
+        assert memory.recorded == [passed]
+
+
+if __name__ == '__main__':
+    debug.trace_current_context()
+    pytest.main([__file__])
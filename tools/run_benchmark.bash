@@ -0,0 +1,30 @@
+#!/bin/bash
+#
+# Compare throughput of bats and bash workers
+# on a generated file with thousands of small tests
+#
+# Usage examples:
+#   $ run_benchmark.bash
+#   $ run_benchmark.bash <NUMBER-OF-TESTS> <NUMBER-OF-WORKERS>
+#
+
+base="$(dirname $(realpath -s $0))/../"
+script="$base/batspp/batspp"
+tests="${1:-2000}"
+workers="${2:-$(nproc)}"
+
+export PYTHONPATH="$base/:$PYTHONPATH"
+
+file="$(mktemp --suffix=.batspp)"
+for (( i=1; i<=tests; i++ ))
+do
+    echo -e "# Test number $i\n\$ echo \$(( $i * 2 ))\n$(( i * 2 ))\n" >> "$file"
+done
+
+echo "Running $tests tests with bats"
+time python3 "$script" --omit_trace "$file" | grep -c '^ok'
+
+echo -e "\nRunning $tests tests with $workers bash workers"
+time python3 "$script" --omit_trace --workers "$workers" "$file" | grep -c '^ok'
+
+rm -f "$file"